@@ -0,0 +1,100 @@
+#! /usr/bin/env python3
+
+"""
+    Compares the formatting of the entries of a folder entry by entry,
+    with calcul_droit and format_time called for each entry, and column by
+    column with the tables of scan_disk.formatting.
+"""
+
+import argparse
+import logging
+import os
+import pathlib
+import sys
+import time
+
+file_path = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(file_path))
+
+import scan_disk.formatting as formatting
+import scan_disk.records as records
+
+# The modes of the fake entries, files mostly
+MODES = (0o100644, 0o100644, 0o100644, 0o100755, 0o40755, 0o120777,
+         0o10644, 0o140755, 0o20620, 0o60660)
+
+
+def fake_entries(count):
+    """
+        Returns count entries looking like the ones of a real folder, the
+        dates of an entry being the same, as for a file written once
+    """
+    now = int(time.time())
+    return records.Entries(
+        (f'file_{i:07d}.txt', os.stat_result((
+            MODES[i % len(MODES)], 10_000_000 + i, 2049, 1, 1000, 1000,
+            i * 37, now - i, now - i, now - i), {'st_blocks': 8}))
+        for i in range(count))
+
+
+def per_entry(formatter, entries):
+    """
+        Formats the entries one by one, as before the tables
+    """
+    result = []
+    for name, entry in entries.items():
+        mode = formatter.calcul_droit(str(oct(entry.st_mode)))
+        result.append((mode[0], mode[1], str(entry.st_ino),
+                       str(entry.st_dev), str(entry.st_uid),
+                       str(entry.st_gid), formatter.format_size(entry.st_size),
+                       formatter.format_time(entry.st_atime),
+                       formatter.format_time(entry.st_mtime),
+                       formatter.format_time(entry.st_ctime)))
+    return result
+
+
+def per_column(formatter, entries):
+    """
+        Formats the entries column by column
+    """
+    return list(formatter.format_rows(entries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    logger = logging.getLogger('benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    formatter = formatting.Formatter(logger)
+    entries = fake_entries(args.entries)
+
+    print(f'{args.entries} entries')
+    print(f'{"formatting":<16}{"seconds":>10}{"entries/s":>14}')
+    results = []
+    for label, format_entries in (('per entry', per_entry),
+                                  ('per column', per_column)):
+        elapsed = min(measure(format_entries, formatter, entries)
+                      for _ in range(args.repeat))
+        results.append(format_entries(formatter, entries))
+        print(f'{label:<16}{elapsed:>10.3f}' +
+              f'{args.entries / elapsed:>14.0f}')
+    # the tables also name the links, sockets, fifos and devices
+    types = {row[0] for row in results[1]}
+    print(f'types: {", ".join(sorted(types))}')
+
+
+def measure(format_entries, formatter, entries):
+    """
+        Returns the time taken to format the entries
+    """
+    start = time.perf_counter()
+    format_entries(formatter, entries)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#! /usr/bin/env python3
+
+"""
+    Compares the memory used by the entries of a scan, as dicts of
+    formatted strings and as columns of raw integers.
+"""
+
+import argparse
+import logging
+import os
+import pathlib
+import sys
+import time
+import tracemalloc
+
+file_path = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(file_path))
+
+import scan_disk.formatting as formatting
+import scan_disk.records as records
+
+
+def fake_stats(count):
+    """
+        Yields count (name, stats) looking like the ones of a real folder
+    """
+    now = int(time.time())
+    for i in range(count):
+        # st_mode, st_ino, st_dev, st_nlink, st_uid, st_gid, st_size,
+        # st_atime, st_mtime, st_ctime
+        yield f'file_{i:07d}.txt', os.stat_result((
+            0o100644, 10_000_000 + i, 2049, 1, 1000, 1000, i * 37,
+            now - i, now - 2 * i, now - 3 * i), {'st_blocks': 8})
+
+
+def measure(build, count):
+    """
+        Returns the memory allocated by build and the time it took
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build(fake_stats(count))
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    logger = logging.getLogger('benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    formatter = formatting.Formatter(logger)
+
+    def as_dicts(entries):
+        return {name: formatter.format_stats(stats) for name, stats in entries}
+
+    print(f'{args.entries} entries')
+    print(f'{"representation":<16}{"MB":>10}{"bytes/entry":>14}{"seconds":>10}')
+    for label, build in (('dict of str', as_dicts),
+                         ('Entries', records.Entries)):
+        size, elapsed = measure(build, args.entries)
+        print(f'{label:<16}{size / 2**20:>10.1f}' +
+              f'{size / args.entries:>14.0f}{elapsed:>10.2f}')
+
+
+if __name__ == "__main__":
+    main()
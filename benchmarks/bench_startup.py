@@ -0,0 +1,107 @@
+#! /usr/bin/env python3
+
+"""
+    Measures the startup time of the application, the time spent to import
+    scan_disk.scan_disk and to run python -m scan_disk --help as reported by
+    python -X importtime, and the wall time of python -m scan_disk --help.
+
+    The heavy modules (jinja2, yaml, hashlib, sqlite3, mysql.connector),
+    the modules of the scan of several directories and of the server must
+    only be imported when they are used: the benchmark fails if one of them
+    is imported at startup. The results can be saved as JSON
+    to track them.
+"""
+
+import argparse
+import json
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+
+file_path = pathlib.Path(__file__).resolve().parents[1]
+
+# The modules which must not be imported at startup
+LAZY_MODULES = ('jinja2', 'yaml', 'hashlib', 'sqlite3', 'mysql.connector',
+                'asyncio', 'http.server', 'scan_disk.service',
+                'scan_disk.server')
+
+# The arguments of python running the command line
+HELP = ['-m', 'scan_disk', '--help']
+
+
+def import_times(arguments):
+    """
+        Returns the cumulative import time of each module imported by
+        python run with arguments, and the time of all the imports, in
+        microseconds
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime',
+                             *arguments],
+                            cwd=file_path, capture_output=True, text=True,
+                            check=True)
+    times = {}
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+        total += int(own)
+    return times, total
+
+
+def wall_time():
+    """
+        Returns the wall time of python -m scan_disk --help, in seconds
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *HELP], cwd=file_path,
+                   capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--module', default='scan_disk.scan_disk')
+    parser.add_argument('--slowest', type=int, default=10)
+    parser.add_argument('--json', help='Writes the results in a JSON file')
+    args = parser.parse_args()
+
+    runs = [import_times(['-c', f'import {args.module}'])[0]
+            for _ in range(args.runs)]
+    imports = statistics.median(times[args.module] for times in runs)
+    help_runs = [import_times(HELP) for _ in range(args.runs)]
+    help_imports = statistics.median(total for _, total in help_runs)
+    walls = statistics.median(wall_time() for _ in range(args.runs))
+    loaded = sorted(name for name in LAZY_MODULES
+                    if name in runs[0] or name in help_runs[0][0])
+    slowest = sorted(runs[0].items(), key=lambda item: -item[1])
+
+    print(f'import {args.module}: {imports / 1000:.1f} ms (median of ' +
+          f'{args.runs} runs)')
+    print(f'imports of python -m scan_disk --help: ' +
+          f'{help_imports / 1000:.1f} ms')
+    print(f'python -m scan_disk --help: {walls * 1000:.1f} ms')
+    print(f'{"module":<40}{"ms":>10}')
+    for name, cumulative in slowest[1:args.slowest + 1]:
+        print(f'{name:<40}{cumulative / 1000:>10.1f}')
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'module': args.module,
+                       'runs': args.runs,
+                       'import_us': imports,
+                       'help_import_us': help_imports,
+                       'help_s': walls,
+                       'lazy_modules_loaded': loaded,
+                       'slowest': dict(slowest[1:args.slowest + 1])},
+                      f, indent=2)
+    if loaded:
+        print(f'Imported at startup: {", ".join(loaded)}')
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
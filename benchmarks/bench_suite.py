@@ -0,0 +1,221 @@
+#! /usr/bin/env python3
+
+"""
+    Measures the throughput of each stage of a scan on a synthetic tree:
+    the walk with each engine, the streamed walk and the html and csv
+    renders.
+
+    Each stage runs in a fresh process, so that its peak RSS is not the one
+    of the previous stages. The results can be saved as JSON with --json
+    and compared with the results of another commit with --compare.
+"""
+
+import argparse
+import concurrent.futures
+import json
+import logging
+import multiprocessing
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+file_path = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(file_path))
+sys.path.insert(0, str(file_path / 'benchmarks'))
+
+import scan_disk.scan_disk as scan_disk
+import scan_disk.scan_render as scan_render
+import synthetic
+
+# The name of the rendered files, removed after each render
+OUTPUT = 'bench_suite'
+
+STAGES = ('scan walk', 'scan scandir', 'stream', 'render html',
+          'render csv')
+
+
+def peak_rss():
+    """
+        Returns the peak RSS of the process in MB, None if it is unknown
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, in KB elsewhere
+    if sys.platform == 'darwin':
+        return peak / 2**20
+    return peak / 2**10
+
+
+def make_scan(root, engine='scandir'):
+    """
+        Returns a ScanDisk logging nothing
+    """
+    logger = logging.getLogger('benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+    return scan_disk.ScanDisk(pathlib.Path(root), OUTPUT, logger,
+                              engine=engine)
+
+
+def render(scan, result, method, suffix):
+    """
+        Renders a scan and returns the size of the rendered file
+    """
+    report = scan_render.ScanRender(result, scan.directory, output=OUTPUT,
+                                    formatter=scan.formatter)
+    path = report.project_path / 'html' / (OUTPUT + suffix)
+    try:
+        error_code, error_message = getattr(report, method)()
+        if error_code != 200:
+            raise RuntimeError(error_message)
+        return path.stat().st_size
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def run_stage(stage, root, repeat):
+    """
+        Runs a stage repeat times, in the process of a worker
+        :param stage: the name of the stage
+        :type stage: String
+        :param root: the top of the synthetic tree
+        :type root: String
+        :param repeat: the number of runs, the best one is kept
+        :type repeat: int
+        :return: the best wall time, the bytes written and the peak RSS
+        :rtype: Dict
+    """
+    best = None
+    written = 0
+    for _ in range(repeat):
+        if stage == 'scan walk':
+            scan = make_scan(root, 'walk')
+            start = time.perf_counter()
+            scan.read_directory(scan.directory)
+        elif stage == 'scan scandir':
+            scan = make_scan(root)
+            start = time.perf_counter()
+            scan.read_directory(scan.directory)
+        elif stage == 'stream':
+            scan = make_scan(root)
+            start = time.perf_counter()
+            for _ in scan.iter_directory(scan.directory):
+                pass
+        elif stage == 'render html':
+            # only the render is timed, not the scan it renders
+            scan = make_scan(root)
+            result = scan.read_directory(scan.directory)
+            start = time.perf_counter()
+            written = render(scan, result, 'render_html', '.html')
+        elif stage == 'render csv':
+            scan = make_scan(root)
+            start = time.perf_counter()
+            written = render(scan, scan.iter_directory(scan.directory),
+                             'render_csv', '.csv')
+        else:
+            raise ValueError(f'Unknown stage {stage}')
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'seconds': best, 'bytes': written, 'peak_rss_mb': peak_rss()}
+
+
+def git_commit():
+    """
+        Returns the commit of the project, None outside of a git checkout
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                              cwd=file_path, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(spec, stages, repeat):
+    """
+        Builds the synthetic tree and runs each stage in its own process
+        :return: the results, as saved with --json
+        :rtype: Dict
+    """
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory() as tmp:
+        entries = synthetic.make_tree(tmp, spec)
+        for stage in stages:
+            with concurrent.futures.ProcessPoolExecutor(
+                    1, mp_context=context) as executor:
+                result = executor.submit(run_stage, stage, tmp,
+                                         repeat).result()
+            result['stage'] = stage
+            result['entries_per_sec'] = entries / result['seconds']
+            result['mb_per_sec'] = (result['bytes'] / 2**20 /
+                                    result['seconds'])
+            results.append(result)
+    return {'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'tree': spec.as_dict(),
+            'entries': entries,
+            'repeat': repeat,
+            'results': results}
+
+
+def print_results(suite, previous=None):
+    """
+        Prints the results, and their ratio to the previous ones if given
+    """
+    before = {}
+    if previous:
+        before = {result['stage']: result for result in previous['results']}
+    print(f'{suite["entries"]} entries, commit {suite["commit"]}')
+    print(f'{"stage":<14}{"seconds":>10}{"entries/s":>12}{"MB/s":>10}' +
+          f'{"peak MB":>10}{"speedup":>10}')
+    for result in suite['results']:
+        rss = result['peak_rss_mb']
+        line = (f'{result["stage"]:<14}{result["seconds"]:>10.3f}' +
+                f'{result["entries_per_sec"]:>12.0f}' +
+                f'{result["mb_per_sec"]:>10.1f}' +
+                (f'{rss:>10.1f}' if rss is not None else f'{"-":>10}'))
+        if result['stage'] in before:
+            speedup = before[result['stage']]['seconds'] / result['seconds']
+            line += f'{speedup:>9.2f}x'
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--name-length', type=int, nargs=2, default=(8, 24))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--stage', choices=STAGES, action='append',
+                        help='Only run these stages, all by default')
+    parser.add_argument('--json', type=pathlib.Path,
+                        help='Save the results in a JSON file')
+    parser.add_argument('--compare', type=pathlib.Path,
+                        help='Compare with the JSON results of a previous run')
+    args = parser.parse_args()
+
+    spec = synthetic.TreeSpec(args.depth, args.fanout, args.files,
+                              args.name_length, seed=args.seed)
+    previous = None
+    if args.compare:
+        previous = json.loads(args.compare.read_text())
+        if previous['tree'] != spec.as_dict():
+            print('The trees differ, the speedups are not comparable')
+    suite = run_suite(spec, args.stage or STAGES, args.repeat)
+    print_results(suite, previous)
+    if args.json:
+        args.json.write_text(json.dumps(suite, indent=2) + '\n')
+
+
+if __name__ == "__main__":
+    main()
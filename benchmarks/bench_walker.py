@@ -0,0 +1,192 @@
+#! /usr/bin/env python3
+
+"""
+    Compares the os.walk engine with the scandir engine of ScanDisk,
+    sequential, with a pool of threads and with a pool of processes, and
+    the rescan of an unchanged tree with the index of the previous scan.
+
+    The number of stat and scandir calls made by each engine is counted by
+    wrapping os.stat, os.lstat and os.scandir, then each engine is timed
+    without the wrappers.
+"""
+
+import argparse
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+file_path = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(file_path))
+
+import scan_disk.scan_disk as scan_disk
+
+
+class CountingEntry:
+    """
+        Wraps a DirEntry to count the calls which reach the disk
+    """
+
+    def __init__(self, entry, counter):
+        self._entry = entry
+        self._counter = counter
+        self._stated = False
+        self.name = entry.name
+        self.path = entry.path
+
+    def stat(self, follow_symlinks=True):
+        # DirEntry caches its stat result, only the first call is a syscall
+        if not self._stated:
+            self._counter['stat'] += 1
+            self._stated = True
+        return self._entry.stat(follow_symlinks=follow_symlinks)
+
+    def is_dir(self, follow_symlinks=True):
+        return self._entry.is_dir(follow_symlinks=follow_symlinks)
+
+    def is_file(self, follow_symlinks=True):
+        return self._entry.is_file(follow_symlinks=follow_symlinks)
+
+    def is_symlink(self):
+        return self._entry.is_symlink()
+
+
+class CountingScandir:
+    """
+        Wraps os.scandir to count the calls
+    """
+
+    def __init__(self, path, counter):
+        counter['scandir'] += 1
+        self._iterator = _scandir(path)
+        self._counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._iterator.close()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return CountingEntry(next(self._iterator), self._counter)
+
+    def close(self):
+        self._iterator.close()
+
+
+_scandir = os.scandir
+_stat = os.stat
+_lstat = os.lstat
+
+
+def make_tree(root, depth, fanout, files):
+    """
+        Creates a tree of depth levels, with fanout folders and files files
+        per folder
+    """
+    count = 0
+    level = [root]
+    for _ in range(depth):
+        next_level = []
+        for folder in level:
+            for i in range(files):
+                (folder / f'file_{i}.txt').write_bytes(b'x' * i)
+                count += 1
+            for i in range(fanout):
+                sub = folder / f'dir_{i}'
+                sub.mkdir()
+                next_level.append(sub)
+                count += 1
+        level = next_level
+    return count
+
+
+def count_calls(scan):
+    """
+        Counts the stat and scandir calls of a scan
+    """
+    counter = {'stat': 0, 'scandir': 0}
+
+    def stat(*args, **kwargs):
+        counter['stat'] += 1
+        return _stat(*args, **kwargs)
+
+    def lstat(*args, **kwargs):
+        counter['stat'] += 1
+        return _lstat(*args, **kwargs)
+
+    os.stat, os.lstat = stat, lstat
+    os.scandir = lambda path='.': CountingScandir(path, counter)
+    try:
+        scan.read_directory(scan.directory)
+    finally:
+        os.stat, os.lstat, os.scandir = _stat, _lstat, _scandir
+    return counter
+
+
+def time_scan(scan, repeat):
+    """
+        Returns the best time of repeat scans
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        scan.read_directory(scan.directory)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--processes', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    logger = logging.getLogger('benchmark')
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        entries = make_tree(root, args.depth, args.fanout, args.files)
+        print(f'{entries} entries')
+        print(f'{"engine":<10}{"stat":>10}{"scandir":>10}{"seconds":>10}')
+        runs = [(engine, engine, 1, 1)
+                for engine in scan_disk.ScanDisk.ENGINES]
+        if args.workers > 1:
+            runs.append((f'{args.workers} threads', 'scandir', args.workers, 1))
+        if args.processes > 1:
+            runs.append((f'{args.processes} procs', 'scandir', 1,
+                         args.processes))
+        for label, engine, workers, processes in runs:
+            scan = scan_disk.ScanDisk(root, None, logger, engine=engine,
+                                      workers=workers, processes=processes)
+            # the calls of the worker processes are not counted
+            calls = count_calls(scan)
+            elapsed = time_scan(scan, args.repeat)
+            print(f'{label:<10}{calls["stat"]:>10}{calls["scandir"]:>10}' +
+                  f'{elapsed:>10.3f}')
+        with tempfile.TemporaryDirectory() as index_dir:
+            # the first scan fills the index, the next ones are rescans
+            scan = scan_disk.ScanDisk(root, None, logger,
+                                      index_path=pathlib.Path(index_dir) /
+                                      'index.db')
+            scan.read_directory(root)
+            calls = count_calls(scan)
+            elapsed = time_scan(scan, args.repeat)
+            print(f'{"rescan":<10}{calls["stat"]:>10}{calls["scandir"]:>10}' +
+                  f'{elapsed:>10.3f}')
+
+
+if __name__ == "__main__":
+    main()
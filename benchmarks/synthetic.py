@@ -0,0 +1,139 @@
+#! /usr/bin/env python3
+
+"""
+    Generates a synthetic folder tree for the benchmarks.
+
+    The tree only depends on its parameters and on the seed: the same names,
+    sizes and dates are generated on every run, so that the results of two
+    commits are measured on the same tree. The files are sparse, their size
+    is set without writing their content, so a large tree is quick to build
+    and takes little room on the disk. Only the date of the top folder is
+    left as it is.
+"""
+
+import argparse
+import os
+import pathlib
+import random
+import string
+
+# The characters of the generated names
+CHARACTERS = string.ascii_lowercase + string.digits + '_-'
+
+# The date of the generated files, the 1st of January 2020
+EPOCH = 1_577_836_800
+
+
+class TreeSpec:
+
+    def __init__(self, depth=3, fanout=8, files=50, name_length=(8, 24),
+                 max_size=1 << 16, seed=0):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: TreeSpec
+            :param depth: The number of levels of folders below the top
+            :type depth: int
+            :param fanout: The number of sub-folders of each folder
+            :type fanout: int
+            :param files: The number of files of each folder
+            :type files: int
+            :param name_length: The shortest and longest names
+            :type name_length: (int, int)
+            :param max_size: The largest size of a file
+            :type max_size: int
+            :param seed: The seed of the random generator
+            :type seed: int
+        """
+        if depth < 0 or fanout < 0 or files < 0:
+            raise ValueError(f'Invalid tree {depth}/{fanout}/{files}')
+        if not 1 <= name_length[0] <= name_length[1]:
+            raise ValueError(f'Invalid name lengths {name_length}')
+        self.depth = depth
+        self.fanout = fanout
+        self.files = files
+        self.name_length = tuple(name_length)
+        self.max_size = max_size
+        self.seed = seed
+
+    def as_dict(self):
+        """
+            Returns the parameters, as saved with the results
+        """
+        return {'depth': self.depth, 'fanout': self.fanout,
+                'files': self.files, 'name_length': list(self.name_length),
+                'max_size': self.max_size, 'seed': self.seed}
+
+
+def names(generator, count, name_length, suffix=''):
+    """
+        Returns count distinct names, the index of each name makes it unique
+    """
+    result = []
+    for i in range(count):
+        index = f'{i:x}'
+        length = max(generator.randint(*name_length) - len(index), 1)
+        result.append(''.join(generator.choices(CHARACTERS, k=length)) +
+                      index + suffix)
+    return result
+
+
+def make_tree(root, spec):
+    """
+        Creates the tree of a spec in an existing empty folder
+        :param root: the top folder of the tree
+        :type root: Path or String
+        :param spec: the parameters of the tree
+        :type spec: TreeSpec
+        :return: the number of folders and files created
+        :rtype: int
+    """
+    generator = random.Random(spec.seed)
+    count = 0
+    level = [os.fspath(root)]
+    # the dates of the folders are set once their entries are created
+    folder_dates = []
+    for depth in range(spec.depth + 1):
+        next_level = []
+        for folder in level:
+            for name in names(generator, spec.files, spec.name_length,
+                              '.dat'):
+                path = os.path.join(folder, name)
+                with open(path, 'wb') as f:
+                    f.truncate(generator.randrange(spec.max_size + 1))
+                date = EPOCH + generator.randrange(86400 * 365)
+                os.utime(path, (date, date))
+                count += 1
+            if depth == spec.depth:
+                continue
+            for name in names(generator, spec.fanout, spec.name_length):
+                path = os.path.join(folder, name)
+                os.mkdir(path)
+                folder_dates.append(
+                    (path, EPOCH + generator.randrange(86400 * 365)))
+                next_level.append(path)
+                count += 1
+        level = next_level
+    for path, date in folder_dates:
+        os.utime(path, (date, date))
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('root', type=pathlib.Path)
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--name-length', type=int, nargs=2, default=(8, 24))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    args.root.mkdir(parents=True)
+    spec = TreeSpec(args.depth, args.fanout, args.files, args.name_length,
+                    seed=args.seed)
+    print(f'{make_tree(args.root, spec)} entries')
+
+
+if __name__ == "__main__":
+    main()
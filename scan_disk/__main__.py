@@ -2,8 +2,12 @@
 # coding:utf-8
 import argparse
 import pathlib
+import re
 
 import scan_disk.scan_disk as scan_disk
+import scan_disk.metrics as metrics
+import scan_disk.rules as rules
+import scan_disk.utils as utils
 
 message = '''Application permettant de scanner un répertoire et ses sous-répertoires.
 Le chemin du repertoire et le nom du fichier de sortie sont optionnels. 
@@ -23,20 +27,262 @@ parser = argparse.ArgumentParser(
     description=message,
     formatter_class=argparse.RawDescriptionHelpFormatter)
 parser.add_argument('--directory', '-d',
-                    help='Path of the directory to scan',
-                    required=False)
+                    help='Path of the directory to scan, repeat it to scan ' +
+                         'several directories at once',
+                    action='append')
 parser.add_argument('--output', '-o',
-                    help='Name of the output file',
+                    help='Name of the output file, - writes the csv and ' +
+                         'ndjson formats to the standard output',
+                    required=False)
+parser.add_argument('--engine', '-e',
+                    help='Engine used to walk the folders',
+                    choices=scan_disk.ScanDisk.ENGINES,
+                    default='scandir',
+                    required=False)
+parser.add_argument('--workers', '-w',
+                    help='Number of threads reading the folders',
+                    type=int,
+                    default=1,
+                    required=False)
+parser.add_argument('--processes', '-p',
+                    help='Number of processes reading the sub-trees',
+                    type=int,
+                    default=1,
+                    required=False)
+parser.add_argument('--stream', '-s',
+                    help='Write each folder as soon as it is read',
+                    action='store_true')
+parser.add_argument('--index', '-i',
+                    help='SQLite file of the previous scans, the folders '
+                         'which have not changed are not read again',
+                    required=False)
+parser.add_argument('--full', '-f',
+                    help='Read every folder even if it has not changed',
+                    action='store_true')
+parser.add_argument('--external-js',
+                    help='Write the sorttable script in a separate file',
+                    action='store_true')
+parser.add_argument('--page-folders',
+                    help='Split the report in pages of N folders',
+                    type=int,
+                    required=False)
+parser.add_argument('--page-size',
+                    help='Split the report in pages of at most N bytes',
+                    type=int,
+                    required=False)
+parser.add_argument('--top', '-t',
+                    help='Only report the N largest files and folders',
+                    type=int,
+                    required=False)
+parser.add_argument('--duplicates',
+                    help='Only report the hard links and duplicated files',
+                    action='store_true')
+parser.add_argument('--format', '-F',
+                    help='The format of the output file',
+                    choices=scan_disk.ScanDisk.FORMATS,
+                    default='html')
+parser.add_argument('--database',
+                    help='YAML file of the connection used by the ' +
+                         'database format, see config/database.yml',
+                    required=False)
+parser.add_argument('--compression',
+                    help='Compress the csv and ndjson output files',
+                    choices=('gzip', 'zstd'),
+                    required=False)
+parser.add_argument('--diff',
+                    help='Report the changes between two csv or ndjson ' +
+                         'exports of a scan',
+                    nargs=2,
+                    metavar=('OLD', 'NEW'),
+                    required=False)
+parser.add_argument('--rules',
+                    help='YAML file of the rules selecting the folders and ' +
+                         'files, see config/rules.yml',
+                    required=False)
+parser.add_argument('--exclude',
+                    help='Skip the folders and files matching a glob ' +
+                         'pattern, on the whole path if it holds a /',
+                    action='append')
+parser.add_argument('--exclude-regex',
+                    help='Skip the paths matching a regular expression',
+                    action='append')
+parser.add_argument('--include',
+                    help='Only keep the files matching a glob pattern',
+                    action='append')
+parser.add_argument('--min-size',
+                    help='Skip the files smaller than N bytes',
+                    type=int,
+                    required=False)
+parser.add_argument('--max-size',
+                    help='Skip the files larger than N bytes',
+                    type=int,
+                    required=False)
+parser.add_argument('--newer-than',
+                    help='Only keep the files modified in the last N days',
+                    type=float,
                     required=False)
+parser.add_argument('--older-than',
+                    help='Only keep the files modified more than N days ago',
+                    type=float,
+                    required=False)
+parser.add_argument('--one-file-system', '-x',
+                    help='Do not walk into the other file systems',
+                    action='store_true',
+                    default=None)
+parser.add_argument('--max-depth',
+                    help='Only render the folders down to depth N, the ' +
+                         'deeper ones are only summed in the totals',
+                    type=int,
+                    required=False)
+parser.add_argument('--summary',
+                    help='Only render the folders, the files are only ' +
+                         'summed in the totals',
+                    action='store_true')
+parser.add_argument('--metrics',
+                    help='Time the phases of the scan and write them with ' +
+                         'the counters in a JSON file',
+                    required=False)
+parser.add_argument('--profile',
+                    help='Run the scan under cProfile and tracemalloc and ' +
+                         'write the cProfile stats in a file',
+                    required=False)
+parser.add_argument('--scan-threads',
+                    help='Number of threads reading the folders of several ' +
+                         'directories',
+                    type=int,
+                    default=8)
+parser.add_argument('--per-mount',
+                    help='Number of folders of a mount read at once when ' +
+                         'scanning several directories',
+                    type=int,
+                    default=4)
+parser.add_argument('--mount-limit',
+                    help='Number of folders of a mount read at once, as ' +
+                         'MOUNT=N, it replaces --per-mount for this mount',
+                    action='append')
+parser.add_argument('--serve',
+                    help='Serve the folders of the SQLite file of --index ' +
+                         'as html pages rendered on demand, instead of ' +
+                         'scanning',
+                    metavar='INDEX',
+                    required=False)
+parser.add_argument('--port',
+                    help='Port of the local server of --serve',
+                    type=int,
+                    default=8000)
+parser.add_argument('--cache-pages',
+                    help='Number of pages kept rendered by the server',
+                    type=int,
+                    default=128)
+parser.add_argument('--page-rows',
+                    help='Number of folders and of files of a page of the ' +
+                         'server',
+                    type=int,
+                    default=500)
 
 args = parser.parse_args()
 
+if args.serve:
+    import scan_disk.server as server
+
+    if args.directory and len(args.directory) > 1:
+        parser.error('--serve shows a single directory')
+    utils.setup_logging(scan_disk.project_path / 'config' / 'logging.yml',
+                        scan_disk.project_path / 'logs' / 'scan_disk.log')
+    try:
+        server.serve(args.serve, utils.logging.getLogger('flogger'),
+                     args.directory[0] if args.directory else None,
+                     args.port, args.cache_pages, args.page_rows)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    exit(0)
+
 if not args.directory:
-    directory = pathlib.Path('/')
+    directories = [pathlib.Path('/')]
 else:
-    directory = pathlib.Path(args.directory)
+    directories = [pathlib.Path(directory) for directory in args.directory]
+several = len(directories) > 1
+if several and (args.diff or args.metrics or args.profile or args.index or
+                args.processes > 1 or args.engine != 'scandir' or
+                args.output == '-'):
+    parser.error('several directories can not be scanned with --diff, ' +
+                 '--metrics, --profile, --index, --processes, the walk ' +
+                 'engine nor to the standard output')
+
+mount_limits = {}
+for mount_limit in args.mount_limit or ():
+    mount, _, limit = mount_limit.rpartition('=')
+    if not mount or not limit.isdigit():
+        parser.error(f'invalid mount limit {mount_limit}')
+    mount_limits[mount] = int(limit)
 
 output = args.output
 
-scan_disk = scan_disk.ScanDisk.make(directory, output)
-scan_disk.run()
+overrides = {key: getattr(args, key) for key in rules.KEYS}
+if args.rules or any(overrides.values()):
+    config = utils.yaml_to_dict(args.rules) if args.rules else {}
+    try:
+        scan_rules = rules.Rules.from_dict(config, **overrides)
+    except (ValueError, re.error) as error:
+        parser.error(f'invalid rules: {error}')
+else:
+    scan_rules = None
+
+options = {'engine': args.engine,
+           'workers': args.workers,
+           'processes': args.processes,
+           'stream': args.stream,
+           'index_path': args.index,
+           'full': args.full,
+           'render_options': {'external_js': args.external_js,
+                              'page_folders': args.page_folders,
+                              'page_size': args.page_size,
+                              'compression': args.compression,
+                              'database': utils.yaml_to_dict(args.database)
+                              if args.database else None},
+           'top_n': args.top,
+           'find_duplicates': args.duplicates,
+           'output_format': args.format,
+           'diff_paths': args.diff,
+           'rules': scan_rules,
+           'max_depth': args.max_depth,
+           'summary': args.summary}
+
+if several:
+    import asyncio
+
+    import scan_disk.service as service
+
+    # each directory is rendered in its own file
+    try:
+        scans = [scan_disk.ScanDisk.make(
+            directories[0], service.target_output(directories[0], output),
+            **options)]
+        scans.extend(scan_disk.ScanDisk(
+            directory, service.target_output(directory, output),
+            scans[0].logger, **options) for directory in directories[1:])
+        scan_service = service.ScanService(scans[0].logger,
+                                           args.scan_threads,
+                                           args.per_mount, mount_limits)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    errors = asyncio.run(scan_service.run(scans))
+    if any(error is not None for error in errors):
+        exit(1)
+else:
+    try:
+        scan_disk = scan_disk.ScanDisk.make(
+            directories[0], output,
+            scan_metrics=metrics.Metrics() if args.metrics else None,
+            **options)
+    except ValueError as error:
+        parser.error(str(error))
+    try:
+        if args.profile:
+            metrics.profile(scan_disk.run, args.profile, scan_disk.logger,
+                            scan_disk.metrics)
+        else:
+            scan_disk.run()
+    finally:
+        if args.metrics:
+            scan_disk.metrics.write(args.metrics)
@@ -0,0 +1,231 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Compares two scans saved by the CSV or NDJSON export.
+
+    The rows of each scan are sorted by path with an external merge sort:
+    runs of a bounded number of rows are sorted in memory and saved in
+    temporary files, then merged. The two sorted scans are then merged on
+    their paths, so the memory stays bounded whatever the number of
+    entries.
+
+    A path only in the new scan is new, only in the old scan is deleted. A
+    file whose size grew is grown, a file whose size, mode, owner or dates
+    changed otherwise is modified. The folders are only reported as new or
+    deleted, their dates change with their content. The change report keeps
+    the number and the bytes of each kind of change, with its N largest
+    changes.
+"""
+
+import csv
+import gzip
+import heapq
+import io
+import json
+import operator
+import os
+import pickle
+import stat
+import tempfile
+
+import scan_disk.export as export
+import scan_disk.top as top
+
+NEW = 'new'
+DELETED = 'deleted'
+GROWN = 'grown'
+MODIFIED = 'modified'
+CHANGES = (NEW, DELETED, GROWN, MODIFIED)
+
+_SIZE = export.COLUMNS.index('size')
+_MODE = export.COLUMNS.index('mode')
+# The columns compared, the parent ids and the access dates are not
+_COMPARED = operator.itemgetter(*(export.COLUMNS.index(name) for name in
+                                  ('size', 'mode', 'uid', 'gid', 'mtime',
+                                   'ctime')))
+
+
+def open_export(path):
+    """
+        Opens a file of the CSV or NDJSON export, compressed or not
+        :param path: the path of the file
+        :type path: Path or String
+        :return: the file
+        :rtype: io.TextIOWrapper
+    """
+    path = str(path)
+    if path.endswith('.gz'):
+        raw = gzip.open(path, 'rb')
+    elif path.endswith('.zst'):
+        import zstandard
+
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    else:
+        raw = open(path, 'rb')
+    return io.TextIOWrapper(io.BufferedReader(raw, 1024 * 1024),
+                            encoding='utf-8', errors='surrogateescape',
+                            newline='')
+
+
+def read_export(path):
+    """
+        Reads the rows of a file of the CSV or NDJSON export
+        :param path: the path of the file
+        :type path: Path or String
+        :return: the rows, in the order of export.COLUMNS
+        :rtype: Generator of Tuple
+    """
+    with open_export(path) as f:
+        if '.ndjson' in os.path.basename(str(path)):
+            for line in f:
+                row = json.loads(line)
+                yield tuple(row[name] for name in export.COLUMNS)
+        else:
+            reader = csv.reader(f)
+            next(reader, None)
+            for path_name, *values in reader:
+                yield (path_name, *map(int, values))
+
+
+def sort_rows(rows, run_rows=500_000, directory=None):
+    """
+        Sorts rows by path, holding at most run_rows rows in memory
+        :param rows: the rows to sort
+        :type rows: Iterable of Tuple
+        :param run_rows: the number of rows sorted in memory at once
+        :type run_rows: int
+        :param directory: the folder of the temporary files
+        :type directory: String
+        :return: the rows sorted by path
+        :rtype: Generator of Tuple
+    """
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        runs = []
+        run = []
+        for row in rows:
+            run.append(row)
+            if len(run) >= run_rows:
+                runs.append(save_run(run, tmp, len(runs)))
+                run = []
+        run.sort()
+        if not runs:
+            yield from run
+            return
+        runs.append(save_run(run, tmp, len(runs)))
+        yield from heapq.merge(*(load_run(path) for path in runs))
+
+
+def save_run(run, directory, number, block_rows=10_000):
+    """
+        Sorts a run of rows and saves it in blocks in a temporary file
+    """
+    run.sort()
+    path = os.path.join(directory, f'run_{number}')
+    with open(path, 'wb') as f:
+        for start in range(0, len(run), block_rows):
+            pickle.dump(run[start:start + block_rows], f,
+                        pickle.HIGHEST_PROTOCOL)
+    return path
+
+
+def load_run(path):
+    """
+        Reads a run of rows saved by save_run, one block at a time
+    """
+    with open(path, 'rb') as f:
+        while True:
+            try:
+                yield from pickle.load(f)
+            except EOFError:
+                return
+
+
+def diff_rows(old, new):
+    """
+        Merges two scans sorted by path and yields their changes
+        :param old: the rows of the old scan sorted by path
+        :type old: Iterable of Tuple
+        :param new: the rows of the new scan sorted by path
+        :type new: Iterable of Tuple
+        :return: the kind of change, the path, the old and the new size
+        :rtype: Generator of (String, String, int, int)
+    """
+    old = iter(old)
+    new = iter(new)
+    old_row = next(old, None)
+    new_row = next(new, None)
+    while old_row is not None or new_row is not None:
+        if new_row is None or (old_row is not None and
+                               old_row[0] < new_row[0]):
+            yield DELETED, old_row[0], old_row[_SIZE], 0
+            old_row = next(old, None)
+        elif old_row is None or new_row[0] < old_row[0]:
+            yield NEW, new_row[0], 0, new_row[_SIZE]
+            new_row = next(new, None)
+        else:
+            if not stat.S_ISDIR(new_row[_MODE]):
+                if new_row[_SIZE] > old_row[_SIZE]:
+                    yield GROWN, new_row[0], old_row[_SIZE], new_row[_SIZE]
+                elif _COMPARED(new_row) != _COMPARED(old_row):
+                    yield (MODIFIED, new_row[0], old_row[_SIZE],
+                           new_row[_SIZE])
+            old_row = next(old, None)
+            new_row = next(new, None)
+
+
+class DiffReport:
+
+    def __init__(self, old_path, new_path, n=100):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: DiffReport
+            :param old_path: The export of the old scan
+            :type old_path: Path or String
+            :param new_path: The export of the new scan
+            :type new_path: Path or String
+            :param n: The number of changes of each kind kept
+            :type n: int
+        """
+        self.old_path = old_path
+        self.new_path = new_path
+        self.counts = dict.fromkeys(CHANGES, 0)
+        # the bytes added (positive) or removed (negative) by each kind
+        self.sizes = dict.fromkeys(CHANGES, 0)
+        self.largest = {change: top.TopN(n) for change in CHANGES}
+
+    def add(self, change, path, old_size, new_size):
+        """
+            Counts a change and keeps it if it is among the largest
+            :param self: The class instance
+            :type self: DiffReport
+            :param change: the kind of change
+            :type change: String
+            :param path: the path of the entry
+            :type path: String
+            :param old_size: the size in the old scan
+            :type old_size: int
+            :param new_size: the size in the new scan
+            :type new_size: int
+        """
+        self.counts[change] += 1
+        self.sizes[change] += new_size - old_size
+        self.largest[change].push(abs(new_size - old_size), path, old_size,
+                                  new_size)
+
+    def compare(self, run_rows=500_000):
+        """
+            Compares the two scans
+            :param self: The class instance
+            :type self: DiffReport
+            :param run_rows: the number of rows sorted in memory at once
+            :type run_rows: int
+            :return: the report
+            :rtype: DiffReport
+        """
+        for change in diff_rows(
+                sort_rows(read_export(self.old_path), run_rows),
+                sort_rows(read_export(self.new_path), run_rows)):
+            self.add(*change)
+        return self
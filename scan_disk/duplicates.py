@@ -0,0 +1,207 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Finds the hard links and the duplicated files of a scan.
+
+    The hard links are grouped by (dev, inode), they share their content
+    and are not counted as duplicates. The other files are compared in
+    stages, each one only reading the files left by the previous one:
+    grouped by size, then by a hash of their first and last blocks, then
+    by a hash of their whole content. The files are hashed by a pool of
+    threads with large buffered reads.
+"""
+
+import collections
+import concurrent.futures
+import os
+import stat
+
+import scan_disk.records as records
+
+MODE = records.STAT_FIELDS.index('st_mode')
+INO = records.STAT_FIELDS.index('st_ino')
+DEV = records.STAT_FIELDS.index('st_dev')
+SIZE = records.STAT_FIELDS.index('st_size')
+NLINK = records.STAT_FIELDS.index('st_nlink')
+
+
+class DuplicateFinder:
+
+    # The size of the blocks hashed by the partial hash
+    BLOCK_SIZE = 64 * 1024
+
+    # The size of the reads of the full hash
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, logger, workers=4, min_size=1):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: DuplicateFinder
+            :param logger: The logger file
+            :type logger: Logging
+            :param workers: The number of threads hashing the files
+            :type workers: int
+            :param min_size: The size under which the files are ignored
+            :type min_size: int
+        """
+        self.logger = logger
+        self.workers = workers
+        self.min_size = min_size
+        # the size and paths of the files by (dev, inode), for the hard
+        # links
+        self.links = {}
+        # the paths of the files by size
+        self.sizes = collections.defaultdict(list)
+
+    def add(self, dirpath, files):
+        """
+            Adds the files of a folder
+            :param self: The class instance
+            :type self: DuplicateFinder
+            :param dirpath: the path of the folder
+            :type dirpath: String
+            :param files: the entries of the files of the folder
+            :type files: Entries
+        """
+        columns = files.columns
+        for index, name in enumerate(files.names):
+            if not stat.S_ISREG(columns[MODE][index]):
+                continue
+            path = os.path.join(dirpath, name)
+            size = columns[SIZE][index]
+            if columns[NLINK][index] > 1:
+                key = (columns[DEV][index], columns[INO][index])
+                if key in self.links:
+                    # only one link of an inode is compared
+                    self.links[key][1].append(path)
+                    continue
+                self.links[key] = (size, [path])
+            if size >= self.min_size:
+                self.sizes[size].append(path)
+
+    def hard_links(self):
+        """
+            Returns the groups of hard links found in the scan
+            :param self: The class instance
+            :type self: DuplicateFinder
+            :return: the (size, paths) of the groups, the largest first
+            :rtype: List
+        """
+        result = [(size, paths) for size, paths in self.links.values()
+                  if len(paths) > 1]
+        return sorted(result, key=lambda group: (-group[0], group[1]))
+
+    def duplicates(self):
+        """
+            Returns the groups of files with the same content
+            :param self: The class instance
+            :type self: DuplicateFinder
+            :return: the (size, paths) of the groups, the groups freeing
+                     the most bytes first
+            :rtype: List
+        """
+        groups = [(size, paths) for size, paths in self.sizes.items()
+                  if len(paths) > 1]
+        groups = self.split(groups, self.partial_hash)
+        # the partial hash of a small file is already the hash of its
+        # whole content
+        small = [(size, paths) for size, paths in groups
+                 if size <= 2 * self.BLOCK_SIZE]
+        large = [(size, paths) for size, paths in groups
+                 if size > 2 * self.BLOCK_SIZE]
+        groups = small + self.split(large, self.full_hash)
+        return sorted(groups, key=lambda group: (-self.reclaimable(group),
+                                                 group[1]))
+
+    def split(self, groups, hash_file):
+        """
+            Splits the groups of files by the hash of the files, keeping
+            the groups of at least two files
+            :param self: The class instance
+            :type self: DuplicateFinder
+            :param groups: the (size, paths) of the groups
+            :type groups: List
+            :param hash_file: the function hashing a file of a size
+            :type hash_file: Callable
+            :return: the (size, paths) of the new groups
+            :rtype: List
+        """
+        jobs = [(size, path) for size, paths in groups for path in paths]
+        result = collections.defaultdict(list)
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            digests = executor.map(lambda job: self.hash_or_none(hash_file,
+                                                                 *job),
+                                   jobs)
+            for (size, path), digest in zip(jobs, digests):
+                if digest is not None:
+                    result[(size, digest)].append(path)
+        return [(size, paths) for (size, _), paths in result.items()
+                if len(paths) > 1]
+
+    def hash_or_none(self, hash_file, size, path):
+        """
+            Hashes a file, returns None if it can not be read
+        """
+        try:
+            return hash_file(size, path)
+        except OSError as error:
+            self.logger.error(f'Le fichier {path} n\'est pas lisible. ' +
+                              f'L\'erreur {error} a été générée')
+            return None
+
+    def partial_hash(self, size, path):
+        """
+            Hashes the first and the last blocks of a file
+            :param self: The class instance
+            :type self: DuplicateFinder
+            :param size: the size of the file
+            :type size: int
+            :param path: the path of the file
+            :type path: String
+            :return: the digest
+            :rtype: bytes
+        """
+        import hashlib
+
+        digest = hashlib.blake2b()
+        with open(path, 'rb') as f:
+            digest.update(f.read(self.BLOCK_SIZE))
+            if size > self.BLOCK_SIZE:
+                f.seek(max(self.BLOCK_SIZE, size - self.BLOCK_SIZE))
+                digest.update(f.read(self.BLOCK_SIZE))
+        return digest.digest()
+
+    def full_hash(self, size, path):
+        """
+            Hashes the whole content of a file
+            :param self: The class instance
+            :type self: DuplicateFinder
+            :param size: the size of the file
+            :type size: int
+            :param path: the path of the file
+            :type path: String
+            :return: the digest
+            :rtype: bytes
+        """
+        import hashlib
+
+        digest = hashlib.blake2b()
+        buffer = bytearray(self.BUFFER_SIZE)
+        view = memoryview(buffer)
+        with open(path, 'rb', buffering=0) as f:
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                digest.update(view[:read])
+        return digest.digest()
+
+    @staticmethod
+    def reclaimable(group):
+        """
+            Returns the bytes freed by keeping a single file of a group
+        """
+        size, paths = group
+        return size * (len(paths) - 1)
@@ -0,0 +1,430 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Exports the entries of a scan in machine-readable formats.
+
+    The columnar export writes one row per folder and file, as typed
+    columns: the path, the row id of the parent folder, then the size, the
+    mode, the uid, the gid and the dates as int64. The top folder has the
+    parent -1. The rows are gathered in batches while the scan is streamed
+    and each batch is given to the writer.
+
+    The columns are written in a Parquet file when pyarrow is installed,
+    else in a NumPy .npz file. A .npz file can not be appended to, so its
+    writer keeps the batches as compact arrays of int64 and writes them when
+    it is closed. The paths of a .npz file are stored as their utf-8 bytes
+    (path_data) and the offsets of each path (path_offsets), which load
+    without pickle.
+
+    The CSV and NDJSON exports write the same rows as text, one line per
+    folder or file, as soon as the folder is read. They go through a large
+    buffer, optionally compressed with gzip or zstd, to a file or to the
+    standard output so that another tool can read them while the scan runs.
+"""
+
+import array
+import csv
+import io
+import json
+import os
+import stat
+import sys
+
+import scan_disk.metrics as metrics
+import scan_disk.records as records
+
+# The columns of the rows, after the path and the parent
+FIELDS = ('st_size', 'st_mode', 'st_uid', 'st_gid', 'st_atime', 'st_mtime',
+          'st_ctime')
+COLUMNS = ('path', 'parent') + tuple(field[3:] for field in FIELDS)
+
+_INDEXES = tuple(records.STAT_FIELDS.index(field) for field in FIELDS)
+_MODE = records.STAT_FIELDS.index('st_mode')
+
+
+class ParquetWriter:
+
+    SUFFIX = '.parquet'
+
+    def __init__(self, path, scan_metrics=None):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: ParquetWriter
+            :param path: The path of the Parquet file
+            :type path: Path or String
+            :param scan_metrics: The metrics counting the bytes written
+            :type scan_metrics: Metrics
+        """
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema(
+            [('path', pyarrow.string())] +
+            [(name, pyarrow.int64()) for name in COLUMNS[1:]])
+        self.file = open_raw(path, scan_metrics)
+        try:
+            self.writer = pyarrow.parquet.ParquetWriter(self.file,
+                                                        self.schema)
+        except Exception:
+            self.file.close()
+            raise
+
+    def write(self, paths, columns):
+        """
+            Writes a batch of rows as a row group
+            :param self: The class instance
+            :type self: ParquetWriter
+            :param paths: the paths of the rows
+            :type paths: List
+            :param columns: the other columns of the rows
+            :type columns: List of array.array
+        """
+        pyarrow = self.pyarrow
+        arrays = [pyarrow.array(paths, pyarrow.string())]
+        arrays.extend(pyarrow.Array.from_buffers(
+            pyarrow.int64(), len(column), [None, pyarrow.py_buffer(column)])
+            for column in columns)
+        self.writer.write_table(
+            pyarrow.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        """
+            Closes the Parquet file
+        """
+        try:
+            self.writer.close()
+        finally:
+            self.file.close()
+
+
+class NpzWriter:
+
+    SUFFIX = '.npz'
+
+    def __init__(self, path, scan_metrics=None):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: NpzWriter
+            :param path: The path of the .npz file
+            :type path: Path or String
+            :param scan_metrics: The metrics counting the bytes written
+            :type scan_metrics: Metrics
+        """
+        import numpy
+
+        self.numpy = numpy
+        self.path = path
+        self.metrics = scan_metrics
+        self.path_data = bytearray()
+        self.path_offsets = array.array('q', [0])
+        self.columns = [array.array('q') for _ in COLUMNS[1:]]
+
+    def write(self, paths, columns):
+        """
+            Adds a batch of rows
+            :param self: The class instance
+            :type self: NpzWriter
+            :param paths: the paths of the rows
+            :type paths: List
+            :param columns: the other columns of the rows
+            :type columns: List of array.array
+        """
+        for path in paths:
+            self.path_data += os.fsencode(path)
+            self.path_offsets.append(len(self.path_data))
+        for column, batch in zip(self.columns, columns):
+            column.extend(batch)
+
+    def close(self):
+        """
+            Writes the .npz file
+        """
+        numpy = self.numpy
+        arrays = {name: numpy.frombuffer(column, numpy.int64)
+                  for name, column in zip(COLUMNS[1:], self.columns)}
+        with io.BufferedWriter(open_raw(self.path, self.metrics)) as f:
+            numpy.savez(f,
+                        path_data=numpy.frombuffer(self.path_data,
+                                                   numpy.uint8),
+                        path_offsets=numpy.frombuffer(self.path_offsets,
+                                                      numpy.int64),
+                        **arrays)
+
+
+def open_raw(path, scan_metrics=None):
+    """
+        Opens a binary file without buffer, '-' being a copy of the standard
+        output which can be closed. Its bytes are counted when metrics are
+        given
+    """
+    if str(path) == '-':
+        raw = os.fdopen(os.dup(sys.stdout.fileno()), 'wb', buffering=0)
+    else:
+        raw = open(path, 'wb', buffering=0)
+    if scan_metrics is None:
+        return raw
+    return metrics.CountedFile(raw, scan_metrics)
+
+
+def _gzip_writer(raw):
+    """
+        Returns a GzipFile compressing to a binary file, which is closed
+        with it
+    """
+    import gzip
+
+    class GzipWriter(gzip.GzipFile):
+        def close(self):
+            try:
+                super().close()
+            finally:
+                raw.close()
+
+    return GzipWriter(fileobj=raw, mode='wb', compresslevel=6)
+
+
+def open_text(path, compression=None, buffer_size=1024 * 1024,
+              scan_metrics=None):
+    """
+        Opens a text file for the CSV and NDJSON exports
+        :param path: the path of the file, or '-' for the standard output
+        :type path: Path or String
+        :param compression: None, 'gzip' or 'zstd'
+        :type compression: String
+        :param buffer_size: the size of the buffer of the file
+        :type buffer_size: int
+        :param scan_metrics: the metrics counting the bytes written, after
+                             their compression
+        :type scan_metrics: Metrics
+        :return: the file
+        :rtype: io.TextIOWrapper
+        :raise ImportError: zstd is asked and zstandard is not installed
+    """
+    if compression not in (None, 'gzip', 'zstd'):
+        raise ValueError(f'Unknown compression {compression}')
+    if compression == 'zstd':
+        import zstandard
+
+        raw = zstandard.ZstdCompressor().stream_writer(
+            open_raw(path, scan_metrics))
+    elif compression == 'gzip':
+        raw = _gzip_writer(open_raw(path, scan_metrics))
+    else:
+        raw = open_raw(path, scan_metrics)
+    # the names which are not utf-8 are written back as their bytes
+    return io.TextIOWrapper(io.BufferedWriter(raw, buffer_size),
+                            encoding='utf-8', errors='surrogateescape',
+                            newline='')
+
+
+class CsvWriter:
+
+    SUFFIX = '.csv'
+
+    def __init__(self, f):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: CsvWriter
+            :param f: The text file
+            :type f: io.TextIOWrapper
+        """
+        self.file = f
+        self.writer = csv.writer(f)
+        self.writer.writerow(COLUMNS)
+
+    def write(self, paths, columns):
+        """
+            Writes a batch of rows
+            :param self: The class instance
+            :type self: CsvWriter
+            :param paths: the paths of the rows
+            :type paths: List
+            :param columns: the other columns of the rows
+            :type columns: List of array.array
+        """
+        self.writer.writerows(zip(paths, *columns))
+
+    def close(self):
+        """
+            Closes the file
+        """
+        self.file.close()
+
+
+class NdjsonWriter:
+
+    SUFFIX = '.ndjson'
+
+    # The line of a row, the path being encoded by json
+    LINE = ('{"path": %s, ' +
+            ', '.join(f'"{name}": %d' for name in COLUMNS[1:]) + '}\n')
+
+    def __init__(self, f):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: NdjsonWriter
+            :param f: The text file
+            :type f: io.TextIOWrapper
+        """
+        self.file = f
+        # the names which are not utf-8 are escaped as \udcxx
+        self.encode = json.JSONEncoder().encode
+
+    def write(self, paths, columns):
+        """
+            Writes a batch of rows
+            :param self: The class instance
+            :type self: NdjsonWriter
+            :param paths: the paths of the rows
+            :type paths: List
+            :param columns: the other columns of the rows
+            :type columns: List of array.array
+        """
+        line = self.LINE
+        encode = self.encode
+        self.file.writelines(line % (encode(path), *values)
+                             for path, *values in zip(paths, *columns))
+
+    def close(self):
+        """
+            Closes the file
+        """
+        self.file.close()
+
+
+def column_writer(stem, scan_metrics=None):
+    """
+        Opens the columnar writer of the best installed library
+        :param stem: the path of the file, without its suffix
+        :type stem: Path
+        :param scan_metrics: the metrics counting the bytes written
+        :type scan_metrics: Metrics
+        :return: the writer
+        :rtype: ParquetWriter or NpzWriter
+        :raise ImportError: neither pyarrow nor numpy is installed
+    """
+    try:
+        return ParquetWriter(stem.with_name(stem.name + ParquetWriter.SUFFIX),
+                             scan_metrics)
+    except ImportError:
+        return NpzWriter(stem.with_name(stem.name + NpzWriter.SUFFIX),
+                         scan_metrics)
+
+
+def load_columns(path):
+    """
+        Loads the columns written by the columnar export
+        :param path: the path of the Parquet or .npz file
+        :type path: Path or String
+        :return: the columns by name, the paths being a list of strings
+        :rtype: Dict
+    """
+    if str(path).endswith(ParquetWriter.SUFFIX):
+        import pyarrow.parquet
+
+        table = pyarrow.parquet.read_table(str(path))
+        result = {name: table.column(name).to_numpy() for name in COLUMNS[1:]}
+        result['path'] = table.column('path').to_pylist()
+        return result
+    import numpy
+
+    with numpy.load(path) as data:
+        result = {name: data[name] for name in COLUMNS[1:]}
+        path_data = data['path_data'].tobytes()
+        offsets = data['path_offsets'].tolist()
+    result['path'] = [os.fsdecode(path_data[start:end])
+                      for start, end in zip(offsets, offsets[1:])]
+    return result
+
+
+class ColumnExporter:
+
+    # The number of rows given to the writer at once
+    BATCH_ROWS = 65536
+
+    def __init__(self, writer, batch_rows=None):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: ColumnExporter
+            :param writer: The writer of the batches
+            :type writer: ParquetWriter or NpzWriter
+            :param batch_rows: The number of rows of a batch
+            :type batch_rows: int
+        """
+        self.writer = writer
+        self.batch_rows = batch_rows or self.BATCH_ROWS
+        self.rows = 0
+        # the row ids of the sub-folders not visited yet, by path
+        self.ids = {}
+        self.paths = []
+        self.columns = [array.array('q') for _ in COLUMNS[1:]]
+
+    def add_top(self, path, stats):
+        """
+            Adds the row of the top folder of the scan
+            :param self: The class instance
+            :type self: ColumnExporter
+            :param path: the path of the top folder
+            :type path: String
+            :param stats: the stats of the top folder
+            :type stats: os.stat_result
+        """
+        self.ids[path] = self.rows
+        self.append([path], -1, records.Entries([(path, stats)]))
+
+    def add_folder(self, dirpath, dirs, files):
+        """
+            Adds the rows of the sub-folders and files of a folder
+            :param self: The class instance
+            :type self: ColumnExporter
+            :param dirpath: the path of the folder
+            :type dirpath: String
+            :param dirs: the entries of the sub-folders
+            :type dirs: Entries
+            :param files: the entries of the files
+            :type files: Entries
+        """
+        parent = self.ids.pop(dirpath, -1)
+        paths = [os.path.join(dirpath, name) for name in dirs.names]
+        for index, mode in enumerate(dirs.columns[_MODE]):
+            if stat.S_ISDIR(mode):
+                self.ids[paths[index]] = self.rows + index
+        self.append(paths, parent, dirs)
+        self.append([os.path.join(dirpath, name) for name in files.names],
+                    parent, files)
+
+    def append(self, paths, parent, entries):
+        """
+            Appends rows to the batch and writes it once full
+        """
+        self.paths.extend(paths)
+        self.columns[0].extend([parent] * len(paths))
+        for column, index in zip(self.columns[1:], _INDEXES):
+            # the columns of the Entries have their own typecodes
+            column.extend(entries.columns[index].tolist())
+        self.rows += len(paths)
+        if len(self.paths) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        """
+            Gives the rows of the batch to the writer
+        """
+        if self.paths:
+            self.writer.write(self.paths, self.columns)
+        self.paths = []
+        self.columns = [array.array('q') for _ in COLUMNS[1:]]
+
+    def close(self):
+        """
+            Writes the last batch and closes the writer
+        """
+        self.flush()
+        self.writer.close()
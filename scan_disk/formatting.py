@@ -0,0 +1,279 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Formats the stats of the folders and files for human reading.
+
+    The scan keeps the raw stats and the formatting is done at render time,
+    only for the folders which are actually rendered.
+
+    The entries of a folder are formatted column by column: the type and
+    the permissions are read in tables indexed by st_mode, and each date is
+    formatted once per folder, the three dates of an entry being often the
+    same.
+"""
+
+import datetime
+import stat
+
+import scan_disk.records as records
+
+# The keys of the information of a folder/file
+STAT_KEYS = ('type', 'droits', 'inode', 'dev', 'uid', 'gid', 'size',
+             'acces', 'modif', 'create')
+
+# The keys of the totals of the sub-tree of a folder/file
+TOTAL_KEYS = ('total', 'fichiers', 'blocs')
+
+# The labels of the file types, by stat.S_IFMT of st_mode
+FILE_TYPES = {stat.S_IFDIR: 'Rep ',
+              stat.S_IFREG: 'File ',
+              stat.S_IFLNK: 'Lien ',
+              stat.S_IFSOCK: 'Socket ',
+              stat.S_IFIFO: 'Fifo ',
+              stat.S_IFCHR: 'Car ',
+              stat.S_IFBLK: 'Bloc '}
+
+# The permissions of an owner, a group or the others, by octal digit
+RIGHTS = ('--- ', '--x ', '-w- ', '-wx ', 'r-- ', 'r-x ', 'rw- ', 'rwx ')
+
+# The permissions of the 512 values of st_mode & 0o777
+PERMISSIONS = tuple(RIGHTS[mode >> 6] + RIGHTS[mode >> 3 & 7] +
+                    RIGHTS[mode & 7] for mode in range(0o1000))
+
+# The type and permissions by st_mode, filled as the modes are met
+_modes = {}
+
+_COLUMNS = {field: index for index, field in enumerate(records.STAT_FIELDS)}
+
+
+class Formatter:
+
+    def __init__(self, logger):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: Formatter
+            :param logger: The logger file
+            :type logger: Logging
+        """
+        self.logger = logger
+
+    def format_entries(self, entries, totals=None):
+        """
+            Formats the entries of a folder with the totals of their
+            sub-tree
+            :param self: The class instance
+            :type self: Formatter
+            :param entries: the entries of the folder
+            :type entries: Entries
+            :param totals: the Totals of the sub-folders by name, None when
+                           the entries are files
+            :type totals: Dict
+            :return: the properties of the folders/files
+            :rtype: Dict
+        """
+        result = {}
+        for index, row in enumerate(self.format_rows(entries)):
+            result[entries.names[index]] = dict(zip(STAT_KEYS, row))
+            result[entries.names[index]].update(
+                self.format_entry_total(entries.entry(index), totals))
+        for name, error in entries.errors.items():
+            result[name] = {'error': error}
+        if not result:
+            result['null'] = None
+        return result
+
+    def format_entry_total(self, entry, totals):
+        """
+            Formats the totals of the sub-tree of a folder or file, they
+            are left empty for a folder whose sub-tree is not done
+            :param self: The class instance
+            :type self: Formatter
+            :param entry: the folder/file
+            :type entry: Entry
+            :param totals: the Totals of the sub-folders by name, None when
+                           the entry is a file
+            :type totals: Dict
+            :return: the totals of the folder/file
+            :rtype: Dict
+        """
+        if totals is None:
+            values = (self.format_size(entry.st_size), '1',
+                      str(entry.st_blocks))
+        else:
+            total = totals.get(entry.name)
+            if total is None or not total.done:
+                return dict.fromkeys(TOTAL_KEYS, '')
+            values = (self.format_size(total.size + entry.st_size),
+                      str(total.files),
+                      str(total.blocks + entry.st_blocks))
+        return dict(zip(TOTAL_KEYS, values))
+
+    def format_total(self, total):
+        """
+            Formats the totals of the sub-tree of a folder
+            :param self: The class instance
+            :type self: Formatter
+            :param total: the totals of the folder
+            :type total: Totals
+            :return: the totals human readable, None if they are not done
+            :rtype: String
+        """
+        if total is None or not total.done:
+            return None
+        return (f'{self.format_size(total.size)}, {total.files} fichiers, ' +
+                f'{total.blocks} blocs')
+
+    def format_size(self, size):
+        """
+            Formats a size in bytes
+            :param self: The class instance
+            :type self: Formatter
+            :param size: the size in bytes
+            :type size: int
+            :return: the size human readable
+            :rtype: String
+        """
+        return str(size//1024) + ' Ko' if size > 1024 else str(size) + ' o'
+
+    def format_rows(self, entries):
+        """
+            Formats the entries of a folder column by column, as rows of
+            STAT_KEYS. The entries which could not be stat'ed are left out
+            :param self: The class instance
+            :type self: Formatter
+            :param entries: the entries of the folder
+            :type entries: Entries
+            :return: the information of the folders/files, in the order of
+                     entries.names
+            :rtype: Iterator of Tuple
+        """
+        columns = entries.columns
+        modes = [decode_mode(mode) for mode in columns[_COLUMNS['st_mode']]]
+        dates = {}
+        times = [[dates[date] if date in dates
+                  else dates.setdefault(date, self.format_time(date))
+                  for date in columns[_COLUMNS[field]]]
+                 for field in ('st_atime', 'st_mtime', 'st_ctime')]
+        return zip([mode[0] for mode in modes],
+                   [mode[1] for mode in modes],
+                   map(str, columns[_COLUMNS['st_ino']]),
+                   map(str, columns[_COLUMNS['st_dev']]),
+                   map(str, columns[_COLUMNS['st_uid']]),
+                   map(str, columns[_COLUMNS['st_gid']]),
+                   map(self.format_size, columns[_COLUMNS['st_size']]),
+                   *times)
+
+    def format_stats(self, stats):
+        """
+            Formats the stats of a folder or file
+            :param self: The class instance
+            :type self: Formatter
+            :param stats: the result of a stat call
+            :type stats: os.stat_result
+            :return: the information of the folder/file
+            :rtype: Dict
+        """
+        return dict(zip(STAT_KEYS, self.format_row(stats)))
+
+    def format_row(self, stats):
+        """
+            Formats the stats of a folder or file as a row of STAT_KEYS
+            :param self: The class instance
+            :type self: Formatter
+            :param stats: the result of a stat call
+            :type stats: os.stat_result
+            :return: the information of the folder/file
+            :rtype: Tuple
+        """
+        mode = decode_mode(stats.st_mode)
+        return (mode[0],
+                mode[1],
+                str(stats.st_ino),
+                str(stats.st_dev),
+                str(stats.st_uid),
+                str(stats.st_gid),
+                self.format_size(stats.st_size),
+                self.format_time(int(stats.st_atime)),
+                self.format_time(int(stats.st_mtime)),
+                self.format_time(int(stats.st_ctime)))
+
+    def format_time(self, date_time):
+        """
+            formatted the datetime for human readable
+            :param self: The class instance
+            :type self: Formatter
+            :param date_time: the datetime to analyse
+            :type date_time: Datetime
+            :return: the date_time human readable
+            :rtype: String
+        """
+        formatted_date = None
+        try:
+            date = datetime.datetime.fromtimestamp(date_time)
+            formatted_date = date.isoformat(sep=' ')
+        except TypeError as error:
+            self.logger.error(error)
+            formatted_date = error
+        except OverflowError as error:
+            self.logger.error(error)
+            formatted_date = error
+        except Exception as error:
+            self.logger.error(error)
+            formatted_date = error
+        finally:
+            return formatted_date
+
+    def calcul_droit(self, mode):
+        """
+            calculate permissions for each folder or file
+            :param self: The class instance
+            :type self: Formatter
+            :param mode: the permissions in linux format
+            :type mode: String
+            :return: the permissions human readable
+            :rtype: String
+        """
+        droit = ''
+        try:
+            ftype = FILE_TYPES.get(stat.S_IFMT(int(mode[:len(mode)-3], 8)
+                                               << 9), 'Inconnu ')
+        except ValueError:
+            ftype = 'Inconnu '
+        for i in mode[len(mode)-3: len(mode)]:
+            if i == '7':
+                droit += 'rwx '
+            elif i == '6':
+                droit += 'rw- '
+            elif i == '5':
+                droit += 'r-x '
+            elif i == '4':
+                droit += 'r-- '
+            elif i == '3':
+                droit += '-wx '
+            elif i == '2':
+                droit += '-w- '
+            elif i == '1':
+                droit += '--x '
+            elif i == '0':
+                droit += '--- '
+            else:
+                droit += 'calcul invalide'
+        return ftype, droit
+
+
+def decode_mode(mode):
+    """
+        Returns the type and the permissions of a st_mode
+        :param mode: the st_mode of a folder/file
+        :type mode: int
+        :return: the type and the permissions human readable
+        :rtype: String, String
+    """
+    try:
+        return _modes[mode]
+    except KeyError:
+        return _modes.setdefault(mode, (
+            FILE_TYPES.get(stat.S_IFMT(mode), 'Inconnu '),
+            PERMISSIONS[mode & 0o777]))
@@ -0,0 +1,333 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Persistent index of the scans, to rescan a tree incrementally.
+
+    The entries of each folder are saved in a SQLite file, keyed by the
+    path of the folder and checked against its dev, inode, mtime and ctime.
+    On the next scan, a folder whose stats have not changed is not read
+    again: its cached entries are reused, only its sub-folders are stat'ed
+    to walk into them.
+
+    The mtime of a folder changes when an entry is added, removed or
+    renamed, not when the content of a file changes. The size and dates of
+    the files of an unchanged folder are those of the previous scan, a full
+    scan refreshes them.
+
+    Some file systems (FAT, NFS, some FUSE mounts) keep coarse timestamps:
+    a folder changed in the same tick as it was read keeps the same mtime.
+    The time of the read is saved as well, and a folder whose mtime or
+    ctime is not older than it by TIMESTAMP_NS is read again.
+
+    The entries are saved as plain data, not pickled, since the index is
+    also read by the report server: the names and the errors as JSON, the
+    columns as the raw bytes of their arrays. An index of another version
+    of the schema is emptied.
+"""
+
+import json
+import os
+import stat
+import time
+
+import scan_disk.records as records
+import scan_disk.utils as utils
+
+# The columns of the entries of a folder
+ENTRIES = ('dir_names, dir_columns, dir_errors, ' +
+           'file_names, file_columns, file_errors')
+
+
+class ScanIndex:
+
+    # The version of the schema, kept in the user_version of the file
+    SCHEMA_VERSION = 3
+
+    # The coarsest resolution of the timestamps, those of FAT, in ns
+    TIMESTAMP_NS = 2 * 10 ** 9
+
+    def __init__(self, path, logger, shared=False):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: ScanIndex
+            :param path: The path of the SQLite file
+            :type path: Path or String
+            :param logger: The logger file
+            :type logger: Logging
+            :param shared: The index is read by several threads, which
+                           take turns to use it
+            :type shared: bool
+        """
+        import sqlite3
+
+        self.path = path
+        self.logger = logger
+        self.connection = sqlite3.connect(str(path),
+                                          check_same_thread=not shared)
+        version = self.connection.execute('PRAGMA user_version').fetchone()
+        if version[0] != self.SCHEMA_VERSION:
+            self.connection.execute('DROP TABLE IF EXISTS folders')
+            self.connection.execute(
+                f'PRAGMA user_version = {self.SCHEMA_VERSION}')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS folders (
+                path TEXT PRIMARY KEY,
+                dev INTEGER,
+                ino INTEGER,
+                mtime_ns INTEGER,
+                ctime_ns INTEGER,
+                scanned_ns INTEGER,
+                generation INTEGER,
+                dir_names TEXT,
+                dir_columns BLOB,
+                dir_errors TEXT,
+                file_names TEXT,
+                file_columns BLOB,
+                file_errors TEXT)''')
+        row = self.connection.execute(
+            'SELECT MAX(generation) FROM folders').fetchone()
+        self.generation = (row[0] or 0) + 1
+
+    def lookup(self, dirpath, stats):
+        """
+            Returns the cached entries of a folder if it has not changed
+            :param self: The class instance
+            :type self: ScanIndex
+            :param dirpath: the path of the folder
+            :type dirpath: String
+            :param stats: the current stats of the folder
+            :type stats: os.stat_result
+            :return: the entries of the sub-folders and files, or None
+            :rtype: Entries, Entries
+        """
+        row = self.connection.execute(
+            'SELECT dev, ino, mtime_ns, ctime_ns, scanned_ns, ' + ENTRIES +
+            ' FROM folders WHERE path = ?', (dirpath,)).fetchone()
+        if row is None or row[:4] != self.key(stats):
+            return None
+        # the folder may have changed after its read in the same tick
+        if max(row[2], row[3]) >= row[4] - self.TIMESTAMP_NS:
+            return None
+        self.connection.execute(
+            'UPDATE folders SET generation = ? WHERE path = ?',
+            (self.generation, dirpath))
+        return load_entries(*row[5:8]), load_entries(*row[8:])
+
+    def entries(self, dirpath):
+        """
+            Returns the saved entries of a folder, without checking it
+            :param self: The class instance
+            :type self: ScanIndex
+            :param dirpath: the path of the folder
+            :type dirpath: String
+            :return: the entries of the sub-folders and files, or None
+            :rtype: Entries, Entries
+        """
+        row = self.connection.execute(
+            'SELECT ' + ENTRIES + ' FROM folders WHERE path = ?',
+            (dirpath,)).fetchone()
+        if row is None:
+            return None
+        return load_entries(*row[:3]), load_entries(*row[3:])
+
+    def top(self):
+        """
+            Returns the shortest path of the index, the top of its tree
+            :param self: The class instance
+            :type self: ScanIndex
+            :return: the path of the folder, None if the index is empty
+            :rtype: String
+        """
+        row = self.connection.execute(
+            'SELECT path FROM folders ORDER BY length(path), path '
+            'LIMIT 1').fetchone()
+        return None if row is None else row[0]
+
+    def store(self, dirpath, stats, scanned_ns, dirs, files):
+        """
+            Saves the entries of a folder
+            :param self: The class instance
+            :type self: ScanIndex
+            :param dirpath: the path of the folder
+            :type dirpath: String
+            :param stats: the current stats of the folder
+            :type stats: os.stat_result
+            :param scanned_ns: the time the folder was read from, in ns
+            :type scanned_ns: int
+            :param dirs: the entries of the sub-folders
+            :type dirs: Entries
+            :param files: the entries of the files
+            :type files: Entries
+        """
+        self.connection.execute(
+            'INSERT OR REPLACE INTO folders VALUES '
+            '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (dirpath, *self.key(stats), scanned_ns, self.generation,
+             *dump_entries(dirs), *dump_entries(files)))
+
+    def purge(self, top):
+        """
+            Removes the folders of a tree which were not seen by the scan
+            :param self: The class instance
+            :type self: ScanIndex
+            :param top: the path of the tree
+            :type top: String
+        """
+        prefix = top.rstrip(os.sep) + os.sep
+        self.connection.execute(
+            'DELETE FROM folders WHERE generation < ? '
+            'AND (path = ? OR substr(path, 1, ?) = ?)',
+            (self.generation, top, len(prefix), prefix))
+
+    def commit(self):
+        """
+            Writes the pending changes to the SQLite file
+        """
+        self.connection.commit()
+
+    def close(self):
+        """
+            Closes the SQLite file
+        """
+        self.connection.commit()
+        self.connection.close()
+
+    @staticmethod
+    def key(stats):
+        """
+            Returns the values checked to reuse the entries of a folder
+        """
+        return (stats.st_dev, stats.st_ino, stats.st_mtime_ns,
+                stats.st_ctime_ns)
+
+
+def dump_entries(entries):
+    """
+        Returns the entries of a folder as plain data
+        :param entries: the entries
+        :type entries: Entries
+        :return: the names as JSON, the bytes of the columns one after the
+                 other and the errno, message and file name of the errors
+                 as JSON
+        :rtype: String, bytes, String
+    """
+    return (json.dumps(entries.names),
+            b''.join(column.tobytes() for column in entries.columns),
+            json.dumps({name: [error.errno, error.strerror, error.filename]
+                        for name, error in entries.errors.items()}))
+
+
+def load_entries(names, columns, errors):
+    """
+        Rebuilds the entries of a folder saved by dump_entries
+        :param names: the names as JSON
+        :type names: String
+        :param columns: the bytes of the columns
+        :type columns: bytes
+        :param errors: the errors as JSON
+        :type errors: String
+        :return: the entries
+        :rtype: Entries
+    """
+    entries = records.Entries()
+    entries.names = json.loads(names)
+    start = 0
+    for column in entries.columns:
+        end = start + len(entries.names) * column.itemsize
+        column.frombytes(columns[start:end])
+        start = end
+    # OSError gives the subclass of the errno, PermissionError...
+    entries.errors = {name: OSError(*error)
+                      for name, error in json.loads(errors).items()}
+    return entries
+
+
+class IndexedWalker:
+
+    def __init__(self, walker, index, full=False):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: IndexedWalker
+            :param walker: The walker reading the changed folders
+            :type walker: Walker
+            :param index: The index of the previous scans
+            :type index: ScanIndex
+            :param full: Reads every folder, the index is only refreshed
+            :type full: bool
+        """
+        self.walker = walker
+        self.index = index
+        self.full = full
+        self.logger = walker.logger
+
+    def walk(self, top):
+        """
+            Walks the folder tree top-down in the same order as the walker,
+            reusing the cached entries of the unchanged folders.
+            The index is purged of the vanished folders once the whole tree
+            has been walked.
+            :param self: The class instance
+            :type self: IndexedWalker
+            :param top: the folder to walk
+            :type top: Path or String
+            :return: the folder path, the (name, stats) of its sub-folders
+                     and the (name, stats) of its files
+            :rtype: Generator of (String, List, List)
+        """
+        top = os.fspath(top)
+        rules = self.walker.rules
+        try:
+            if rules is not None:
+                rules.set_top(top)
+            stack = [(top, os.stat(top))]
+        except OSError as error:
+            self.walker.read_error(top, error)
+            return
+        try:
+            while stack:
+                dirpath, stats = stack.pop()
+                try:
+                    dirs, files = self.read(dirpath, stats)
+                except OSError as error:
+                    self.walker.read_error(dirpath, error)
+                    continue
+                yield dirpath, dirs, files
+                stack.extend(reversed([
+                    (os.path.join(dirpath, name), sub_stats)
+                    for name, sub_stats in dirs
+                    if not isinstance(sub_stats, OSError)
+                    and stat.S_ISDIR(sub_stats.st_mode)
+                    and (rules is None or rules.walk_dir(sub_stats))]))
+            self.index.purge(top)
+        finally:
+            self.index.commit()
+
+    def read(self, dirpath, stats):
+        """
+            Reads a folder, or reuses its cached entries if it has not
+            changed since the previous scan
+            :param self: The class instance
+            :type self: IndexedWalker
+            :param dirpath: the folder to read
+            :type dirpath: String
+            :param stats: the current stats of the folder
+            :type stats: os.stat_result
+            :return: the (name, stats) of the sub-folders and of the files
+            :rtype: List, List
+        """
+        cached = None if self.full else self.index.lookup(dirpath, stats)
+        if cached is None:
+            scanned_ns = time.time_ns()
+            dirs, files, _ = self.walker.scan(dirpath)
+            self.index.store(dirpath, stats, scanned_ns,
+                             records.Entries(dirs), records.Entries(files))
+            return dirs, files
+        self.logger.log(utils.PROGRESS,
+                        f'Le répertoire {dirpath} n\'a pas changé')
+        # the sub-folders are stat'ed again to check them in turn
+        dirs = [(name, self.walker.stat_path(os.path.join(dirpath, name)))
+                for name in cached[0]]
+        return dirs, list(cached[1].items())
@@ -0,0 +1,247 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Measures the phases of a scan and counts what it reads and writes.
+
+    Each phase sums the wall time and the CPU time of the thread it runs
+    in, so the phases run by the threads of the walker are summed over the
+    threads. The phases nest: stat is part of walk, format is part of
+    render. The walk is the time the scan waited for the walker, the stat
+    calls of the worker processes of a sharded scan are not measured.
+
+    The metrics are only gathered when a Metrics is given to the scan, the
+    timers of each stat call would slow it down otherwise.
+
+    The bytes written are counted by the files of the render, wrapped in a
+    CountedFile below their buffer and their compressor: they are the bytes
+    which reach the files or the standard output. The rows loaded in a
+    database are not counted.
+"""
+
+import contextlib
+import io
+import json
+import threading
+import time
+
+PHASES = ('walk', 'stat', 'format', 'render')
+COUNTERS = ('directories', 'files', 'errors', 'bytes_written')
+
+
+class Metrics:
+
+    def __init__(self):
+        """
+            Constructor, the wall and CPU times of the whole run are
+            measured from here
+            :param self: The class instance
+            :type self: Metrics
+        """
+        self.wall = dict.fromkeys(PHASES, 0.0)
+        self.cpu = dict.fromkeys(PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.extra = {}
+        self.lock = threading.Lock()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+
+    def add(self, phase, wall, cpu):
+        """
+            Adds the times spent in a phase
+            :param self: The class instance
+            :type self: Metrics
+            :param phase: the name of the phase
+            :type phase: String
+            :param wall: the wall time in seconds
+            :type wall: float
+            :param cpu: the CPU time in seconds
+            :type cpu: float
+        """
+        with self.lock:
+            self.wall[phase] += wall
+            self.cpu[phase] += cpu
+
+    def count(self, counter, n=1):
+        """
+            Adds n to a counter
+            :param self: The class instance
+            :type self: Metrics
+            :param counter: the name of the counter
+            :type counter: String
+            :param n: the number to add
+            :type n: int
+        """
+        with self.lock:
+            self.counters[counter] += n
+
+    @contextlib.contextmanager
+    def phase(self, phase):
+        """
+            Measures the block of a with statement as a phase
+            :param self: The class instance
+            :type self: Metrics
+            :param phase: the name of the phase
+            :type phase: String
+        """
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - wall,
+                     time.thread_time() - cpu)
+
+    def timed(self, iterable, phase):
+        """
+            Measures the time spent getting each item of an iterable
+            :param self: The class instance
+            :type self: Metrics
+            :param iterable: the items
+            :type iterable: Iterable
+            :param phase: the name of the phase
+            :type phase: String
+            :return: the items
+            :rtype: Generator
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(phase):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def as_dict(self):
+        """
+            Returns the metrics, as written in the JSON file
+            :param self: The class instance
+            :type self: Metrics
+            :return: the wall and CPU times of the run and of each phase,
+                     and the counters
+            :rtype: Dict
+        """
+        with self.lock:
+            return {'wall': time.perf_counter() - self.start_wall,
+                    'cpu': time.process_time() - self.start_cpu,
+                    'phases': {phase: {'wall': self.wall[phase],
+                                       'cpu': self.cpu[phase]}
+                               for phase in PHASES},
+                    'counters': dict(self.counters),
+                    **self.extra}
+
+    def write(self, path):
+        """
+            Writes the metrics in a JSON file
+            :param self: The class instance
+            :type self: Metrics
+            :param path: the path of the JSON file
+            :type path: Path or String
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.as_dict(), f, indent=2)
+            f.write('\n')
+
+    def log(self, logger):
+        """
+            Logs the metrics
+            :param self: The class instance
+            :type self: Metrics
+            :param logger: The logger file
+            :type logger: Logging
+        """
+        result = self.as_dict()
+        logger.info(f'Durée totale : {result["wall"]:.3f} s, ' +
+                    f'CPU : {result["cpu"]:.3f} s')
+        for phase, times in result['phases'].items():
+            logger.info(f'Phase {phase} : {times["wall"]:.3f} s, ' +
+                        f'CPU : {times["cpu"]:.3f} s')
+        counters = ', '.join(f'{name} : {value}'
+                             for name, value in result['counters'].items())
+        logger.info(f'Compteurs : {counters}')
+
+
+class CountedFile(io.RawIOBase):
+    """
+        A binary file whose written bytes are added to the bytes_written
+        counter of the metrics
+    """
+
+    def __init__(self, raw, metrics):
+        self.raw = raw
+        self.metrics = metrics
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        written = self.raw.write(data)
+        self.metrics.count('bytes_written',
+                           len(data) if written is None else written)
+        return written
+
+    def close(self):
+        if not self.closed:
+            try:
+                self.raw.close()
+            finally:
+                super().close()
+
+
+def phase(metrics, name):
+    """
+        Measures the block of a with statement as a phase, if there are
+        metrics to gather
+        :param metrics: the metrics of the scan or None
+        :type metrics: Metrics
+        :param name: the name of the phase
+        :type name: String
+        :return: the context manager measuring the phase
+        :rtype: ContextManager
+    """
+    if metrics is None:
+        return contextlib.nullcontext()
+    return metrics.phase(name)
+
+
+def profile(function, path, logger, metrics=None, lines=20):
+    """
+        Runs a function under cProfile and tracemalloc, the cProfile stats
+        are written to a file and the costliest calls and allocations are
+        logged
+        :param function: the function to run, without argument
+        :type function: Callable
+        :param path: the file of the cProfile stats, read by pstats
+        :type path: Path or String
+        :param logger: The logger file
+        :type logger: Logging
+        :param metrics: the metrics given the peak of the traced memory
+        :type metrics: Metrics
+        :param lines: the number of calls and allocations logged
+        :type lines: int
+        :return: the result of the function
+    """
+    import cProfile
+    import pstats
+    import tracemalloc
+
+    profiler = cProfile.Profile()
+    tracemalloc.start()
+    profiler.enable()
+    try:
+        return function()
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        profiler.dump_stats(str(path))
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats(
+            'cumulative').print_stats(lines)
+        logger.info(f'Profil écrit dans {path}\n{stream.getvalue()}')
+        logger.info(f'Pic de mémoire allouée : {peak / 2**20:.1f} Mo')
+        for stat in snapshot.statistics('lineno')[:lines]:
+            logger.info(f'Allocation : {stat}')
+        if metrics is not None:
+            metrics.extra['peak_traced_mb'] = peak / 2**20
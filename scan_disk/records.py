@@ -0,0 +1,216 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Compact records of the folders and files found by the scan.
+
+    The entries of a folder are stored as columns of raw integers, one array
+    per stat field, instead of one dict of strings per entry. The formatting
+    is left to the render (see scan_disk.formatting).
+
+    The Totals of a folder sum the size, the number of files and the
+    allocated blocks of its whole sub-tree. They also stand for the entries
+    of a folder which are only counted, not kept (see Totals.of_stats).
+"""
+
+import array
+import collections.abc
+
+# The stat fields kept for each entry and the typecode of their column
+STAT_FIELDS = ('st_mode', 'st_ino', 'st_dev', 'st_uid', 'st_gid', 'st_size',
+               'st_atime', 'st_mtime', 'st_ctime', 'st_blocks', 'st_nlink')
+TYPECODES = ('I', 'Q', 'Q', 'I', 'I', 'Q', 'q', 'q', 'q', 'Q', 'I')
+
+
+class Entry:
+    """
+        A folder or file with its raw stats, it has the same attributes as
+        an os.stat_result so it can be formatted like one
+    """
+
+    __slots__ = ('name',) + STAT_FIELDS
+
+    def __init__(self, name, *values):
+        self.name = name
+        for field, value in zip(STAT_FIELDS, values):
+            setattr(self, field, value)
+
+    def __eq__(self, other):
+        if not isinstance(other, Entry):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field)
+                   for field in self.__slots__)
+
+    def __repr__(self):
+        return f'Entry({self.name!r}, size={self.st_size})'
+
+
+class Entries(collections.abc.Mapping):
+    """
+        The entries of a folder, stored as columns of raw integers.
+        It is a mapping of the names to the Entry, or to the OSError raised
+        when the entry could not be stat'ed.
+    """
+
+    __slots__ = ('names', 'columns', 'errors')
+
+    def __init__(self, entries=()):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: Entries
+            :param entries: the (name, stats) given by the walker
+            :type entries: Iterable
+        """
+        self.names = []
+        self.columns = tuple(array.array(typecode) for typecode in TYPECODES)
+        self.errors = {}
+        for name, stats in entries:
+            self.append(name, stats)
+
+    def append(self, name, stats):
+        """
+            Adds an entry
+            :param self: The class instance
+            :type self: Entries
+            :param name: the name of the folder/file
+            :type name: String
+            :param stats: the stats of the folder/file or the error raised
+            :type stats: os.stat_result or OSError
+        """
+        if isinstance(stats, OSError):
+            self.errors[name] = stats
+            return
+        self.names.append(name)
+        for column, field in zip(self.columns, STAT_FIELDS):
+            # st_blocks does not exist on Windows
+            column.append(int(getattr(stats, field, 0)))
+
+    def entry(self, index):
+        """
+            Returns the entry at an index of the columns
+            :param self: The class instance
+            :type self: Entries
+            :param index: the index of the entry
+            :type index: int
+            :return: the entry
+            :rtype: Entry
+        """
+        return Entry(self.names[index],
+                     *(column[index] for column in self.columns))
+
+    def __getitem__(self, name):
+        if name in self.errors:
+            return self.errors[name]
+        try:
+            return self.entry(self.names.index(name))
+        except ValueError:
+            raise KeyError(name) from None
+
+    def __iter__(self):
+        yield from self.names
+        yield from self.errors
+
+    def __len__(self):
+        return len(self.names) + len(self.errors)
+
+    def items(self):
+        for index in range(len(self.names)):
+            yield self.names[index], self.entry(index)
+        yield from self.errors.items()
+
+    def __reduce__(self):
+        return (_rebuild_entries, (self.names, self.columns, self.errors))
+
+
+class Totals:
+    """
+        The size, number of files and allocated blocks of the sub-tree of a
+        folder. The stats of the folder itself are counted in its parent.
+        done is set once the whole sub-tree has been read.
+    """
+
+    __slots__ = ('size', 'files', 'blocks', 'done')
+
+    def __init__(self, size=0, files=0, blocks=0):
+        self.size = size
+        self.files = files
+        self.blocks = blocks
+        self.done = False
+
+    @classmethod
+    def of_stats(cls, entries, files=False):
+        """
+            Sums the entries given by the walker without keeping them
+            :param cls: The Totals class
+            :type cls: type
+            :param entries: the (name, stats) of the folders/files
+            :type entries: List
+            :param files: the entries are files, they are counted
+            :type files: bool
+            :return: the totals of the entries
+            :rtype: Totals
+        """
+        result = cls()
+        for _, stats in entries:
+            if isinstance(stats, OSError):
+                continue
+            result.size += stats.st_size
+            # st_blocks does not exist on Windows
+            result.blocks += getattr(stats, 'st_blocks', 0)
+            result.files += files
+        return result
+
+    def add_entries(self, dirs, files):
+        """
+            Adds the entries read in the folder
+            :param self: The class instance
+            :type self: Totals
+            :param dirs: the entries of the sub-folders, or their totals
+            :type dirs: Entries or Totals
+            :param files: the entries of the files, or their totals
+            :type files: Entries or Totals
+        """
+        size = STAT_FIELDS.index('st_size')
+        blocks = STAT_FIELDS.index('st_blocks')
+        for entries in (dirs, files):
+            if isinstance(entries, Totals):
+                self.add(entries)
+                continue
+            self.size += sum(entries.columns[size])
+            self.blocks += sum(entries.columns[blocks])
+        if not isinstance(files, Totals):
+            self.files += len(files.names)
+
+    def add(self, other):
+        """
+            Adds the totals of a sub-folder
+            :param self: The class instance
+            :type self: Totals
+            :param other: the totals of the sub-folder
+            :type other: Totals
+        """
+        self.size += other.size
+        self.files += other.files
+        self.blocks += other.blocks
+
+    def __eq__(self, other):
+        if not isinstance(other, Totals):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field)
+                   for field in self.__slots__)
+
+    def __repr__(self):
+        return (f'Totals(size={self.size}, files={self.files}, ' +
+                f'blocks={self.blocks})')
+
+
+def _rebuild_entries(names, columns, errors):
+    """
+        Rebuilds the Entries sent by a worker process
+    """
+    entries = Entries()
+    entries.names = names
+    entries.columns = columns
+    entries.errors = errors
+    return entries
@@ -0,0 +1,184 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    The rules selecting the folders and files of a scan.
+
+    The rules are checked by the walker on the stats it already has, before
+    a folder is walked into, so an excluded sub-tree is never read:
+    - exclude: glob patterns of the folders and files to skip, matched
+      against the name, or against the whole path when they hold a '/'
+    - exclude_regex: regular expressions searched in the whole path
+    - include: glob patterns of the files to keep, the folders are walked
+      into whatever their name
+    - min_size, max_size: the bounds of the size of the files, in bytes
+    - newer_than, older_than: the bounds of the age of the files, from
+      their mtime, in days
+    - one_file_system: the folders of another file system than the top
+      folder are listed but not walked into
+
+    The size and age bounds only apply to the regular files. The patterns
+    are compiled once into a single regular expression per kind.
+"""
+
+import fnmatch
+import os
+import re
+import stat
+import time
+
+# The keys of the rules in the YAML file
+KEYS = ('exclude', 'exclude_regex', 'include', 'min_size', 'max_size',
+        'newer_than', 'older_than', 'one_file_system')
+
+
+def compile_globs(patterns):
+    """
+        Compiles glob patterns into a regular expression matching any of
+        them, or None when there is no pattern
+    """
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{fnmatch.translate(pattern)})'
+                               for pattern in patterns))
+
+
+class Rules:
+
+    def __init__(self, exclude=(), exclude_regex=(), include=(),
+                 min_size=None, max_size=None, newer_than=None,
+                 older_than=None, one_file_system=False):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: Rules
+            :param exclude: the glob patterns of the folders and files to
+                            skip
+            :type exclude: List
+            :param exclude_regex: the regular expressions of the paths to
+                                  skip
+            :type exclude_regex: List
+            :param include: the glob patterns of the files to keep
+            :type include: List
+            :param min_size: the minimum size of the files, in bytes
+            :type min_size: int
+            :param max_size: the maximum size of the files, in bytes
+            :type max_size: int
+            :param newer_than: the maximum age of the files, in days
+            :type newer_than: float
+            :param older_than: the minimum age of the files, in days
+            :type older_than: float
+            :param one_file_system: does not walk into the folders of
+                                    another file system than the top folder
+            :type one_file_system: bool
+        """
+        exclude = list(exclude or ())
+        self.exclude_names = compile_globs(
+            [pattern for pattern in exclude if '/' not in pattern])
+        self.exclude_paths = compile_globs(
+            [pattern for pattern in exclude if '/' in pattern])
+        self.exclude_regex = (re.compile('|'.join(f'(?:{regex})'
+                                                  for regex in exclude_regex))
+                              if exclude_regex else None)
+        self.include = compile_globs(list(include or ()))
+        self.min_size = min_size
+        self.max_size = max_size
+        now = time.time()
+        self.min_mtime = now - newer_than * 86400 if newer_than else None
+        self.max_mtime = now - older_than * 86400 if older_than else None
+        self.one_file_system = one_file_system
+        # the device of the top folder, for one_file_system
+        self.device = None
+
+    @classmethod
+    def from_dict(cls, config, **overrides):
+        """
+            Creates the rules of a dict loaded from a YAML file, with the
+            overrides given on the command line: their patterns are added
+            to the ones of the file, their other values replace them
+            :param cls: The Rules class
+            :type cls: type
+            :param config: the rules by key, see KEYS
+            :type config: Dict
+            :param overrides: the rules of the command line, the None
+                              values are ignored, 0 and False replace the
+                              values of the file
+            :type overrides: Dict
+            :return: the rules
+            :rtype: Rules
+            :raise ValueError: the config holds an unknown key or is an
+                               error of utils.yaml_to_dict
+        """
+        config = dict(config or {})
+        if 'erreur' in config:
+            raise ValueError(f'Invalid rules: {config["erreur"]}')
+        unknown = set(config) - set(KEYS)
+        if unknown:
+            raise ValueError(f'Unknown rules: {", ".join(sorted(unknown))}')
+        for key, value in overrides.items():
+            if isinstance(value, list):
+                config[key] = list(config.get(key) or ()) + value
+            elif value is not None:
+                config[key] = value
+        return cls(**config)
+
+    def set_top(self, top):
+        """
+            Sets the top folder of the scan, when it is not set yet
+            :param self: The class instance
+            :type self: Rules
+            :param top: the top folder
+            :type top: Path or String
+        """
+        if self.one_file_system and self.device is None:
+            self.device = os.stat(top).st_dev
+
+    def excluded(self, path, name):
+        """
+            Returns True if a folder or file is excluded by its name or
+            path, it is checked before the entry is stat'ed
+            :param self: The class instance
+            :type self: Rules
+            :param path: the path of the folder/file
+            :type path: String
+            :param name: the name of the folder/file
+            :type name: String
+            :rtype: bool
+        """
+        return bool(
+            (self.exclude_names and self.exclude_names.match(name)) or
+            (self.exclude_paths and self.exclude_paths.match(path)) or
+            (self.exclude_regex and self.exclude_regex.search(path)))
+
+    def walk_dir(self, stats):
+        """
+            Returns True if a listed folder is walked into
+            :param self: The class instance
+            :type self: Rules
+            :param stats: the stats of the folder or the error raised
+            :type stats: os.stat_result or OSError
+            :rtype: bool
+        """
+        return (self.device is None or isinstance(stats, OSError) or
+                stats.st_dev == self.device)
+
+    def keep_file(self, name, stats):
+        """
+            Returns True if a file which is not excluded is listed
+            :param self: The class instance
+            :type self: Rules
+            :param name: the name of the file
+            :type name: String
+            :param stats: the stats of the file or the error raised
+            :type stats: os.stat_result or OSError
+            :rtype: bool
+        """
+        if self.include and not self.include.match(name):
+            return False
+        if isinstance(stats, OSError) or not stat.S_ISREG(stats.st_mode):
+            return True
+        return not (
+            (self.min_size is not None and stats.st_size < self.min_size) or
+            (self.max_size is not None and stats.st_size > self.max_size) or
+            (self.min_mtime is not None and stats.st_mtime < self.min_mtime) or
+            (self.max_mtime is not None and stats.st_mtime > self.max_mtime))
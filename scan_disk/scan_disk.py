@@ -9,9 +9,18 @@
 import os
 import sys
 import pathlib
-import datetime
+import logging
+import concurrent.futures
 import scan_disk.utils as utils
 import scan_disk.scan_render as render
+import scan_disk.walker as walker
+import scan_disk.records as records
+import scan_disk.formatting as formatting
+import scan_disk.index as index
+import scan_disk.top as top
+import scan_disk.duplicates as duplicates
+import scan_disk.diff as diff
+import scan_disk.metrics as metrics
 
 project_path = pathlib.Path(__file__).resolve().parents[1]
 
@@ -24,16 +33,92 @@ class Repertoire():
        Create a class to construct the result
     """
 
-    def __init__(self, name, repe, file):
+    def __init__(self, name, repe, file, total=None):
         self.name = name
         self.repe = repe
         self.file = file
+        self.total = total
+
+
+# The ScanDisk instance of a worker process of the sharded scan
+_shard_scan = None
+
+
+def init_shard(workers, rules=None, max_depth=None, summary=False,
+               records=None):
+    """
+        Initializes a worker process of the sharded scan
+        :param workers: The number of threads reading the folders
+        :type workers: int
+        :param rules: The rules selecting the folders and files
+        :type rules: Rules
+        :param max_depth: The depth below which the folders are only summed
+        :type max_depth: int
+        :param summary: The files are only summed
+        :type summary: bool
+        :param records: The queue of the log records, written by the
+                        listener of the scan process
+        :type records: multiprocessing.Queue
+    """
+    global _shard_scan
+    if records is not None:
+        utils.log_to_queue(records)
+    _shard_scan = ScanDisk(None, None, logging.getLogger('flogger'),
+                           workers=workers, rules=rules, max_depth=max_depth,
+                           summary=summary)
+
+
+def folder_depth(top, dirpath):
+    """
+        Returns the depth of a folder below the top folder of a walk
+        :param top: the top folder
+        :type top: String
+        :param dirpath: the folder
+        :type dirpath: String
+        :return: the depth, 0 for the top folder
+        :rtype: int
+    """
+    if dirpath == top:
+        return 0
+    return dirpath[len(top.rstrip(os.sep)):].count(os.sep)
+
+
+def read_shard(top):
+    """
+        Reads a whole sub-tree in a worker process of the sharded scan
+        :param top: the sub-tree to read
+        :type top: String
+        :return: the folder path and the entries of its sub-folders and
+                 files, for each folder of the sub-tree
+        :rtype: List of (String, Entries, Entries)
+    """
+    result = []
+    for dirpath, dirs, files in _shard_scan.walker.walk(top):
+        _shard_scan.logger.log(utils.PROGRESS,
+                               f'Lecture du repertoire {dirpath}')
+        # the sub-trees of the workers start at SPLIT_DEPTH
+        result.append((dirpath, *_shard_scan.search_folder(
+            dirs, files, ScanDisk.SPLIT_DEPTH + folder_depth(top, dirpath))))
+    return result
 
 
 class ScanDisk:
 
+    # The engines available to walk the folders
+    ENGINES = ('scandir', 'walk')
+
+    # The formats of the output file
+    FORMATS = ('html', 'columns', 'csv', 'ndjson', 'database')
+
+    # The depth from which the sub-trees are read by the worker processes
+    SPLIT_DEPTH = 2
+
     @classmethod
-    def make(cls, directory, output):
+    def make(cls, directory, output, engine='scandir', workers=1,
+             processes=1, stream=False, index_path=None, full=False,
+             render_options=None, top_n=None, find_duplicates=False,
+             output_format='html', diff_paths=None, rules=None,
+             max_depth=None, summary=False, scan_metrics=None):
         """
             Creates a class instance.
 
@@ -43,6 +128,39 @@ class ScanDisk:
             :type directory: Path
             :param output: The name of the output file
             :type output: String
+            :param engine: The engine used to walk the folders
+            :type engine: String
+            :param workers: The number of threads reading the folders
+            :type workers: int
+            :param processes: The number of processes reading the sub-trees
+            :type processes: int
+            :param stream: Writes each folder to the html file as soon as
+                           it is read
+            :type stream: bool
+            :param index_path: The SQLite file of the previous scans
+            :type index_path: Path
+            :param full: Reads every folder even if it has not changed
+            :type full: bool
+            :param render_options: The options of the ScanRender
+            :type render_options: Dict
+            :param top_n: Renders only the top_n largest files and folders
+            :type top_n: int
+            :param find_duplicates: Renders only the hard links and the
+                                    duplicated files
+            :type find_duplicates: bool
+            :param output_format: The format of the output file
+            :type output_format: String
+            :param diff_paths: Renders the changes between the two exported
+                               scans instead of scanning the folder
+            :type diff_paths: Tuple
+            :param rules: The rules selecting the folders and files
+            :type rules: Rules
+            :param max_depth: Renders only the folders down to this depth
+            :type max_depth: int
+            :param summary: Renders only the folders, without their files
+            :type summary: bool
+            :param scan_metrics: The metrics gathered during the run
+            :type scan_metrics: Metrics
             :returns: An instance of the class
             :rtype: ScanDisk
         """
@@ -55,9 +173,29 @@ class ScanDisk:
 
         return cls(directory=directory,
                    output=output,
-                   logger=logger)
+                   logger=logger,
+                   engine=engine,
+                   workers=workers,
+                   processes=processes,
+                   stream=stream,
+                   index_path=index_path,
+                   full=full,
+                   render_options=render_options,
+                   top_n=top_n,
+                   find_duplicates=find_duplicates,
+                   output_format=output_format,
+                   diff_paths=diff_paths,
+                   rules=rules,
+                   max_depth=max_depth,
+                   summary=summary,
+                   scan_metrics=scan_metrics)
 
-    def __init__(self, directory, output, logger):
+    def __init__(self, directory, output, logger, engine='scandir',
+                 workers=1, processes=1, stream=False, index_path=None,
+                 full=False, render_options=None, top_n=None,
+                 find_duplicates=False, output_format='html',
+                 diff_paths=None, rules=None, max_depth=None,
+                 summary=False, scan_metrics=None):
         """
             Constructor
             :param self: The class instance
@@ -68,10 +206,144 @@ class ScanDisk:
             :type output: String
             :param logger: The logger file
             :type logger: Logging
+            :param engine: The engine used to walk the folders, 'scandir'
+                           or 'walk'
+            :type engine: String
+            :param workers: The number of threads reading the folders, only
+                            the scandir engine can use several threads
+            :type workers: int
+            :param processes: The number of processes reading the sub-trees
+                              below SPLIT_DEPTH, only the scandir engine can
+                              use several processes
+            :type processes: int
+            :param stream: Writes each folder to the html file as soon as
+                           it is read, instead of reading the whole folder
+                           first
+            :type stream: bool
+            :param index_path: The SQLite file where the scans are saved,
+                               the folders which have not changed since the
+                               previous scan are not read again. The indexed
+                               scan reads one folder at a time in a single
+                               thread and only the scandir engine can use
+                               it. The index is closed at the end of run
+            :type index_path: Path
+            :param full: Reads every folder even if it has not changed, the
+                         index is only refreshed
+            :type full: bool
+            :param render_options: The options given to the ScanRender,
+                                   like external_js
+            :type render_options: Dict
+            :param top_n: Renders only the top_n largest files and folders,
+                          without keeping the scan of the whole folder. Only
+                          the scandir engine can use it
+            :type top_n: int
+            :param find_duplicates: Renders only the hard links and the
+                                    duplicated files, hashed by the workers
+                                    threads. Only the scandir engine can use
+                                    it
+            :type find_duplicates: bool
+            :param output_format: The format of the output file, 'html',
+                                  'columns', 'csv' or 'ndjson'. The other
+                                  formats than html stream the scan and only
+                                  the scandir engine can write them
+            :type output_format: String
+            :param diff_paths: The csv or ndjson exports of an old and a new
+                               scan, their changes are rendered instead of
+                               scanning the folder. The top_n largest
+                               changes of each kind are listed, 100 by
+                               default
+            :type diff_paths: Tuple
+            :param rules: The rules selecting the folders and files, the
+                          excluded folders are not walked into. Only the
+                          scandir engine can use them. The index keeps the
+                          entries selected by the rules of the scan which
+                          stored them, a full scan applies new rules
+            :type rules: Rules
+            :param max_depth: Keeps only the folders down to this depth, the
+                              top folder being at depth 0. The deeper
+                              folders are still walked, their entries are
+                              only summed in the totals of their parents.
+                              Only the html render of the scandir engine
+                              can use it
+            :type max_depth: int
+            :param summary: Keeps only the sub-folders of each folder, its
+                            files are only summed in its totals. Only the
+                            html render of the scandir engine can use it
+            :type summary: bool
+            :param scan_metrics: The metrics gathered during the run, the
+                                 phases are only timed when it is given
+            :type scan_metrics: Metrics
         """
+        if engine not in self.ENGINES:
+            raise ValueError(f'Unknown engine {engine}')
+        if workers < 1:
+            raise ValueError(f'Invalid number of workers {workers}')
+        if processes < 1:
+            raise ValueError(f'Invalid number of processes {processes}')
+        if (workers > 1 or processes > 1) and engine != 'scandir':
+            raise ValueError(f'The {engine} engine can not use several workers')
+        if index_path and (engine != 'scandir' or processes > 1 or
+                           workers > 1):
+            raise ValueError('The index can only be used by the scandir ' +
+                             'engine in a single thread')
+        if top_n is not None and top_n < 1:
+            raise ValueError(f'Invalid number of top entries {top_n}')
+        if top_n and engine != 'scandir':
+            raise ValueError('The top can only be read by the scandir engine')
+        if find_duplicates and (engine != 'scandir' or top_n):
+            raise ValueError('The duplicates can only be read by the ' +
+                             'scandir engine, without the top')
+        if output_format not in self.FORMATS:
+            raise ValueError(f'Unknown format {output_format}')
+        if output_format != 'html' and (engine != 'scandir' or top_n or
+                                        find_duplicates):
+            raise ValueError(f'The {output_format} format can only be ' +
+                             'written by the scandir engine, without the ' +
+                             'top nor the duplicates')
+        if output_format == 'database' and not (
+                render_options or {}).get('database'):
+            raise ValueError('The database format needs the configuration ' +
+                             'of the database')
+        if rules is not None and engine != 'scandir':
+            raise ValueError('The rules can only be used by the scandir ' +
+                             'engine')
+        if (max_depth is not None or summary) and (
+                engine != 'scandir' or output_format != 'html' or top_n or
+                find_duplicates):
+            raise ValueError('The depth and the summary can only be ' +
+                             'rendered in html by the scandir engine, ' +
+                             'without the top nor the duplicates')
+        if max_depth is not None and max_depth < 0:
+            raise ValueError(f'Invalid depth {max_depth}')
+        if diff_paths and (find_duplicates or output_format != 'html'):
+            raise ValueError('The diff is only rendered in html, without ' +
+                             'the duplicates')
         self.directory = directory
         self.output = output
         self.logger = logger
+        self.formatter = formatting.Formatter(logger)
+        self.engine = engine
+        self.workers = workers
+        self.processes = processes
+        self.stream = stream
+        self.render_options = render_options or {}
+        self.top = top_n
+        self.find_duplicates = find_duplicates
+        self.output_format = output_format
+        self.diff_paths = diff_paths
+        self.rules = rules
+        self.max_depth = max_depth
+        self.summary = summary
+        self.metrics = scan_metrics
+        if workers > 1:
+            self.walker = walker.ThreadedWalker(logger, workers, rules=rules,
+                                                metrics=scan_metrics)
+        else:
+            self.walker = walker.Walker(logger, rules, scan_metrics)
+        self.index = index.ScanIndex(index_path, logger) if index_path \
+            else None
+        if self.index is not None:
+            self.walker = index.IndexedWalker(self.walker, self.index, full)
 
         self.logger.info('********** Initialisation du programme **********')
         self.logger.info('******* Fin d\'initialisation du programme *******')
@@ -97,19 +369,8 @@ des fichiers demandés.\n\
         """
         result = {}
         try:
-            if name.is_dir():
-                file_list = os.walk(name)
-                for dirpath, dirname, filename in file_list:
-                    self.logger.info(f'Lecture du repertoire {dirpath}')
-                    self.logger.info('Lecture des sous-répertoires')
-                    sous_rep = self.search_data(dirname, dirpath)
-                    self.logger.info('Lecture des fichiers')
-                    fichier = self.search_data(filename, dirpath)
-                    self.logger.info('Construction du dictionnaire')
-                    repe = Repertoire(dirpath, sous_rep, fichier)
-                    result[dirpath] = repe.__dict__
-            else:
-                raise NotADirectoryError
+            for repe in self.iter_directory(name):
+                result[repe['name']] = repe
         except NotADirectoryError:
             self.logger.error(f'{name} n\'est pas un répertoire valide')
             result[str(name)] = 'The name you enter is not a directory'
@@ -120,6 +381,289 @@ des fichiers demandés.\n\
             self.logger.info('Fin de l\'analyse du répertoire')
             return result
 
+    def iter_directory(self, name, on_close=None):
+        """
+            Reads the folder one sub-folder at a time, so that only the
+            sub-folder being read is held in memory.
+            The totals of each sub-folder are summed in the same pass: a
+            sub-folder is done when the walk leaves its sub-tree, its totals
+            are then added to its parent. They are complete once the whole
+            sub-tree has been read, after the sub-folder has been yielded
+            :param self: The class instance
+            :type self: Scan_disk
+            :param name: the name of the folder to scan
+            :type name: Path
+            :param on_close: called with the path and the totals of each
+                             sub-folder when they are done
+            :type on_close: Callable
+            :return: The result of the scan of each sub-folder
+            :rtype: Generator of Dict
+        """
+        if not name.is_dir():
+            raise NotADirectoryError
+        # the (path prefix, path, totals, totals of the sub-folders to
+        # keep) of the sub-folders being read
+        stack = []
+        folders = self.walk_directory(name)
+        if self.metrics is not None:
+            folders = self.metrics.timed(folders, 'walk')
+        for dirpath, sous_rep, fichier in folders:
+            self.logger.debug('Construction du dictionnaire')
+            if self.metrics is not None:
+                self.count_folder(fichier)
+            total = None
+            sub_totals = None
+            if not isinstance(fichier, dict):
+                while stack and not dirpath.startswith(stack[-1][0]):
+                    self.close_total(stack, on_close)
+                total = records.Totals()
+                total.add_entries(sous_rep, fichier)
+                if self.max_depth == len(stack):
+                    # its sub-folders are not kept, only their totals
+                    sub_totals = {}
+                stack.append((os.path.join(dirpath, ''), dirpath, total,
+                              sub_totals))
+            if isinstance(sous_rep, records.Totals):
+                # below max_depth
+                continue
+            repe = Repertoire(dirpath, sous_rep, fichier, total)
+            if sub_totals is not None:
+                repe.sub_totals = sub_totals
+            yield repe.__dict__
+        while stack:
+            self.close_total(stack, on_close)
+
+    def count_folder(self, files):
+        """
+            Counts a folder and its files in the metrics
+            :param self: The class instance
+            :type self: Scan_disk
+            :param files: the files of the folder
+            :type files: Entries, Totals or Dict
+        """
+        self.metrics.count('directories')
+        if isinstance(files, records.Totals):
+            self.metrics.count('files', files.files)
+        elif isinstance(files, records.Entries):
+            self.metrics.count('files', len(files.names))
+        else:
+            self.metrics.count('files', len(files.keys() - {'null'}))
+
+    def close_total(self, stack, on_close=None):
+        """
+            Marks the totals of the last sub-folder read as done and adds
+            them to its parent
+            :param self: The class instance
+            :type self: Scan_disk
+            :param stack: the (path prefix, path, totals, totals of the
+                          sub-folders to keep) of the sub-folders being
+                          read
+            :type stack: List
+            :param on_close: called with the path and the totals of the
+                             sub-folder
+            :type on_close: Callable
+        """
+        _, dirpath, total, _ = stack.pop()
+        total.done = True
+        if stack:
+            stack[-1][2].add(total)
+            if stack[-1][3] is not None:
+                stack[-1][3][os.path.basename(dirpath)] = total
+        if on_close:
+            on_close(dirpath, total)
+
+    def read_top(self, name, n):
+        """
+            Reads the folder and keeps only its n largest files and
+            sub-folders, the sub-folders being sized by their whole
+            sub-tree. The scan of each sub-folder is dropped once read
+            :param self: The class instance
+            :type self: Scan_disk
+            :param name: the name of the folder to scan
+            :type name: Path
+            :param n: the number of files and of sub-folders to keep
+            :type n: int
+            :return: the (size, path) of the largest files and the
+                     (size, path, files, blocks) of the largest sub-folders
+            :rtype: List, List
+        """
+        top_files = top.TopN(n)
+        top_dirs = top.TopN(n)
+        size = records.STAT_FIELDS.index('st_size')
+        for folder in self.iter_directory(
+                name,
+                lambda dirpath, total: top_dirs.push(
+                    total.size, dirpath, total.files, total.blocks)):
+            for file_name, file_size in zip(folder['file'].names,
+                                            folder['file'].columns[size]):
+                top_files.push(file_size,
+                               os.path.join(folder['name'], file_name))
+        return top_files.largest(), top_dirs.largest()
+
+    def read_duplicates(self, name):
+        """
+            Reads the folder and finds its hard links and duplicated files.
+            Only the paths of the regular files are kept, the contents are
+            hashed once the whole folder has been read
+            :param self: The class instance
+            :type self: Scan_disk
+            :param name: the name of the folder to scan
+            :type name: Path
+            :return: the (size, paths) of the groups of hard links and of
+                     the groups of duplicated files
+            :rtype: List, List
+        """
+        finder = duplicates.DuplicateFinder(self.logger,
+                                            workers=max(self.workers, 4))
+        for folder in self.iter_directory(name):
+            finder.add(folder['name'], folder['file'])
+        self.logger.info('Recherche des fichiers en double')
+        return finder.hard_links(), finder.duplicates()
+
+    def read_diff(self, old_path, new_path):
+        """
+            Compares two exported scans
+            :param self: The class instance
+            :type self: Scan_disk
+            :param old_path: the csv or ndjson export of the old scan
+            :type old_path: Path
+            :param new_path: the csv or ndjson export of the new scan
+            :type new_path: Path
+            :return: the changes between the scans
+            :rtype: DiffReport
+        """
+        self.logger.info(f'Comparaison de {old_path} et {new_path}')
+        return diff.DiffReport(old_path, new_path, self.top or 100).compare()
+
+    def walk_directory(self, name):
+        """
+            Walks the folder with the selected engine
+            :param self: The class instance
+            :type self: Scan_disk
+            :param name: the name of the folder to scan
+            :type name: Path
+            :return: the folder path, its sub-folders and its files
+            :rtype: Generator of (String, Dict, Dict)
+        """
+        if self.engine == 'walk':
+            for dirpath, dirname, filename in os.walk(name):
+                self.logger.log(utils.PROGRESS,
+                                f'Lecture du repertoire {dirpath}')
+                with metrics.phase(self.metrics, 'stat'):
+                    self.logger.debug('Lecture des sous-répertoires')
+                    sous_rep = self.search_data(dirname, dirpath)
+                    self.logger.debug('Lecture des fichiers')
+                    fichier = self.search_data(filename, dirpath)
+                yield dirpath, sous_rep, fichier
+        elif self.processes > 1:
+            yield from self.walk_shards(name)
+        else:
+            top = os.fspath(name)
+            for dirpath, dirs, files in self.walker.walk(name):
+                self.logger.log(utils.PROGRESS,
+                                f'Lecture du repertoire {dirpath}')
+                yield (dirpath, *self.search_folder(
+                    dirs, files, folder_depth(top, dirpath)))
+
+    def walk_shards(self, name):
+        """
+            Walks the folder with a pool of processes. The folders above
+            SPLIT_DEPTH are read by this process and each sub-tree below is
+            read by a worker process, then the results are merged in the
+            order of the sequential walk
+            :param self: The class instance
+            :type self: Scan_disk
+            :param name: the name of the folder to scan
+            :type name: Path
+            :return: the folder path, its sub-folders and its files
+            :rtype: Generator of (String, Dict, Dict)
+        """
+        plan = []
+        if self.rules is not None:
+            # the workers only walk sub-trees, they are given the top device
+            self.rules.set_top(name)
+        # the records of the workers are written by this process
+        listener = utils.process_listener()
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    self.processes,
+                    initializer=init_shard,
+                    initargs=(self.workers, self.rules, self.max_depth,
+                              self.summary, listener.queue)) as executor:
+                self.plan_shards(os.fspath(name), 0, executor, plan)
+                for item in plan:
+                    if isinstance(item, concurrent.futures.Future):
+                        yield from item.result()
+                    else:
+                        yield item
+        finally:
+            listener.stop()
+
+    def plan_shards(self, dirpath, depth, executor, plan):
+        """
+            Reads the folders above SPLIT_DEPTH and submits the sub-trees
+            below to the worker processes
+            :param self: The class instance
+            :type self: Scan_disk
+            :param dirpath: the folder to read
+            :type dirpath: String
+            :param depth: the depth of the folder
+            :type depth: int
+            :param executor: the pool of processes
+            :type executor: ProcessPoolExecutor
+            :param plan: the folders and the futures of the sub-trees, in
+                         the order of the sequential walk
+            :type plan: List
+        """
+        self.logger.log(utils.PROGRESS, f'Lecture du repertoire {dirpath}')
+        try:
+            dirs, files, sub_dirs = self.walker.scan(dirpath)
+        except OSError as error:
+            self.walker.read_error(dirpath, error)
+            return
+        plan.append((dirpath, *self.search_folder(dirs, files, depth)))
+        for sub_dir in sub_dirs:
+            if depth + 1 < self.SPLIT_DEPTH:
+                self.plan_shards(sub_dir, depth + 1, executor, plan)
+            else:
+                plan.append(executor.submit(read_shard, sub_dir))
+
+    def search_folder(self, dirs, files, depth):
+        """
+            Construct the result for the entries of a folder, the entries
+            which are not kept are only summed
+            :param self: The class instance
+            :type self: Scan_disk
+            :param dirs: the (name, stats) of the sub-folders
+            :type dirs: List
+            :param files: the (name, stats) of the files
+            :type files: List
+            :param depth: the depth of the folder
+            :type depth: int
+            :return: the sub-folders and the files
+            :rtype: Entries or Totals, Entries or Totals
+        """
+        if self.max_depth is not None and depth > self.max_depth:
+            return (records.Totals.of_stats(dirs),
+                    records.Totals.of_stats(files, files=True))
+        if self.summary:
+            return (self.search_entries(dirs),
+                    records.Totals.of_stats(files, files=True))
+        return self.search_entries(dirs), self.search_entries(files)
+
+    def search_entries(self, entries):
+        """
+            Construct the result for the entries given by the walker, the
+            stats are kept raw and are formatted at render time
+            :param self: The class instance
+            :type self: Scan_disk
+            :param entries: the (name, stats) of the folders/ files
+            :type entries: List
+            :return: the raw stats of the folders/files
+            :rtype: Entries
+        """
+        return records.Entries(entries)
+
     def search_data(self, walk_name, rep):
         """
             Construct the result for sub-folder and files
@@ -139,7 +683,7 @@ des fichiers demandés.\n\
                     chemin = pathlib.Path(f'{rep}/{name}')
                     result[name] = self.search_stats(chemin)
         except IndexError as error:
-            self.logger.info('La liste est vide')
+            self.logger.debug('La liste est vide')
             result['null'] = None
         return result
 
@@ -155,29 +699,31 @@ des fichiers demandés.\n\
         """
         result = {}
         try:
-            stats = os.stat(name)
-            mode = self.calcul_droit(str(oct(stats.st_mode)))
-            result['type'] = mode[0]
-            result['droits'] = mode[1]
-            result['inode'] = str(stats.st_ino)
-            result['dev'] = str(stats.st_dev)
-            result['uid'] = str(stats.st_uid)
-            result['gid'] = str(stats.st_gid)
-            size = str(stats.st_size//1024) + ' Ko' if stats.st_size > 1024 else str(stats.st_size) + ' o'
-            result['size'] = size
-            result['acces'] = self.format_time(int(stats.st_atime))
-            result['modif'] = self.format_time(int(stats.st_mtime))
-            result['create'] = self.format_time(int(stats.st_ctime))
+            result = self.format_stats(os.stat(name))
         except OSError as error:
             self.logger.error(f'Le fichier {name} n\'existe pas. ' +
                               f'L\'erreur {error} a été générée')
             result['error'] = error
+            if self.metrics is not None:
+                self.metrics.count('errors')
         except FileNotFoundError as error:
             self.logger.error(f'Le fichier {name} n\'a pas été trouvé. ' +
                               f'L\'erreur {error} a été générée')
             result['error'] = error
         return result
 
+    def format_stats(self, stats):
+        """
+            Formats the stats of a folder or file
+            :param self: The class instance
+            :type self: Scan_disk
+            :param stats: the result of a stat call
+            :type stats: os.stat_result
+            :return: the information of the folder/file
+            :rtype: Dict
+        """
+        return self.formatter.format_stats(stats)
+
     def format_time(self, date_time):
         """
             formatted the datetime for human readable
@@ -188,21 +734,7 @@ des fichiers demandés.\n\
             :return: the date_time human readable
             :rtype: String
         """
-        formatted_date = None
-        try:
-            date = datetime.datetime.fromtimestamp(date_time)
-            formatted_date = date.isoformat(sep=' ')
-        except TypeError as error:
-            self.logger.error(error)
-            formatted_date = error
-        except OverflowError as error:
-            self.logger.error(error)
-            formatted_date = error
-        except Exception as error:
-            self.logger.error(error)
-            formatted_date = error
-        finally:
-            return formatted_date
+        return self.formatter.format_time(date_time)
 
     def calcul_droit(self, mode):
         """
@@ -214,52 +746,67 @@ des fichiers demandés.\n\
             :return: the permissions human readable
             :rtype: String
         """
-        ftype = ''
-        droit = ''
-        if mode[:len(mode)-3] == '0o40':
-            ftype = 'Rep '
-        elif mode[:len(mode)-3] == '0o100':
-            ftype += 'File '
-        else:
-            ftype += 'Inconnu '
-        for i in mode[len(mode)-3: len(mode)]:
-            if i == '7':
-                droit += 'rwx '
-            elif i == '6':
-                droit += 'rw- '
-            elif i == '5':
-                droit += 'r-x '
-            elif i == '4':
-                droit += 'r-- '
-            elif i == '3':
-                droit += '-wx '
-            elif i == '2':
-                droit += '-w- '
-            elif i == '1':
-                droit += '--x '
-            elif i == '0':
-                droit += '--- '
-            else:
-                droit += 'calcul invalide'
-        return ftype, droit
+        return self.formatter.calcul_droit(mode)
 
     def run(self):  # pragma: no cover
         """
             The main function
         """
-        self.logger.info(f'Analyse du répertoire {self.directory}')
-        scan = self.read_directory(self.directory)
-        self.logger.info('Fin analyse du répertoire')
-        if isinstance(scan[str(self.directory)], str):
-            self.logger.info(self.ko_reply_text)
-            exit(1)
-        self.logger.info('Début du rendu html')
-        scan_result = render.ScanRender(scan,
-                                        self.directory,
-                                        self.output)
-        error_code, error_message = scan_result.render_html()
-        self.logger.info('Fin du rendu html')
-        if error_code != 200:
-            self.logger.error(error_message)
-        else:
-            self.logger.info(self.ok_reply_text)
+        try:
+            self.logger.info(f'Analyse du répertoire {self.directory}')
+            if self.diff_paths:
+                try:
+                    scan = self.read_diff(*self.diff_paths)
+                except (OSError, ValueError, KeyError) as error:
+                    self.logger.error(f'Les scans ne peuvent pas être ' +
+                                      f'comparés. L\'erreur {error} a ' +
+                                      'été générée')
+                    self.logger.info(self.ko_reply_text)
+                    exit(1)
+            elif ((self.stream or self.top or self.find_duplicates or
+                    self.output_format != 'html') and
+                    not self.directory.is_dir()):
+                self.logger.error(f'{self.directory} n\'est pas un ' +
+                                  'répertoire valide')
+                self.logger.info(self.ko_reply_text)
+                exit(1)
+            elif self.top:
+                scan = self.read_top(self.directory, self.top)
+            elif self.find_duplicates:
+                scan = self.read_duplicates(self.directory)
+            elif self.stream or self.output_format != 'html':
+                scan = self.iter_directory(self.directory)
+            else:
+                scan = self.read_directory(self.directory)
+                self.logger.info('Fin analyse du répertoire')
+                if isinstance(scan[str(self.directory)], str):
+                    self.logger.info(self.ko_reply_text)
+                    exit(1)
+            self.logger.info('Début du rendu html')
+            scan_result = render.ScanRender(scan,
+                                            self.directory,
+                                            output=self.output,
+                                            formatter=self.formatter,
+                                            metrics=self.metrics,
+                                            **self.render_options)
+            with metrics.phase(self.metrics, 'render'):
+                if self.diff_paths:
+                    error_code, error_message = scan_result.render_diff()
+                elif self.top:
+                    error_code, error_message = scan_result.render_top()
+                elif self.find_duplicates:
+                    error_code, error_message = scan_result.render_duplicates()
+                else:
+                    error_code, error_message = getattr(
+                        scan_result, f'render_{self.output_format}')()
+            self.logger.info('Fin du rendu html')
+            if self.metrics is not None:
+                self.metrics.log(self.logger)
+            if error_code != 200:
+                self.logger.error(error_message)
+            else:
+                self.logger.info(self.ok_reply_text)
+        finally:
+            # the index is only written when it is closed
+            if self.index is not None:
+                self.index.close()
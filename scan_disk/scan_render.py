@@ -2,12 +2,19 @@
 # coding:utf-8
 
 # import xlsxwriter
+import collections.abc
+import io
+import logging
+import os
 import pathlib
-import jinja2
-import yaml
 # import copy
 # import csv
 import scan_disk.utils as utils
+import scan_disk.records as records
+import scan_disk.formatting as formatting
+import scan_disk.export as export
+import scan_disk.metrics as metrics
+import scan_disk.sink as sink
 
 """
     Generating Disk Scan Report
@@ -16,11 +23,40 @@ import scan_disk.utils as utils
 
     In future, the presentation model can be very different depending on the type of format
     that we wish to leave, to study for excel or for pdf
+
+    The scan result is either the dict of the folders or an iterator of the
+    folders, in which case each folder is written as soon as it is produced.
+    The raw entries of the folders are formatted when they are rendered.
+    The sorttable script is written once per report, inline or in a
+    separate file next to the report which the browser can cache.
+    A big report can be split in pages of a limited number of folders or
+    size, with an index page.
+    The top report only lists the largest files and folders, its scan
+    result is the pair of lists given by ScanDisk.read_top.
+    The columnar export writes the raw entries as typed columns, in a
+    Parquet file or a NumPy .npz file, the CSV and NDJSON exports write
+    them as lines of text while the scan is streamed, to a file or to the
+    standard output when the output is '-' (see scan_disk.export).
+    The diff report sums up the changes between two exported scans, its
+    scan result is the DiffReport of scan_disk.diff.
 """
 
 
 class ScanRender:
 
+    # The size of the buffer of the html file
+    BUFFER_SIZE = 1024 * 1024
+
+    # The name of the sorttable script written next to the reports
+    SCRIPT_NAME = 'sorttable.js'
+
+    # The titles of the columns of the tables
+    KEYS = ['nom', 'type', 'droits', 'inode', 'dev', ' uid', 'gid',
+            'size', 'acces', 'modif', 'create']
+
+    # The titles of the columns of the totals of the sub-trees
+    TOTAL_TITLES = ['total', 'fichiers', 'blocs']
+
     def __init__(self,
                  scan_result,
                  directory,
@@ -28,7 +64,14 @@ class ScanRender:
                  csv=None,
                  jinja=None,
                  excel=None,
-                 output=None):
+                 output=None,
+                 formatter=None,
+                 external_js=False,
+                 page_folders=None,
+                 page_size=None,
+                 compression=None,
+                 metrics=None,
+                 database=None):
         """
         Constructor
         """
@@ -43,6 +86,16 @@ class ScanRender:
         else:
             self.output = str(self.directory)[1:].split('/')[-1]
             # self.output = 'test'
+        if formatter:
+            self.formatter = formatter
+        else:
+            self.formatter = formatting.Formatter(logging.getLogger('flogger'))
+        self.external_js = external_js
+        self.page_folders = page_folders
+        self.page_size = page_size
+        self.compression = compression
+        self.metrics = metrics
+        self.database = database
         self.project_path = pathlib.Path(__file__).resolve().parents[1]
 
         # Set KO exit reply text
@@ -50,6 +103,220 @@ class ScanRender:
                                   Consult the log file \
                                      ._//(`O`)\_."
 
+    def format_folder(self, folder):
+        """
+           Formats the raw entries of a folder and the totals of its sub-tree
+           :param self : The class instance
+           :type self : ScanRender
+           :param folder : The folder with its sub-folders and files
+           :type folder : Dict
+           :return : The folder with its entries formatted
+           :rtype: Dict
+        """
+        result = dict(folder)
+        result['key'] = self.KEYS
+        with metrics.phase(self.metrics, 'format'):
+            if isinstance(result['file'], records.Totals):
+                # summary: the files are only counted in the totals
+                result['file'] = None
+            elif isinstance(result['file'], records.Entries):
+                result['file'] = self.formatter.format_entries(result['file'])
+            if isinstance(result['repe'], records.Entries):
+                result['key'] = self.KEYS + self.TOTAL_TITLES
+                result['repe'] = self.formatter.format_entries(
+                    result['repe'], self.sub_totals(folder))
+            result['total'] = self.formatter.format_total(
+                folder.get('total'))
+        return result
+
+    def sub_totals(self, folder):
+        """
+           Returns the totals of the sub-folders of a folder. They are only
+           known when the whole scan is given, the sub-folders of a streamed
+           folder are read after it is rendered. The folders at the maximum
+           depth carry the totals of their sub-folders, which are not kept
+           :param self : The class instance
+           :type self : ScanRender
+           :param folder : The folder with its sub-folders and files
+           :type folder : Dict
+           :return : The Totals of the sub-folders by name
+           :rtype: Dict
+        """
+        result = dict(folder.get('sub_totals') or {})
+        if isinstance(self.scan_result, dict):
+            for name in folder['repe']:
+                sub_folder = self.scan_result.get(
+                    os.path.join(folder['name'], name))
+                if sub_folder and sub_folder.get('total'):
+                    result[name] = sub_folder['total']
+        return result
+
+    def report_template(self, tableau_template):
+        """
+           Builds the template rendering every folder in a single pass, from
+           the body of tableau.yml. It is compiled once and memoized by
+           utils.get_template
+           :param self : The class instance
+           :type self : ScanRender
+           :param tableau_template : The templates of tableau.yml
+           :type tableau_template : Dict
+           :return : The source of the template
+           :rtype: String
+        """
+        return ('{% for folder in folders %}'
+                '{% with name=folder.name, repe=folder.repe, '
+                'file=folder.file, key=folder.key, total=folder.total %}' +
+                tableau_template['body'] +
+                '{% endwith %}'
+                '{% endfor %}')
+
+    def open_output(self, path, binary=False):
+        """
+           Opens a file of the report, whose bytes are counted in the metrics
+           :param self : The class instance
+           :type self : ScanRender
+           :param path : The path of the file
+           :type path : Path
+           :param binary : Opens the file in binary mode, else in utf-8
+           :type binary : bool
+           :return : The file
+           :rtype: io.BufferedWriter or io.TextIOWrapper
+        """
+        f = io.BufferedWriter(export.open_raw(path, self.metrics),
+                              self.BUFFER_SIZE)
+        return f if binary else io.TextIOWrapper(f, encoding='utf-8')
+
+    def script_tag(self, script, report_path, external):
+        """
+           Returns the sorttable script to write once for the report, inline
+           or in a separate file next to the report. The separate file is
+           only rewritten when its content changes
+           :param self : The class instance
+           :type self : ScanRender
+           :param script : The sorttable script
+           :type script : String
+           :param report_path : The path of the html file
+           :type report_path : Path
+           :param external : Writes the script in a separate file
+           :type external : bool
+           :return : The script tag
+           :rtype: String
+        """
+        if not external:
+            return '<script>\n' + script + '</script>\n'
+        script_path = report_path.parent / self.SCRIPT_NAME
+        try:
+            current = script_path.read_text(encoding='utf-8')
+        except OSError:
+            current = None
+        if current != script:
+            with self.open_output(script_path) as f:
+                f.write(script)
+        return f'<script src="{self.SCRIPT_NAME}"></script>\n'
+
+    def render_report(self, folders, tableau_template, report_path):
+        """
+           Writes the folders in a single html page
+           :param self : The class instance
+           :type self : ScanRender
+           :param folders : The folders to write
+           :type folders : Iterable of Dict
+           :param tableau_template : The templates of tableau.yml
+           :type tableau_template : Dict
+           :param report_path : The path of the html page
+           :type report_path : Path
+        """
+        with self.open_output(report_path) as f:
+            f.write(utils.render_templates(tableau_template['head'],
+                                           name=self.output,
+                                           descript=str(self.directory)))
+
+            report = utils.get_template(self.report_template(
+                tableau_template))
+            f.writelines(report.generate(
+                folders=map(self.format_folder, folders)))
+            f.write(self.script_tag(tableau_template['script'],
+                                    report_path, self.external_js))
+            f.write(tableau_template['footer'])
+
+    def page_full(self, count, size):
+        """
+           Tells whether a page can not take the next folder
+           :param self : The class instance
+           :type self : ScanRender
+           :param count : The number of folders of the page
+           :type count : int
+           :param size : The size of the page with the next folder
+           :type size : int
+           :return : True if a new page must be started
+           :rtype: bool
+        """
+        if self.page_folders and count >= self.page_folders:
+            return True
+        return bool(self.page_size) and count > 0 and size > self.page_size
+
+    def render_pages(self, folders, tableau_template, report_path):
+        """
+           Writes the folders in several pages and an index page listing
+           them. A page is closed when it holds page_folders folders or when
+           the next folder would make it bigger than page_size bytes, a
+           folder bigger than page_size having a page of its own. The links
+           to the sub-folders go through the index page, which forwards to
+           the page of the sub-folder
+           :param self : The class instance
+           :type self : ScanRender
+           :param folders : The folders to write
+           :type folders : Iterable of Dict
+           :param tableau_template : The templates of tableau.yml
+           :type tableau_template : Dict
+           :param report_path : The path of the index page
+           :type report_path : Path
+        """
+        body = utils.get_template(tableau_template['body'])
+        index_item = utils.get_template(tableau_template['index_item'])
+        script = self.script_tag(tableau_template['script'], report_path,
+                                 external=True).encode('utf-8')
+        footer = tableau_template['footer'].encode('utf-8')
+        page = None
+        number = 0
+        with self.open_output(report_path) as index:
+            index.write(utils.render_templates(tableau_template['head'],
+                                               name=self.output,
+                                               descript=str(self.directory)))
+            index.write('<ul>\n')
+            try:
+                for folder in folders:
+                    chunk = body.render(link_prefix=report_path.name,
+                                        **self.format_folder(folder))
+                    chunk = chunk.encode('utf-8')
+                    if page is None or self.page_full(count, size + len(chunk)):
+                        if page is not None:
+                            page.write(script + footer)
+                            page.close()
+                        number += 1
+                        page_path = report_path.with_name(
+                            f'{report_path.stem}_{number}.html')
+                        page = self.open_output(page_path, binary=True)
+                        head = utils.render_templates(
+                            tableau_template['head'],
+                            name=f'{self.output} ({number})',
+                            descript=str(self.directory)).encode('utf-8')
+                        page.write(head)
+                        count, size = 0, len(head) + len(script) + len(footer)
+                    page.write(chunk)
+                    count += 1
+                    size += len(chunk)
+                    index.write(index_item.render(name=folder['name'],
+                                                  page=page_path.name) + '\n')
+                if page is not None:
+                    page.write(script + footer)
+            finally:
+                if page is not None:
+                    page.close()
+            index.write('</ul>\n')
+            index.write(tableau_template['index_script'])
+            index.write(tableau_template['footer'])
+
     def render_html(self):
         """
            Generate a html page from jinja templates and the data dict
@@ -60,26 +327,314 @@ class ScanRender:
         """
 
         error_code, error_message = 200, None
-        result = ''
         tableau = self.project_path / 'templates' / 'tableau.yml'
         tableau_template = utils.yaml_to_dict(tableau)
 
         try:
-            result += utils.render_templates(tableau_template['head'],
-                                             name=self.output,
-                                             descript=str(self.directory))
-
-            for value in self.scan_result.values():
-                value['key'] = [
-                    'nom', 'type', 'droits', 'inode', 'dev', ' uid', 'gid',
-                    'size', 'acces', 'modif', 'create']
-                result += utils.render_templates(tableau_template['body'],
-                                                 **value)
-                result += tableau_template['footer']
-
-            with open(self.project_path / 'html' / (self.output+'.html'),
-                      'w', encoding="utf-8") as f:
-                f.write(result)
+            if isinstance(self.scan_result, collections.abc.Iterator):
+                folders = self.scan_result
+            else:
+                folders = self.scan_result.values()
+
+            report_path = self.project_path / 'html' / (self.output+'.html')
+            if self.page_folders or self.page_size:
+                self.render_pages(folders, tableau_template, report_path)
+            else:
+                self.render_report(folders, tableau_template, report_path)
+        except AttributeError as error:
+            error_code = 1001
+            error_message = error
+        except IOError as error:
+            error_code = 1002
+            error_message = error
+        except TypeError as error:
+            error_code = 1003
+            error_message = error
+        finally:
+            return error_code, error_message
+
+    # The suffixes of the compressed text exports
+    COMPRESSION_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+    def export_rows(self, writer, batch_rows=None):
+        """
+           Gives the rows of the folders and files of the scan to a writer
+           :param self : The class instance
+           :type self : ScanRender
+           :param writer : The writer of the rows, closed at the end
+           :type writer : export.CsvWriter, export.NdjsonWriter, ...
+           :param batch_rows : The number of rows given at once to the writer
+           :type batch_rows : int
+        """
+        folders = self.scan_result
+        if isinstance(folders, dict):
+            folders = folders.values()
+        exporter = export.ColumnExporter(writer, batch_rows)
+        try:
+            exporter.add_top(str(self.directory), os.lstat(self.directory))
+            for folder in folders:
+                exporter.add_folder(folder['name'], folder['repe'],
+                                    folder['file'])
+        finally:
+            exporter.close()
+
+    def render_columns(self):
+        """
+           Writes the entries of the scan as typed columns, in a Parquet file
+           when pyarrow is installed, else in a NumPy .npz file
+           :param self : The class instance
+           :type self : ScanRender
+           :return : error_code, error_message
+           :rtype: int, String
+        """
+
+        error_code, error_message = 200, None
+        try:
+            self.export_rows(export.column_writer(
+                self.project_path / 'html' / self.output, self.metrics))
+        except AttributeError as error:
+            error_code = 1001
+            error_message = error
+        except IOError as error:
+            error_code = 1002
+            error_message = error
+        except TypeError as error:
+            error_code = 1003
+            error_message = error
+        except ImportError as error:
+            error_code = 1004
+            error_message = error
+        finally:
+            return error_code, error_message
+
+    def render_text(self, writer_class):
+        """
+           Writes the entries of the scan as lines of text, each folder as
+           soon as it is read
+           :param self : The class instance
+           :type self : ScanRender
+           :param writer_class : The writer of the format
+           :type writer_class : type
+           :return : error_code, error_message
+           :rtype: int, String
+        """
+
+        error_code, error_message = 200, None
+        try:
+            if self.output == '-':
+                path = '-'
+            else:
+                path = self.project_path / 'html' / (
+                    self.output + writer_class.SUFFIX +
+                    self.COMPRESSION_SUFFIXES[self.compression])
+            # the rows of each folder are written once it is read, the
+            # file gathers them in large chunks
+            self.export_rows(writer_class(export.open_text(
+                path, self.compression, self.BUFFER_SIZE, self.metrics)),
+                batch_rows=1)
+        except AttributeError as error:
+            error_code = 1001
+            error_message = error
+        except IOError as error:
+            error_code = 1002
+            error_message = error
+        except (TypeError, KeyError) as error:
+            error_code = 1003
+            error_message = error
+        except ImportError as error:
+            error_code = 1004
+            error_message = error
+        finally:
+            return error_code, error_message
+
+    def render_csv(self):
+        """
+           Writes the entries of the scan as CSV
+           :param self : The class instance
+           :type self : ScanRender
+           :return : error_code, error_message
+           :rtype: int, String
+        """
+        return self.render_text(export.CsvWriter)
+
+    def render_ndjson(self):
+        """
+           Writes the entries of the scan as newline-delimited JSON
+           :param self : The class instance
+           :type self : ScanRender
+           :return : error_code, error_message
+           :rtype: int, String
+        """
+        return self.render_text(export.NdjsonWriter)
+
+    def render_database(self):
+        """
+           Loads the entries of the scan in a database, each batch of rows
+           as soon as it is full
+           :param self : The class instance
+           :type self : ScanRender
+           :return : error_code, error_message
+           :rtype: int, String
+        """
+
+        error_code, error_message = 200, None
+        try:
+            writer = sink.DatabaseWriter.from_config(self.database,
+                                                     str(self.directory))
+            self.export_rows(writer, batch_rows=writer.batch_rows)
+        except AttributeError as error:
+            error_code = 1001
+            error_message = error
+        except IOError as error:
+            error_code = 1002
+            error_message = error
+        except (TypeError, KeyError, ValueError) as error:
+            error_code = 1003
+            error_message = error
+        except ImportError as error:
+            error_code = 1004
+            error_message = error
+        finally:
+            return error_code, error_message
+
+    # The titles of the kinds of changes of the diff report
+    CHANGE_TITLES = {'new': 'Nouveaux', 'deleted': 'Supprimés',
+                     'grown': 'Agrandis', 'modified': 'Modifiés'}
+
+    def render_diff(self):
+        """
+           Generate a html page of the changes between two scans
+           :param self : The class instance
+           :type self : ScanRender
+           :return : error_code, error_message
+           :rtype: int, String
+        """
+
+        error_code, error_message = 200, None
+        tableau = self.project_path / 'templates' / 'tableau.yml'
+        tableau_template = utils.yaml_to_dict(tableau)
+
+        try:
+            report = self.scan_result
+            size = self.formatter.format_size
+            summary = []
+            changes = []
+            for change, title in self.CHANGE_TITLES.items():
+                delta = report.sizes[change]
+                summary.append((title, report.counts[change],
+                                ('-' if delta < 0 else '') + size(abs(delta))))
+                changes.append((title, [
+                    (path, size(old_size), size(new_size))
+                    for _, path, old_size, new_size
+                    in report.largest[change].largest()]))
+
+            report_path = self.project_path / 'html' / (self.output+'.html')
+            with self.open_output(report_path) as f:
+                f.write(utils.render_templates(tableau_template['head'],
+                                               name=self.output,
+                                               descript=str(self.directory)))
+                f.write(utils.render_templates(tableau_template['diff'],
+                                               old=report.old_path,
+                                               new=report.new_path,
+                                               summary=summary,
+                                               changes=changes))
+                f.write(self.script_tag(tableau_template['script'],
+                                        report_path, self.external_js))
+                f.write(tableau_template['footer'])
+        except AttributeError as error:
+            error_code = 1001
+            error_message = error
+        except IOError as error:
+            error_code = 1002
+            error_message = error
+        except TypeError as error:
+            error_code = 1003
+            error_message = error
+        finally:
+            return error_code, error_message
+
+    def render_duplicates(self):
+        """
+           Generate a html page of the hard links and duplicated files
+           :param self : The class instance
+           :type self : ScanRender
+           :return : error_code, error_message
+           :rtype: int, String
+        """
+
+        error_code, error_message = 200, None
+        tableau = self.project_path / 'templates' / 'tableau.yml'
+        tableau_template = utils.yaml_to_dict(tableau)
+
+        try:
+            hard_links, duplicated = self.scan_result
+            size = self.formatter.format_size
+            links = [(paths, size(link_size), len(paths))
+                     for link_size, paths in hard_links]
+            reclaimable = 0
+            groups = []
+            for file_size, paths in duplicated:
+                group_reclaimable = file_size * (len(paths) - 1)
+                reclaimable += group_reclaimable
+                groups.append((paths, size(file_size), len(paths),
+                               size(group_reclaimable)))
+
+            report_path = self.project_path / 'html' / (self.output+'.html')
+            with self.open_output(report_path) as f:
+                f.write(utils.render_templates(tableau_template['head'],
+                                               name=self.output,
+                                               descript=str(self.directory)))
+                f.write(utils.render_templates(tableau_template['duplicates'],
+                                               links=links,
+                                               duplicates=groups,
+                                               reclaimable=size(reclaimable)))
+                f.write(self.script_tag(tableau_template['script'],
+                                        report_path, self.external_js))
+                f.write(tableau_template['footer'])
+        except AttributeError as error:
+            error_code = 1001
+            error_message = error
+        except IOError as error:
+            error_code = 1002
+            error_message = error
+        except TypeError as error:
+            error_code = 1003
+            error_message = error
+        finally:
+            return error_code, error_message
+
+    def render_top(self):
+        """
+           Generate a html page of the largest files and folders
+           :param self : The class instance
+           :type self : ScanRender
+           :return : error_code, error_message
+           :rtype: int, String
+        """
+
+        error_code, error_message = 200, None
+        tableau = self.project_path / 'templates' / 'tableau.yml'
+        tableau_template = utils.yaml_to_dict(tableau)
+
+        try:
+            top_files, top_dirs = self.scan_result
+            size = self.formatter.format_size
+            files = [(path, size(file_size))
+                     for file_size, path in top_files]
+            dirs = [(path, size(dir_size), file_count, blocks)
+                    for dir_size, path, file_count, blocks in top_dirs]
+
+            report_path = self.project_path / 'html' / (self.output+'.html')
+            with self.open_output(report_path) as f:
+                f.write(utils.render_templates(tableau_template['head'],
+                                               name=self.output,
+                                               descript=str(self.directory)))
+                f.write(utils.render_templates(tableau_template['top'],
+                                               files=files,
+                                               dirs=dirs))
+                f.write(self.script_tag(tableau_template['script'],
+                                        report_path, self.external_js))
+                f.write(tableau_template['footer'])
         except AttributeError as error:
             error_code = 1001
             error_message = error
@@ -0,0 +1,330 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Serves the folders of a scan index as html pages on a local port.
+
+    Rendering every folder of a huge tree up front costs far more than the
+    few folders anyone looks at. The server reads the entries of a folder
+    from the index of the incremental scans (see scan_disk.index) only when
+    its page is asked for, renders it with the templates of tableau.yml and
+    keeps the last pages rendered in an LRU cache.
+
+    The entries are sorted and cut in pages of page_rows rows by the
+    server, the browser only gets one page of a folder of a million files.
+    The sorted order of the last folders is kept as well, so that turning
+    the pages of a folder does not sort it again.
+
+    The index only holds the entries of each folder, not the totals of the
+    sub-trees: the total columns are left empty. The pages are rendered
+    with autoescape, the names of the folders and files are escaped.
+
+    A page is /?path=<folder>&sort=<column>&order=asc|desc&page=<n>, the
+    pages start at 1.
+"""
+
+import array
+import functools
+import http.server
+import math
+import os
+import threading
+import urllib.parse
+
+import scan_disk.index as index
+import scan_disk.records as records
+import scan_disk.utils as utils
+from scan_disk.scan_render import ScanRender
+
+# The columns the pages can be sorted by, and their stat field
+SORTS = {'name': None, 'type': 'st_mode', 'size': 'st_size',
+         'mtime': 'st_mtime', 'atime': 'st_atime', 'ctime': 'st_ctime',
+         'inode': 'st_ino', 'uid': 'st_uid', 'gid': 'st_gid'}
+ORDERS = ('asc', 'desc')
+
+
+class ReportPages:
+
+    # The number of folders whose sorted order is kept
+    SORTED_FOLDERS = 8
+
+    def __init__(self, scan_index, logger, top=None, cache_pages=128,
+                 page_rows=500, formatter=None):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: ReportPages
+            :param scan_index: The index of the scans, opened shared
+            :type scan_index: ScanIndex
+            :param logger: The logger file
+            :type logger: Logging
+            :param top: The folder of the first page, the top of the index
+                        by default
+            :type top: String
+            :param cache_pages: The number of pages kept rendered
+            :type cache_pages: int
+            :param page_rows: The number of folders and of files of a page
+            :type page_rows: int
+            :param formatter: The formatter of the entries
+            :type formatter: Formatter
+        """
+        if page_rows < 1 or cache_pages < 0:
+            raise ValueError(f'Invalid page rows {page_rows} or cache ' +
+                             f'size {cache_pages}')
+        self.index = scan_index
+        self.logger = logger
+        self.top = top or scan_index.top()
+        if self.top is None:
+            raise ValueError(f'The index {scan_index.path} is empty')
+        self.page_rows = page_rows
+        self.lock = threading.Lock()
+        self.render = ScanRender(None, self.top, formatter=formatter)
+        self.templates = utils.yaml_to_dict(
+            self.render.project_path / 'templates' / 'tableau.yml')
+        # the names of the folders and files are escaped, a page must not
+        # run the markup of a file name
+        self.head = utils.get_template(self.templates['head'],
+                                       autoescape=True)
+        self.body = utils.get_template(self.templates['body'],
+                                       autoescape=True)
+        self.pager = utils.get_template(self.templates['pager'],
+                                        autoescape=True)
+        self.page = functools.lru_cache(cache_pages)(self.render_page)
+        self.sorted_entries = functools.lru_cache(self.SORTED_FOLDERS)(
+            self.sort_entries)
+
+    def read(self, dirpath):
+        """
+            Reads the entries of a folder from the index
+            :param self: The class instance
+            :type self: ReportPages
+            :param dirpath: the path of the folder
+            :type dirpath: String
+            :return: the entries of the sub-folders and files
+            :rtype: Entries, Entries
+            :raise KeyError: the folder is not in the index
+        """
+        with self.lock:
+            entries = self.index.entries(dirpath)
+        if entries is None:
+            raise KeyError(dirpath)
+        return entries
+
+    def sort_entries(self, dirpath, sort, order):
+        """
+            Reads and sorts the entries of a folder
+            :param self: The class instance
+            :type self: ReportPages
+            :param dirpath: the path of the folder
+            :type dirpath: String
+            :param sort: the column to sort by, see SORTS
+            :type sort: String
+            :param order: asc or desc
+            :type order: String
+            :return: the entries of the sub-folders and files, each one
+                     with the indexes of its rows in order
+            :rtype: (Entries, List), (Entries, List)
+        """
+        return tuple((entries, sort_rows(entries, sort, order == 'desc'))
+                     for entries in self.read(dirpath))
+
+    def render_page(self, dirpath, sort='name', order='asc', page=1):
+        """
+            Renders a page of a folder, called through the page LRU cache
+            :param self: The class instance
+            :type self: ReportPages
+            :param dirpath: the path of the folder
+            :type dirpath: String
+            :param sort: the column to sort by, see SORTS
+            :type sort: String
+            :param order: asc or desc
+            :type order: String
+            :param page: the number of the page, from 1
+            :type page: int
+            :return: the html page
+            :rtype: bytes
+            :raise KeyError: the folder is not in the index
+            :raise ValueError: the sort, order or page is invalid
+        """
+        if sort not in SORTS or order not in ORDERS:
+            raise ValueError(f'Invalid sort {sort} or order {order}')
+        (dirs, dirs_order), (files, files_order) = self.sorted_entries(
+            dirpath, sort, order)
+        pages = max(math.ceil(len(dirs_order) / self.page_rows),
+                    math.ceil(len(files_order) / self.page_rows), 1)
+        if not 1 <= page <= pages:
+            raise ValueError(f'Invalid page {page} of {pages}')
+        rows = slice((page - 1) * self.page_rows, page * self.page_rows)
+        # the entries which could not be stat'ed are listed on the first page
+        folder = self.render.format_folder({
+            'name': dirpath,
+            'repe': take(dirs, dirs_order[rows], page == 1),
+            'file': take(files, files_order[rows], page == 1),
+            'total': None})
+        query = '?path=' + urllib.parse.quote(dirpath)
+        parent = os.path.dirname(dirpath)
+        pager = self.pager.render(
+            query=query, sorts=SORTS, sort=sort, order=order, page=page,
+            pages=pages, dirs=len(dirs), files=len(files),
+            parent=('?path=' + urllib.parse.quote(parent)
+                    if dirpath != self.top and parent != dirpath else None))
+        return ''.join((
+            self.head.render(name=dirpath, descript=self.top),
+            pager,
+            self.body.render(
+                link_path='?path=' + urllib.parse.quote(
+                    os.path.join(dirpath, '')),
+                **folder),
+            pager,
+            f'<script src="/{ScanRender.SCRIPT_NAME}"></script>\n',
+            self.templates['footer'])).encode('utf-8')
+
+
+def sort_rows(entries, sort, reverse=False):
+    """
+        Returns the indexes of the rows of entries in order, the name
+        breaking the ties
+        :param entries: the entries of a folder
+        :type entries: Entries
+        :param sort: the column to sort by, see SORTS
+        :type sort: String
+        :param reverse: sorts in descending order
+        :type reverse: bool
+        :return: the indexes of the rows
+        :rtype: List
+    """
+    rows = sorted(range(len(entries.names)), key=entries.names.__getitem__,
+                  reverse=reverse)
+    if SORTS[sort] is not None:
+        column = entries.columns[records.STAT_FIELDS.index(SORTS[sort])]
+        # the sort is stable, the rows keep the order of their names
+        rows.sort(key=column.__getitem__, reverse=reverse)
+    return rows
+
+
+def take(entries, rows, errors=False):
+    """
+        Returns the entries of some rows
+        :param entries: the entries of a folder
+        :type entries: Entries
+        :param rows: the indexes of the rows
+        :type rows: List
+        :param errors: keeps the entries which could not be stat'ed
+        :type errors: bool
+        :return: the entries of the rows, in their order
+        :rtype: Entries
+    """
+    result = records.Entries()
+    result.names = [entries.names[row] for row in rows]
+    result.columns = tuple(array.array(column.typecode,
+                                       [column[row] for row in rows])
+                           for column in entries.columns)
+    if errors:
+        result.errors = dict(entries.errors)
+    return result
+
+
+class ReportHandler(http.server.BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        """
+            Sends a page of a folder or the sorttable script
+            :param self: The class instance
+            :type self: ReportHandler
+        """
+        pages = self.server.pages
+        url = urllib.parse.urlsplit(self.path)
+        if url.path == '/' + ScanRender.SCRIPT_NAME:
+            self.send(200, pages.templates['script'].encode('utf-8'),
+                      'text/javascript')
+            return
+        if url.path != '/':
+            self.send_error(404)
+            return
+        query = dict(urllib.parse.parse_qsl(url.query))
+        dirpath = query.get('path', pages.top)
+        try:
+            body = pages.page(dirpath, query.get('sort', 'name'),
+                              query.get('order', 'asc'),
+                              int(query.get('page', 1)))
+        except KeyError:
+            self.send_error(404, f'Unknown folder {dirpath}')
+        except ValueError as error:
+            self.send_error(400, str(error))
+        else:
+            self.send(200, body, 'text/html')
+
+    def send(self, status, body, content_type):
+        """
+            Sends a response
+            :param self: The class instance
+            :type self: ReportHandler
+            :param status: the HTTP status
+            :type status: int
+            :param body: the body of the response
+            :type body: bytes
+            :param content_type: the media type of the body, in utf-8
+            :type content_type: String
+        """
+        self.send_response(status)
+        self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        self.server.pages.logger.debug(f'{self.address_string()} - ' +
+                                       format % args)
+
+
+class ReportServer(http.server.ThreadingHTTPServer):
+
+    daemon_threads = True
+
+    def __init__(self, pages, port=8000, host='127.0.0.1'):
+        """
+            Constructor, the server listens on the local host only
+            :param self: The class instance
+            :type self: ReportServer
+            :param pages: The pages of the index
+            :type pages: ReportPages
+            :param port: The port, 0 for any free port
+            :type port: int
+            :param host: The address to listen on
+            :type host: String
+        """
+        super().__init__((host, port), ReportHandler)
+        self.pages = pages
+
+
+def serve(index_path, logger, top=None, port=8000, cache_pages=128,
+          page_rows=500):
+    """
+        Serves the pages of a scan index until the process is interrupted
+        :param index_path: the SQLite file of the index
+        :type index_path: Path or String
+        :param logger: The logger file
+        :type logger: Logging
+        :param top: the folder of the first page
+        :type top: String
+        :param port: the port
+        :type port: int
+        :param cache_pages: the number of pages kept rendered
+        :type cache_pages: int
+        :param page_rows: the number of folders and of files of a page
+        :type page_rows: int
+    """
+    if not os.path.isfile(index_path):
+        raise FileNotFoundError(f'The index {index_path} does not exist')
+    scan_index = index.ScanIndex(index_path, logger, shared=True)
+    try:
+        pages = ReportPages(scan_index, logger, top, cache_pages, page_rows)
+        with ReportServer(pages, port) as server:
+            logger.info(f'Le rapport de {pages.top} est servi sur ' +
+                        f'http://127.0.0.1:{server.server_address[1]}/')
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                logger.info('Arrêt du serveur')
+    finally:
+        scan_index.close()
@@ -0,0 +1,286 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Scans many folders at once, each one streamed to its own render.
+
+    The folders of all the targets are read by a single bounded pool of
+    threads, driven by an asyncio event loop. The reads of each mount, told
+    apart by the device of its target, are limited by a semaphore, so that
+    a slow NFS mount holds at most its own share of the threads and never
+    delays the reads of the local disks.
+
+    The render of each target runs in its own thread with the usual
+    ScanDisk.run: its walker is an AsyncBridge, which asks the event loop
+    for the next folder of the target. A target is only read ahead of its
+    render by prefetch folders, a slow render slows its own walk only.
+"""
+
+import asyncio
+import concurrent.futures
+import copy
+import os
+import pathlib
+
+
+class AsyncWalker:
+
+    def __init__(self, walker, executor, semaphore, prefetch=8):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: AsyncWalker
+            :param walker: The walker reading a single folder
+            :type walker: Walker
+            :param executor: The pool of threads reading the folders
+            :type executor: ThreadPoolExecutor
+            :param semaphore: The limit of the reads of the mount
+            :type semaphore: asyncio.Semaphore
+            :param prefetch: The maximum number of folders read ahead
+            :type prefetch: int
+        """
+        self.walker = walker
+        self.executor = executor
+        self.semaphore = semaphore
+        self.prefetch = prefetch
+
+    async def walk(self, top):
+        """
+            Walks the folder tree top-down in the same order as the walker,
+            the next prefetch folders being read by the pool of threads
+            :param self: The class instance
+            :type self: AsyncWalker
+            :param top: the folder to walk
+            :type top: Path or String
+            :return: the folder path, the (name, stats) of its sub-folders
+                     and the (name, stats) of its files
+            :rtype: AsyncGenerator of (String, List, List)
+        """
+        if self.walker.rules is not None:
+            self.walker.rules.set_top(top)
+        # each item of the stack is [dirpath, task or None]
+        stack = [[os.fspath(top), None]]
+        try:
+            while stack:
+                self.submit(stack)
+                dirpath, task = stack.pop()
+                try:
+                    dirs, files, sub_dirs = await task
+                except OSError as error:
+                    self.walker.read_error(dirpath, error)
+                    continue
+                yield dirpath, dirs, files
+                stack.extend([path, None] for path in reversed(sub_dirs))
+        finally:
+            for _, task in stack:
+                if task is not None:
+                    task.cancel()
+
+    def submit(self, stack):
+        """
+            Starts the reads of the next folders of the stack
+            :param self: The class instance
+            :type self: AsyncWalker
+            :param stack: the folders still to yield, the next one last
+            :type stack: List
+        """
+        for item in stack[:-self.prefetch - 1:-1]:
+            if item[1] is None:
+                item[1] = asyncio.ensure_future(self.scan(item[0]))
+
+    async def scan(self, dirpath):
+        """
+            Reads a folder in the pool of threads, once the mount allows it
+            :param self: The class instance
+            :type self: AsyncWalker
+            :param dirpath: the folder to read
+            :type dirpath: String
+            :return: the (name, stats) of the sub-folders and of the files,
+                     and the paths of the sub-folders to walk into
+            :rtype: List, List, List
+        """
+        async with self.semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.walker.scan, dirpath)
+
+
+class AsyncBridge:
+
+    def __init__(self, walker, loop):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: AsyncBridge
+            :param walker: The walker of the target
+            :type walker: AsyncWalker
+            :param loop: The event loop running the walker
+            :type loop: asyncio.AbstractEventLoop
+        """
+        self.walker = walker
+        self.loop = loop
+        self.rules = walker.walker.rules
+
+    def walk(self, top):
+        """
+            Walks the folder tree from a thread other than the one of the
+            event loop, a folder being asked for when the previous one has
+            been handled
+            :param self: The class instance
+            :type self: AsyncBridge
+            :param top: the folder to walk
+            :type top: Path or String
+            :return: the folder path, the (name, stats) of its sub-folders
+                     and the (name, stats) of its files
+            :rtype: Generator of (String, List, List)
+        """
+        folders = self.walker.walk(top)
+        try:
+            while True:
+                try:
+                    yield asyncio.run_coroutine_threadsafe(
+                        folders.__anext__(), self.loop).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            asyncio.run_coroutine_threadsafe(folders.aclose(),
+                                             self.loop).result()
+
+
+class ScanService:
+
+    def __init__(self, logger, threads=8, per_mount=4, mount_limits=None,
+                 prefetch=8):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: ScanService
+            :param logger: The logger file
+            :type logger: Logging
+            :param threads: The number of threads reading the folders of
+                            all the targets
+            :type threads: int
+            :param per_mount: The number of folders of a mount read at once
+            :type per_mount: int
+            :param mount_limits: The number of folders read at once of some
+                                 mounts, by path of the mount
+            :type mount_limits: Dict
+            :param prefetch: The maximum number of folders of a target read
+                             ahead of its render
+            :type prefetch: int
+        """
+        if threads < 1 or per_mount < 1 or prefetch < 1:
+            raise ValueError(f'Invalid threads {threads}, limit ' +
+                             f'{per_mount} or prefetch {prefetch}')
+        self.logger = logger
+        self.threads = threads
+        self.per_mount = per_mount
+        # the limits by device, the mounts are told apart by their device
+        self.limits = {os.stat(path).st_dev: limit
+                       for path, limit in (mount_limits or {}).items()}
+        self.prefetch = prefetch
+
+    async def run(self, scans):
+        """
+            Runs the scans at once, each one in its own thread
+            :param self: The class instance
+            :type self: ScanService
+            :param scans: the scans of the targets, by the scandir engine
+                          without worker processes nor index
+            :type scans: List of ScanDisk
+            :return: None for each scan done, the error which stopped the
+                     others
+            :rtype: List
+        """
+        for scan in scans:
+            # the walk engine reads the folders with os.walk, not with the
+            # walker
+            if (scan.engine != 'scandir' or scan.processes > 1 or
+                    not hasattr(scan.walker, 'scan')):
+                raise ValueError('The targets can only be read by the ' +
+                                 'scandir engine, without worker processes ' +
+                                 'nor the index')
+        loop = asyncio.get_running_loop()
+        # the semaphores of the mounts, by device
+        semaphores = {}
+        with concurrent.futures.ThreadPoolExecutor(
+                self.threads) as executor, \
+                concurrent.futures.ThreadPoolExecutor(len(scans)) as renders:
+            tasks = []
+            for scan in scans:
+                walker = AsyncWalker(self.prepare(scan.walker), executor,
+                                     self.semaphore(scan.directory,
+                                                    semaphores),
+                                     self.prefetch)
+                scan.walker = AsyncBridge(walker, loop)
+                tasks.append(loop.run_in_executor(renders, self.run_scan,
+                                                  scan))
+            return await asyncio.gather(*tasks)
+
+    def semaphore(self, directory, semaphores):
+        """
+            Returns the semaphore of the mount of a target
+            :param self: The class instance
+            :type self: ScanService
+            :param directory: the folder of the target
+            :type directory: Path
+            :param semaphores: the semaphores of the mounts, by device
+            :type semaphores: Dict
+            :return: the semaphore
+            :rtype: asyncio.Semaphore
+        """
+        try:
+            device = os.stat(directory).st_dev
+        except OSError:
+            # the run of the scan reports the invalid folder
+            device = None
+        if device not in semaphores:
+            semaphores[device] = asyncio.Semaphore(
+                self.limits.get(device, self.per_mount))
+        return semaphores[device]
+
+    def prepare(self, walker):
+        """
+            Returns the walker of a target with its own copy of the rules,
+            whose device is the one of the target
+            :param self: The class instance
+            :type self: ScanService
+            :param walker: the walker of the target
+            :type walker: Walker
+            :return: the walker
+            :rtype: Walker
+        """
+        if walker.rules is not None:
+            walker.rules = copy.copy(walker.rules)
+        return walker
+
+    def run_scan(self, scan):
+        """
+            Runs a scan, in the thread of its render
+            :param self: The class instance
+            :type self: ScanService
+            :param scan: the scan of a target
+            :type scan: ScanDisk
+            :return: None when the scan is done, else its error
+            :rtype: BaseException
+        """
+        try:
+            scan.run()
+        except (Exception, SystemExit) as error:
+            self.logger.error(f'Le scan de {scan.directory} a échoué. ' +
+                              f'L\'erreur {error!r} a été générée')
+            return error
+        return None
+
+
+def target_output(directory, output=None):
+    """
+        Returns the name of the output file of a target, made of its path
+        :param directory: the folder of the target
+        :type directory: Path or String
+        :param output: the prefix of the names given on the command line
+        :type output: String
+        :return: the name of the output file
+        :rtype: String
+    """
+    name = '_'.join(pathlib.Path(directory).resolve().parts[1:]) or 'root'
+    return f'{output}_{name}' if output else name
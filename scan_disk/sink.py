@@ -0,0 +1,383 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Loads the rows of a scan in a database.
+
+    The DatabaseWriter is a writer of the ColumnExporter (see
+    scan_disk.export): it is given the same batches of rows as the Parquet
+    or CSV writers. Each batch is put in a bounded queue and inserted with
+    executemany by loader threads, each one holding a connection of the
+    pool. When the database is slower than the walk, the queue fills up and
+    the scan waits for a batch to be loaded, so that at most queue_size
+    batches are held in memory.
+
+    The rows land in SQLite, with the sqlite3 module, or in MariaDB and
+    MySQL with mysql.connector. Both are only imported when they are used.
+    mysql.connector sends the batch of an executemany as a single
+    multi-row INSERT.
+
+    Each scan gets a row of the scans table, its id is the scan column of
+    the entries table. An entry has the row id given by the export, unique
+    in its scan, and the id of its parent folder, -1 for the top folder.
+    The paths which are not utf-8 are stored with their undecodable bytes
+    written as \\xNN.
+"""
+
+import contextlib
+import queue
+import re
+import threading
+import time
+
+import scan_disk.export as export
+
+# The keys of the database configuration, see config/database.yml
+KEYS = ('dialect', 'path', 'connection', 'batch_rows', 'loaders',
+        'queue_size')
+
+# The columns of the entries table
+COLUMNS = ('scan', 'id') + export.COLUMNS
+
+# The undecodable bytes of a path, escaped by os.fsdecode
+_SURROGATES = re.compile('[\udc80-\udcff]')
+
+
+class LoadError(IOError):
+    """
+        A batch of rows could not be loaded in the database
+    """
+
+
+class Dialect:
+
+    def __init__(self, name, placeholder, integer, serial, real):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: Dialect
+            :param name: The name of the dialect
+            :type name: String
+            :param placeholder: The placeholder of the parameters
+            :type placeholder: String
+            :param integer: The type of the integer columns
+            :type integer: String
+            :param serial: The type of the generated ids
+            :type serial: String
+            :param real: The type of the dates
+            :type real: String
+        """
+        self.name = name
+        self.placeholder = placeholder
+        self.integer = integer
+        self.serial = serial
+        self.real = real
+
+    def create_tables(self):
+        """
+            Returns the statements creating the tables
+        """
+        columns = ', '.join(
+            f'{name} TEXT' if name == 'path' else f'{name} {self.integer}'
+            for name in COLUMNS)
+        return ('CREATE TABLE IF NOT EXISTS scans (' +
+                f'id {self.serial}, top TEXT, started {self.real})',
+                f'CREATE TABLE IF NOT EXISTS entries ({columns}, ' +
+                'PRIMARY KEY (scan, id))')
+
+    def insert_scan(self):
+        """
+            Returns the statement adding a scan
+        """
+        return ('INSERT INTO scans (top, started) VALUES ' +
+                f'({self.placeholder}, {self.placeholder})')
+
+    def insert_entries(self):
+        """
+            Returns the statement adding a row of the entries table
+        """
+        return (f'INSERT INTO entries ({", ".join(COLUMNS)}) VALUES (' +
+                ', '.join([self.placeholder] * len(COLUMNS)) + ')')
+
+
+DIALECTS = {
+    'sqlite': Dialect('sqlite', '?', 'INTEGER',
+                      'INTEGER PRIMARY KEY AUTOINCREMENT', 'REAL'),
+    'mariadb': Dialect('mariadb', '%s', 'BIGINT',
+                       'BIGINT AUTO_INCREMENT PRIMARY KEY', 'DOUBLE'),
+}
+
+
+class ConnectionPool:
+
+    def __init__(self, connect, size):
+        """
+            Constructor, the connections are opened when they are needed
+            :param self: The class instance
+            :type self: ConnectionPool
+            :param connect: The function opening a connection
+            :type connect: Callable
+            :param size: The maximum number of connections
+            :type size: int
+        """
+        if size < 1:
+            raise ValueError(f'Invalid number of connections {size}')
+        self.connect = connect
+        self.size = size
+        self.idle = queue.LifoQueue()
+        self.opened = []
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+            Lends a connection, it waits for one to be given back when
+            size connections are lent
+            :param self: The class instance
+            :type self: ConnectionPool
+            :return: the connection
+            :rtype: Connection
+        """
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                opened = len(self.opened) < self.size
+                if opened:
+                    connection = self.connect()
+                    self.opened.append(connection)
+            if not opened:
+                connection = self.idle.get()
+        try:
+            yield connection
+        finally:
+            self.idle.put(connection)
+
+    def close(self):
+        """
+            Closes the connections
+            :param self: The class instance
+            :type self: ConnectionPool
+        """
+        with self.lock:
+            for connection in self.opened:
+                connection.close()
+            self.opened = []
+
+
+def connect_sqlite(path):
+    """
+        Returns the function opening a connection to a SQLite file
+        :param path: the path of the SQLite file
+        :type path: Path or String
+        :return: the function opening a connection
+        :rtype: Callable
+    """
+    import sqlite3
+
+    # the connections are used by the loader threads, a loader waits for
+    # the lock of the file held by another one
+    return lambda: sqlite3.connect(str(path), timeout=60,
+                                   check_same_thread=False)
+
+
+def connect_mariadb(config):
+    """
+        Returns the function opening a connection to MariaDB or MySQL
+        :param config: the arguments of mysql.connector.connect: host, port,
+                       user, password, database...
+        :type config: Dict
+        :return: the function opening a connection
+        :rtype: Callable
+    """
+    import mysql.connector
+
+    return lambda: mysql.connector.connect(**config)
+
+
+class DatabaseWriter:
+
+    # The number of rows inserted at once
+    BATCH_ROWS = 10000
+
+    # The pool is closed with the writer when it was created by from_config
+    owns_pool = False
+
+    def __init__(self, pool, top, dialect='sqlite', batch_rows=None,
+                 loaders=1, queue_size=4):
+        """
+            Constructor, creates the tables and adds the scan
+            :param self: The class instance
+            :type self: DatabaseWriter
+            :param pool: The pool of connections, of at least loaders
+                         connections
+            :type pool: ConnectionPool
+            :param top: The top folder of the scan
+            :type top: String
+            :param dialect: The name of the dialect, see DIALECTS
+            :type dialect: String
+            :param batch_rows: The number of rows inserted at once
+            :type batch_rows: int
+            :param loaders: The number of threads inserting the rows
+            :type loaders: int
+            :param queue_size: The number of batches waiting to be inserted
+            :type queue_size: int
+        """
+        if dialect not in DIALECTS:
+            raise ValueError(f'Unknown dialect {dialect}')
+        if loaders < 1 or queue_size < 1:
+            raise ValueError(f'Invalid loaders {loaders} or queue size ' +
+                             f'{queue_size}')
+        self.pool = pool
+        self.dialect = DIALECTS[dialect]
+        self.batch_rows = batch_rows or self.BATCH_ROWS
+        self.rows = 0
+        self.queue = queue.Queue(queue_size)
+        self.error = None
+        self.insert = self.dialect.insert_entries()
+        try:
+            with pool.connection() as connection:
+                cursor = connection.cursor()
+                for statement in self.dialect.create_tables():
+                    cursor.execute(statement)
+                cursor.execute(self.dialect.insert_scan(), (top, time.time()))
+                self.scan = cursor.lastrowid
+                connection.commit()
+        except Exception as error:
+            raise LoadError(f'The scan can not be added: {error}') from error
+        self.loaders = [threading.Thread(target=self.load, daemon=True)
+                        for _ in range(loaders)]
+        for loader in self.loaders:
+            loader.start()
+
+    @classmethod
+    def from_config(cls, config, top):
+        """
+            Creates the writer of a dict loaded from a YAML file
+            :param cls: The DatabaseWriter class
+            :type cls: type
+            :param config: the configuration by key, see KEYS
+            :type config: Dict
+            :param top: the top folder of the scan
+            :type top: String
+            :return: the writer, which closes its pool
+            :rtype: DatabaseWriter
+            :raise ValueError: the config holds an unknown key or is an
+                               error of utils.yaml_to_dict
+        """
+        config = dict(config or {})
+        if 'erreur' in config:
+            raise ValueError(f'Invalid database: {config["erreur"]}')
+        unknown = set(config) - set(KEYS)
+        if unknown:
+            raise ValueError('Unknown database keys: ' +
+                             ', '.join(sorted(unknown)))
+        dialect = config.get('dialect', 'sqlite')
+        if dialect == 'sqlite':
+            if not config.get('path'):
+                raise ValueError('The SQLite database needs a path')
+            connect = connect_sqlite(config['path'])
+        elif dialect == 'mariadb':
+            connect = connect_mariadb(config.get('connection') or {})
+        else:
+            raise ValueError(f'Unknown dialect {dialect}')
+        loaders = config.get('loaders') or 1
+        pool = ConnectionPool(connect, loaders)
+        try:
+            writer = cls(pool, top, dialect, config.get('batch_rows'),
+                         loaders, config.get('queue_size') or 4)
+        except Exception:
+            pool.close()
+            raise
+        writer.owns_pool = True
+        return writer
+
+    def write(self, paths, columns):
+        """
+            Queues a batch of rows, it waits while the queue is full
+            :param self: The class instance
+            :type self: DatabaseWriter
+            :param paths: the paths of the rows
+            :type paths: List
+            :param columns: the other columns of the rows
+            :type columns: List of array.array
+            :raise LoadError: a previous batch could not be loaded
+        """
+        paths = [_SURROGATES.sub(_escape, path) for path in paths]
+        rows = list(zip([self.scan] * len(paths),
+                        range(self.rows, self.rows + len(paths)),
+                        paths, *columns))
+        self.rows += len(paths)
+        # the loaders may all have stopped on an error, the queue would
+        # never be emptied
+        while True:
+            self.check()
+            try:
+                self.queue.put(rows, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def load(self):
+        """
+            Inserts the queued batches until the writer is closed, in a
+            loader thread
+            :param self: The class instance
+            :type self: DatabaseWriter
+        """
+        try:
+            with self.pool.connection() as connection:
+                cursor = connection.cursor()
+                while True:
+                    rows = self.queue.get()
+                    if rows is None:
+                        return
+                    cursor.executemany(self.insert, rows)
+                    connection.commit()
+        except Exception as error:
+            self.error = error
+            # the batches left are dropped so that write does not wait
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    return
+
+    def check(self):
+        """
+            Raises the error of a loader
+            :param self: The class instance
+            :type self: DatabaseWriter
+            :raise LoadError: a batch could not be loaded
+        """
+        if self.error is not None:
+            raise LoadError(f'The rows can not be loaded: {self.error}')
+
+    def close(self):
+        """
+            Waits for the queued batches to be loaded and stops the loaders
+            :param self: The class instance
+            :type self: DatabaseWriter
+            :raise LoadError: a batch could not be loaded
+        """
+        try:
+            for loader in self.loaders:
+                # a loader stopped on an error may have taken the None of
+                # another one
+                while loader.is_alive():
+                    try:
+                        self.queue.put(None, timeout=0.1)
+                    except queue.Full:
+                        pass
+                    loader.join(0.1)
+        finally:
+            if self.owns_pool:
+                self.pool.close()
+        self.check()
+
+
+def _escape(match):
+    """
+        Writes an undecodable byte of a path as \\xNN
+    """
+    return f'\\x{ord(match.group()) - 0xdc00:02x}'
@@ -0,0 +1,82 @@
+#! /usr/bin/env python3
+
+import pathlib
+import random
+import sys
+import tempfile
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.diff import *
+from scan_disk.export import CsvWriter, NdjsonWriter, open_text
+
+
+def row(path, size, mode=0o100644, mtime=1):
+    return (path, 0, size, mode, 1000, 1000, mtime, mtime, mtime)
+
+
+class DiffTestCase(unittest.TestCase):
+    """
+        Checks the functions of the diff module.
+    """
+    def setUp(self):
+        self.old = [row('/d', 4096, 0o40755), row('/d/gone', 10),
+                    row('/d/grow', 10), row('/d/keep', 10),
+                    row('/d/mod', 10)]
+        self.new = [row('/d', 4096, 0o40755, mtime=2), row('/d/grow', 20),
+                    row('/d/keep', 10), row('/d/mod', 10, mtime=2),
+                    row('/d/new', 5)]
+
+    def test_01_diff_rows(self):
+        print('test 1')
+        expect = [(DELETED, '/d/gone', 10, 0),
+                  (GROWN, '/d/grow', 10, 20),
+                  (MODIFIED, '/d/mod', 10, 10),
+                  (NEW, '/d/new', 0, 5)]
+        result = list(diff_rows(self.old, self.new))
+        self.assertEqual(expect, result)
+
+    def test_02_sort_rows_runs(self):
+        print('test 2')
+        rows = [row(f'/d/{i:04d}', i) for i in range(1000)]
+        shuffled = rows[:]
+        random.shuffle(shuffled)
+        result = list(sort_rows(shuffled, run_rows=64))
+        self.assertEqual(rows, result)
+
+    def test_03_read_export(self):
+        print('test 3')
+        with tempfile.TemporaryDirectory() as tmp:
+            for writer, name in ((CsvWriter, 'scan.csv'),
+                                 (NdjsonWriter, 'scan.ndjson.gz')):
+                path = pathlib.Path(tmp) / name
+                compression = 'gzip' if name.endswith('.gz') else None
+                f = writer(open_text(path, compression))
+                f.write([r[0] for r in self.old],
+                        [[r[i] for r in self.old] for i in range(1, 9)])
+                f.close()
+                self.assertEqual(self.old, list(read_export(path)))
+
+    def test_04_diff_report(self):
+        print('test 4')
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = []
+            for name, rows in (('old.csv', self.old), ('new.csv', self.new)):
+                path = pathlib.Path(tmp) / name
+                f = CsvWriter(open_text(path))
+                f.write([r[0] for r in reversed(rows)],
+                        [[r[i] for r in reversed(rows)] for i in range(1, 9)])
+                f.close()
+                paths.append(path)
+            report = DiffReport(*paths, n=1).compare(run_rows=2)
+        self.assertEqual({NEW: 1, DELETED: 1, GROWN: 1, MODIFIED: 1},
+                         report.counts)
+        self.assertEqual(-10, report.sizes[DELETED])
+        self.assertEqual([(10, '/d/grow', 10, 20)],
+                         report.largest[GROWN].largest())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#! /usr/bin/env python3
+
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.duplicates import *
+from scan_disk.walker import Walker
+
+
+class DuplicateFinderTestCase(unittest.TestCase):
+    """
+        Checks the methods of the duplicate finder class.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.tmp.name)
+        (self.directory / 'a').mkdir()
+        (self.directory / 'one.txt').write_text('same')
+        (self.directory / 'a' / 'two.txt').write_text('same')
+        (self.directory / 'other.txt').write_text('diff')
+        (self.directory / 'empty1').write_text('')
+        (self.directory / 'empty2').write_text('')
+        os.link(self.directory / 'other.txt', self.directory / 'a' / 'link')
+        self.logger = logging.getLogger('test')
+        self.finder = DuplicateFinder(self.logger, workers=2)
+        for dirpath, _, files in Walker(self.logger).walk(self.directory):
+            self.finder.add(dirpath, records.Entries(files))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_01_hard_links(self):
+        print('test 1')
+        result = self.finder.hard_links()
+        self.assertEqual(1, len(result))
+        size, paths = result[0]
+        self.assertEqual(4, size)
+        self.assertEqual({str(self.directory / 'other.txt'),
+                          str(self.directory / 'a' / 'link')}, set(paths))
+
+    def test_02_duplicates(self):
+        print('test 2')
+        result = self.finder.duplicates()
+        self.assertEqual([(4, [str(self.directory / 'one.txt'),
+                               str(self.directory / 'a' / 'two.txt')])],
+                         [(size, paths) for size, paths in result])
+
+    def test_03_duplicates_large_files(self):
+        print('test 3')
+        block = DuplicateFinder.BLOCK_SIZE
+        content = os.urandom(3 * block)
+        changed = content[:block] + bytes(block) + content[2 * block:]
+        (self.directory / 'big1').write_bytes(content)
+        (self.directory / 'big2').write_bytes(content)
+        (self.directory / 'big3').write_bytes(changed)
+        finder = DuplicateFinder(self.logger)
+        for dirpath, _, files in Walker(self.logger).walk(self.directory):
+            finder.add(dirpath, records.Entries(files))
+        result = finder.duplicates()
+        self.assertEqual((3 * block, [str(self.directory / 'big1'),
+                                      str(self.directory / 'big2')]),
+                         (result[0][0], sorted(result[0][1])))
+        self.assertEqual(3 * block, DuplicateFinder.reclaimable(result[0]))
+
+    def test_04_duplicates_unreadable_file(self):
+        print('test 4')
+        (self.directory / 'one.txt').unlink()
+        (self.directory / 'three.txt').write_text('same')
+        finder = DuplicateFinder(self.logger)
+        for dirpath, _, files in Walker(self.logger).walk(self.directory):
+            finder.add(dirpath, records.Entries(files))
+        (self.directory / 'three.txt').unlink()
+        self.assertEqual([], finder.duplicates())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+#! /usr/bin/env python3
+
+import csv
+import gzip
+import importlib.util
+import io
+import json
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+import scan_disk.records as records
+from scan_disk.export import *
+from scan_disk.walker import Walker
+
+
+class ListWriter:
+    """
+        Keeps the batches given by the exporter
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.closed = False
+
+    def write(self, paths, columns):
+        self.batches.append((list(paths), [list(column)
+                                           for column in columns]))
+
+    def close(self):
+        self.closed = True
+
+
+class ColumnExporterTestCase(unittest.TestCase):
+    """
+        Checks the methods of the column exporter class.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.tmp.name)
+        (self.directory / 'a' / 'b').mkdir(parents=True)
+        (self.directory / 'a' / 'file.txt').write_text('hello')
+        (self.directory / 'top.txt').write_text('top')
+        self.writer = ListWriter()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def export(self, exporter):
+        exporter.add_top(str(self.directory), os.lstat(self.directory))
+        for dirpath, dirs, files in Walker(logging.getLogger('test')).walk(
+                self.directory):
+            exporter.add_folder(dirpath, records.Entries(dirs),
+                                records.Entries(files))
+        exporter.close()
+
+    def test_01_rows(self):
+        print('test 1')
+        self.export(ColumnExporter(self.writer))
+        self.assertTrue(self.writer.closed)
+        self.assertEqual(1, len(self.writer.batches))
+        paths, columns = self.writer.batches[0]
+        parents = dict(zip(paths, columns[0]))
+        top = str(self.directory)
+        self.assertEqual(-1, parents[top])
+        self.assertEqual(paths.index(top), parents[os.path.join(top, 'a')])
+        self.assertEqual(paths.index(os.path.join(top, 'a')),
+                         parents[os.path.join(top, 'a', 'file.txt')])
+        sizes = dict(zip(paths, columns[1]))
+        self.assertEqual(5, sizes[os.path.join(top, 'a', 'file.txt')])
+
+    def test_02_batches(self):
+        print('test 2')
+        self.export(ColumnExporter(self.writer, batch_rows=2))
+        self.assertGreater(len(self.writer.batches), 1)
+        paths = [path for batch in self.writer.batches for path in batch[0]]
+        self.assertEqual(5, len(paths))
+
+    @unittest.skipUnless(importlib.util.find_spec('numpy'),
+                         'numpy is not installed')
+    def test_03_npz_load(self):
+        print('test 3')
+        path = self.directory / 'scan.npz'
+        self.export(ColumnExporter(NpzWriter(path)))
+        result = load_columns(path)
+        self.assertEqual(str(self.directory), result['path'][0])
+        self.assertEqual(-1, result['parent'][0])
+        self.assertEqual(len(result['path']), len(result['size']))
+
+    def test_04_csv(self):
+        print('test 4')
+        with tempfile.TemporaryDirectory() as output:
+            path = pathlib.Path(output) / 'scan.csv'
+            self.export(ColumnExporter(CsvWriter(open_text(path)),
+                                       batch_rows=1))
+            with open(path, encoding='utf-8', newline='') as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(list(COLUMNS), rows[0])
+        self.assertEqual([str(self.directory), '-1'], rows[1][:2])
+        self.assertEqual(6, len(rows))
+
+    def test_05_ndjson_gzip(self):
+        print('test 5')
+        with tempfile.TemporaryDirectory() as output:
+            path = pathlib.Path(output) / 'scan.ndjson.gz'
+            self.export(ColumnExporter(NdjsonWriter(open_text(path, 'gzip')),
+                                       batch_rows=1))
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                rows = [json.loads(line) for line in f]
+        self.assertEqual(5, len(rows))
+        self.assertEqual(list(COLUMNS), list(rows[0]))
+        self.assertEqual(-1, rows[0]['parent'])
+
+    def test_06_ndjson_not_utf8(self):
+        print('test 6')
+        f = io.StringIO()
+        NdjsonWriter(f).write(['/tmp/\udcff'], [[-1]] + [[0]] * 7)
+        self.assertEqual('/tmp/\udcff', json.loads(f.getvalue())['path'])
+
+    def test_07_open_text_ko(self):
+        print('test 7')
+        with self.assertRaises(ValueError):
+            open_text(self.directory / 'scan.csv', 'rar')
+
+    @unittest.skipUnless(importlib.util.find_spec('pyarrow'),
+                         'pyarrow is not installed')
+    def test_08_parquet_load(self):
+        print('test 8')
+        with tempfile.TemporaryDirectory() as output:
+            path = pathlib.Path(output) / 'scan.parquet'
+            self.export(ColumnExporter(ParquetWriter(path), batch_rows=2))
+            result = load_columns(path)
+        self.assertEqual(str(self.directory), result['path'][0])
+        self.assertEqual(-1, result['parent'][0])
+        self.assertEqual(5, len(result['path']))
+        sizes = dict(zip(result['path'], result['size']))
+        self.assertEqual(5, sizes[os.path.join(str(self.directory), 'a',
+                                               'file.txt')])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+#! /usr/bin/env python3
+
+import logging
+import os
+import pathlib
+import sys
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.formatting import *
+from scan_disk.records import Entries, Totals
+
+
+class FormatterTestCase(unittest.TestCase):
+    """
+        Checks the methods of the formatter class.
+    """
+    def setUp(self):
+        self.formatter = Formatter(logging.getLogger('test'))
+
+    def test_01_format_stats_ok(self):
+        print('test 1')
+        result = self.formatter.format_stats(os.stat(__file__))
+        self.assertEqual(list(STAT_KEYS), list(result))
+
+    def test_02_format_entries_ok(self):
+        print('test 2')
+        stats = os.stat(__file__)
+        entries = Entries([('a.txt', stats)])
+        expect = self.formatter.format_stats(stats)
+        result = self.formatter.format_entries(entries)['a.txt']
+        self.assertEqual(expect, {key: result[key] for key in STAT_KEYS})
+        self.assertEqual('1', result['fichiers'])
+
+    def test_03_format_entries_error(self):
+        print('test 3')
+        error = FileNotFoundError(2, 'No such file or directory')
+        result = self.formatter.format_entries(Entries([('a.txt', error)]))
+        self.assertIs(error, result['a.txt']['error'])
+
+    def test_04_format_entries_empty(self):
+        print('test 4')
+        expect = {'null': None}
+        result = self.formatter.format_entries(Entries())
+        self.assertEqual(expect, result)
+
+    def test_05_format_entries_folder_totals(self):
+        print('test 5')
+        stats = os.stat(file_path / 'scan_disk')
+        entries = Entries([('tests', stats)])
+        total = Totals(size=2048, files=3, blocks=8)
+        result = self.formatter.format_entries(entries, {'tests': total})
+        self.assertEqual('', result['tests']['total'])
+        total.done = True
+        result = self.formatter.format_entries(entries, {'tests': total})
+        self.assertEqual('3', result['tests']['fichiers'])
+        self.assertEqual(str(8 + stats.st_blocks), result['tests']['blocs'])
+
+    def test_06_format_total(self):
+        print('test 6')
+        total = Totals(size=4096, files=3, blocks=8)
+        self.assertIsNone(self.formatter.format_total(total))
+        total.done = True
+        expect = '4 Ko, 3 fichiers, 8 blocs'
+        self.assertEqual(expect, self.formatter.format_total(total))
+
+
+    def test_07_decode_mode_types(self):
+        print('test 7')
+        self.assertEqual(('Lien ', 'rwx rwx rwx '), decode_mode(0o120777))
+        self.assertEqual(('Socket ', 'rwx r-x r-x '), decode_mode(0o140755))
+        self.assertEqual(('Fifo ', 'rw- r-- r-- '), decode_mode(0o10644))
+        self.assertEqual(('Car ', 'rw- -w- --- '), decode_mode(0o20620))
+        self.assertEqual(('Bloc ', 'rw- rw- --- '), decode_mode(0o60660))
+        self.assertEqual(('Rep ', 'rwx rwx rwx '), decode_mode(0o41777))
+        self.assertEqual(('Inconnu ', '--- --- --- '), decode_mode(0))
+
+    def test_08_format_rows_same_as_format_row(self):
+        print('test 8')
+        stats = [os.lstat(file_path / 'scan_disk'), os.lstat(__file__)]
+        entries = Entries(zip(('a', 'b'), stats))
+        expect = [self.formatter.format_row(entry) for entry in stats]
+        result = list(self.formatter.format_rows(entries))
+        self.assertEqual(expect, result)
+
+
+if __name__ == "__main__":
+    unittest.main()
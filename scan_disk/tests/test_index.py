@@ -0,0 +1,148 @@
+#! /usr/bin/env python3
+
+import errno
+import logging
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.index import *
+from scan_disk.records import Entries
+from scan_disk.scan_disk import ScanDisk
+from scan_disk.walker import Walker
+
+
+class IndexTestCase(unittest.TestCase):
+    """
+        Checks the methods of the index classes.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.tmp.name) / 'tree'
+        (self.directory / 'a' / 'b').mkdir(parents=True)
+        (self.directory / 'a' / 'file.txt').write_text('hello')
+        self.logger = logging.getLogger('test')
+        self.index_path = pathlib.Path(self.tmp.name) / 'index.db'
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def walk(self, full=False, timestamp_ns=None):
+        scan_index = ScanIndex(self.index_path, self.logger)
+        if timestamp_ns is not None:
+            scan_index.TIMESTAMP_NS = timestamp_ns
+        walker = IndexedWalker(Walker(self.logger), scan_index, full)
+        result = {dirpath: (dict(dirs), dict(files))
+                  for dirpath, dirs, files in walker.walk(self.directory)}
+        scan_index.close()
+        return result
+
+    def test_01_walk_same_as_walker(self):
+        print('test 1')
+        expect = [dirpath for dirpath, _, _
+                  in Walker(self.logger).walk(self.directory)]
+        result = list(self.walk())
+        self.assertEqual(expect, result)
+        self.assertEqual(expect, list(self.walk()))
+
+    def test_02_unchanged_folder_reused(self):
+        print('test 2')
+        # the folders have just been made, they are trusted all the same
+        self.walk(timestamp_ns=0)
+        (self.directory / 'a' / 'file.txt').write_text('hello world')
+        result = self.walk(timestamp_ns=0)
+        files = result[str(self.directory / 'a')][1]
+        self.assertEqual(5, files['file.txt'].st_size)
+
+    def test_03_full_rescan(self):
+        print('test 3')
+        self.walk()
+        (self.directory / 'a' / 'file.txt').write_text('hello world')
+        result = self.walk(full=True)
+        files = result[str(self.directory / 'a')][1]
+        self.assertEqual(11, files['file.txt'].st_size)
+
+    def test_04_changed_folder_read(self):
+        print('test 4')
+        self.walk()
+        (self.directory / 'a' / 'new.txt').write_text('new')
+        result = self.walk()
+        self.assertIn('new.txt', result[str(self.directory / 'a')][1])
+
+    def test_05_vanished_folder_purged(self):
+        print('test 5')
+        self.walk()
+        (self.directory / 'a' / 'b').rmdir()
+        self.walk()
+        scan_index = ScanIndex(self.index_path, self.logger)
+        paths = [row[0] for row in scan_index.connection.execute(
+            'SELECT path FROM folders')]
+        scan_index.close()
+        self.assertNotIn(str(self.directory / 'a' / 'b'), paths)
+        self.assertIn(str(self.directory / 'a'), paths)
+
+    def test_06_walk_ko(self):
+        print('test 6')
+        self.directory = self.directory / 'missing'
+        self.assertEqual({}, self.walk())
+
+    def test_07_workers_ko(self):
+        print('test 7')
+        with self.assertRaises(ValueError):
+            ScanDisk(self.directory, None, self.logger, workers=2,
+                     index_path=self.index_path)
+
+    def test_08_entries_plain_data(self):
+        print('test 8')
+        dirpath = str(self.directory / 'a')
+        stats = os.stat(dirpath)
+        files = Entries([('file.txt', os.stat(self.directory / 'a' /
+                                              'file.txt')),
+                         ('\udcff.bin', PermissionError(
+                             errno.EACCES, 'Permission denied', 'x'))])
+        scan_index = ScanIndex(self.index_path, self.logger)
+        scan_index.store(dirpath, stats, time.time_ns(), Entries(), files)
+        types = scan_index.connection.execute(
+            'SELECT typeof(file_names), typeof(file_columns), '
+            'typeof(file_errors) FROM folders').fetchone()
+        dirs, result = scan_index.entries(dirpath)
+        scan_index.close()
+        self.assertEqual(('text', 'blob', 'text'), types)
+        self.assertEqual(0, len(dirs))
+        self.assertEqual(files['file.txt'], result['file.txt'])
+        error = result['\udcff.bin']
+        self.assertIsInstance(error, PermissionError)
+        self.assertEqual((errno.EACCES, 'x'), (error.errno, error.filename))
+
+    def test_09_old_schema_emptied(self):
+        print('test 9')
+        with sqlite3.connect(self.index_path) as connection:
+            connection.execute('CREATE TABLE folders (path TEXT PRIMARY KEY, '
+                               'dirs BLOB, files BLOB)')
+            connection.execute("INSERT INTO folders VALUES ('/a', x'80', "
+                               "x'80')")
+        connection.close()
+        scan_index = ScanIndex(self.index_path, self.logger)
+        self.assertIsNone(scan_index.top())
+        scan_index.close()
+        self.assertIn(str(self.directory), self.walk())
+
+    def test_10_racy_folder_read(self):
+        print('test 10')
+        # the folders were changed less than TIMESTAMP_NS before their read
+        self.walk()
+        (self.directory / 'a' / 'file.txt').write_text('hello world')
+        result = self.walk()
+        files = result[str(self.directory / 'a')][1]
+        self.assertEqual(11, files['file.txt'].st_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#! /usr/bin/env python3
+
+import json
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.metrics import *
+from scan_disk.scan_disk import ScanDisk
+from scan_disk.scan_render import ScanRender
+
+
+class MetricsTestCase(unittest.TestCase):
+    """
+        Checks the methods of the metrics class.
+    """
+    def setUp(self):
+        self.metrics = Metrics()
+        self.logger = logging.getLogger('test')
+
+    def test_01_phase(self):
+        print('test 1')
+        with phase(None, 'render'):
+            time.sleep(0.01)
+        self.assertEqual(0.0, self.metrics.wall['render'])
+        with self.metrics.phase('render'):
+            time.sleep(0.01)
+        self.assertGreaterEqual(self.metrics.wall['render'], 0.01)
+        self.assertEqual(0.0, self.metrics.wall['walk'])
+
+    def test_02_timed(self):
+        print('test 2')
+        result = list(self.metrics.timed(range(3), 'walk'))
+        self.assertEqual([0, 1, 2], result)
+        self.assertGreater(self.metrics.wall['walk'], 0.0)
+
+    def test_03_write(self):
+        print('test 3')
+        self.metrics.count('files', 3)
+        self.metrics.count('errors')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'metrics.json'
+            self.metrics.write(path)
+            result = json.loads(path.read_text())
+        self.assertEqual(3, result['counters']['files'])
+        self.assertEqual(1, result['counters']['errors'])
+        self.assertEqual(set(PHASES), set(result['phases']))
+
+    def test_04_scan_counters(self):
+        print('test 4')
+        directory = file_path / 'scan_disk' / 'tests'
+        scan = ScanDisk(directory, None, self.logger,
+                        scan_metrics=self.metrics)
+        result = scan.read_directory(directory)
+        top = result[str(directory)]['total']
+        self.assertEqual(len(result), self.metrics.counters['directories'])
+        self.assertEqual(top.files, self.metrics.counters['files'])
+        self.assertGreater(self.metrics.wall['walk'], 0.0)
+        self.assertGreater(self.metrics.wall['stat'], 0.0)
+
+    def test_05_profile(self):
+        print('test 5')
+        with tempfile.TemporaryDirectory() as tmp:
+            path = pathlib.Path(tmp) / 'scan.prof'
+            result = profile(lambda: sum(range(1000)), path, self.logger,
+                             self.metrics)
+            self.assertTrue(path.stat().st_size > 0)
+        self.assertEqual(499500, result)
+        self.assertIn('peak_traced_mb', self.metrics.as_dict())
+
+    def test_06_bytes_written(self):
+        print('test 6')
+        directory = file_path / 'scan_disk' / 'tests'
+        scan = ScanDisk(directory, None, self.logger)
+        html = file_path / 'html'
+        paths = [html / 'test_metrics.html', html / 'test_metrics.csv.gz']
+        try:
+            self.assertEqual((200, None), ScanRender(
+                scan.read_directory(directory), directory,
+                output='test_metrics', metrics=self.metrics).render_html())
+            self.assertEqual((200, None), ScanRender(
+                scan.iter_directory(directory), directory,
+                output='test_metrics', compression='gzip',
+                metrics=self.metrics).render_csv())
+            self.assertEqual(sum(path.stat().st_size for path in paths),
+                             self.metrics.counters['bytes_written'])
+        finally:
+            for path in paths:
+                path.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
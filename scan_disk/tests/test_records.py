@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+
+import os
+import pathlib
+import pickle
+import sys
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.records import *
+
+
+class RecordsTestCase(unittest.TestCase):
+    """
+        Checks the methods of the records classes.
+    """
+    def setUp(self):
+        self.stats = os.stat(__file__)
+        self.error = FileNotFoundError(2, 'No such file or directory')
+        self.entries = Entries([('a.txt', self.stats),
+                                ('b.txt', self.error)])
+
+    def test_01_entries_mapping(self):
+        print('test 1')
+        self.assertEqual(['a.txt', 'b.txt'], list(self.entries))
+        self.assertEqual(2, len(self.entries))
+        self.assertIs(self.error, self.entries['b.txt'])
+
+    def test_02_entries_raw_stats(self):
+        print('test 2')
+        entry = self.entries['a.txt']
+        self.assertEqual(self.stats.st_ino, entry.st_ino)
+        self.assertEqual(int(self.stats.st_mtime), entry.st_mtime)
+
+    def test_03_entries_ko(self):
+        print('test 3')
+        with self.assertRaises(KeyError):
+            self.entries['c.txt']
+
+    def test_04_entries_pickle(self):
+        print('test 4')
+        result = pickle.loads(pickle.dumps(self.entries))
+        self.assertEqual(self.entries['a.txt'], result['a.txt'])
+        self.assertIsInstance(result['b.txt'], FileNotFoundError)
+
+    def test_05_entry_slots(self):
+        print('test 5')
+        with self.assertRaises(AttributeError):
+            self.entries['a.txt'].other = 1
+
+    def test_06_totals_of_stats(self):
+        print('test 6')
+        pairs = [('a.txt', self.stats), ('b.txt', self.error)]
+        expect = Totals()
+        expect.add_entries(Entries(), self.entries)
+        result = Totals()
+        result.add_entries(Totals.of_stats([]),
+                           Totals.of_stats(pairs, files=True))
+        self.assertEqual(expect, result)
+        self.assertEqual(1, result.files)
+        self.assertEqual(0, Totals.of_stats(pairs).files)
+
+
+if __name__ == "__main__":
+    unittest.main()
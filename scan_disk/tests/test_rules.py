@@ -0,0 +1,90 @@
+#! /usr/bin/env python3
+
+import os
+import pathlib
+import sys
+import time
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.rules import *
+
+
+def file_stats(size=10, mtime=None, mode=0o100644, dev=1):
+    mtime = time.time() if mtime is None else mtime
+    return os.stat_result((mode, 1, dev, 1, 0, 0, size, mtime, mtime, mtime),
+                          {'st_mtime': mtime})
+
+
+class RulesTestCase(unittest.TestCase):
+    """
+        Checks the methods of the rules class.
+    """
+    def test_01_excluded_globs(self):
+        print('test 1')
+        rules = Rules(exclude=['node_modules', '*.pyc', '/proc'])
+        self.assertTrue(rules.excluded('/a/node_modules', 'node_modules'))
+        self.assertTrue(rules.excluded('/a/b.pyc', 'b.pyc'))
+        self.assertTrue(rules.excluded('/proc', 'proc'))
+        self.assertFalse(rules.excluded('/a/proc', 'proc'))
+        self.assertFalse(rules.excluded('/a/b.py', 'b.py'))
+
+    def test_02_excluded_regex(self):
+        print('test 2')
+        rules = Rules(exclude_regex=[r'/\.git(/|$)', r'\.tmp$'])
+        self.assertTrue(rules.excluded('/a/.git', '.git'))
+        self.assertTrue(rules.excluded('/a/b.tmp', 'b.tmp'))
+        self.assertFalse(rules.excluded('/a/.gitignore', '.gitignore'))
+
+    def test_03_keep_file(self):
+        print('test 3')
+        rules = Rules(include=['*.log'], min_size=5, max_size=100,
+                      newer_than=1)
+        self.assertTrue(rules.keep_file('a.log', file_stats()))
+        self.assertFalse(rules.keep_file('a.txt', file_stats()))
+        self.assertFalse(rules.keep_file('a.log', file_stats(size=1)))
+        self.assertFalse(rules.keep_file('a.log', file_stats(size=1000)))
+        self.assertFalse(rules.keep_file(
+            'a.log', file_stats(mtime=time.time() - 2 * 86400)))
+        # the bounds only apply to the regular files
+        self.assertTrue(rules.keep_file('a.log',
+                                        file_stats(size=1, mode=0o120777)))
+
+    def test_04_walk_dir_one_file_system(self):
+        print('test 4')
+        rules = Rules(one_file_system=True)
+        rules.set_top(file_path)
+        device = os.stat(file_path).st_dev
+        self.assertTrue(rules.walk_dir(file_stats(dev=device)))
+        self.assertFalse(rules.walk_dir(file_stats(dev=device + 1)))
+        self.assertTrue(Rules().walk_dir(file_stats(dev=device + 1)))
+
+    def test_05_from_dict(self):
+        print('test 5')
+        rules = Rules.from_dict({'exclude': ['.git'], 'min_size': 5},
+                                exclude=['*.pyc'], min_size=10,
+                                max_size=None)
+        self.assertTrue(rules.excluded('/a/.git', '.git'))
+        self.assertTrue(rules.excluded('/a/b.pyc', 'b.pyc'))
+        self.assertEqual(10, rules.min_size)
+        self.assertIsNone(rules.max_size)
+        rules = Rules.from_dict({'min_size': 5, 'newer_than': 2,
+                                 'one_file_system': True},
+                                min_size=0, newer_than=0,
+                                one_file_system=None)
+        self.assertEqual(0, rules.min_size)
+        self.assertIsNone(rules.min_mtime)
+        self.assertTrue(rules.one_file_system)
+
+    def test_06_from_dict_ko(self):
+        print('test 6')
+        with self.assertRaises(ValueError):
+            Rules.from_dict({'exclud': ['.git']})
+        with self.assertRaises(ValueError):
+            Rules.from_dict({'erreur': FileNotFoundError()})
+
+
+if __name__ == "__main__":
+    unittest.main()
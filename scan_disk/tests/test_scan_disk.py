@@ -1,7 +1,11 @@
 #! /usr/bin/env python3
 
+import concurrent.futures
+import os
 import pathlib
 import sys
+import tempfile
+import time
 import unittest
 
 file_path = pathlib.Path(__file__).resolve().parents[2]
@@ -122,6 +126,193 @@ class ScanDiskTestCase(unittest.TestCase):
         result = self.scan_disk.calcul_droit(mode)
         self.assertEqual(expect, result)
 
+    def test_16_read_directory_engines_same_keys(self):
+        print('test 16')
+        walk = scan_disk.ScanDisk(self.directory, self.output,
+                                  self.scan_disk.logger, engine='walk')
+        expect = walk.read_directory(self.directory)
+        result = self.scan_disk.read_directory(self.directory)
+        self.assertEqual(sorted(expect), sorted(result))
+        for key, value in expect.items():
+            self.assertEqual(sorted(value['file']),
+                             sorted(result[key]['file']))
+
+    def test_17_search_entries_ko(self):
+        print('test 17')
+        expect = {'null': None}
+        result = self.scan_disk.formatter.format_entries(
+            self.scan_disk.search_entries([]))
+        self.assertEqual(expect, result)
+
+    def test_18_engine_ko(self):
+        print('test 18')
+        with self.assertRaises(ValueError):
+            scan_disk.ScanDisk(self.directory, self.output,
+                               self.scan_disk.logger, engine='unknown')
+
+    def test_19_read_directory_workers(self):
+        print('test 19')
+        threaded = scan_disk.ScanDisk(self.directory, self.output,
+                                      self.scan_disk.logger, workers=3)
+        expect = self.scan_disk.read_directory(self.directory)
+        result = threaded.read_directory(self.directory)
+        self.assertEqual(list(expect), list(result))
+
+    def test_20_workers_ko(self):
+        print('test 20')
+        with self.assertRaises(ValueError):
+            scan_disk.ScanDisk(self.directory, self.output,
+                               self.scan_disk.logger, engine='walk',
+                               workers=2)
+
+    def test_21_read_directory_processes(self):
+        print('test 21')
+        sharded = scan_disk.ScanDisk(self.directory, self.output,
+                                     self.scan_disk.logger, processes=2)
+        sharded.SPLIT_DEPTH = 1
+        expect = self.scan_disk.read_directory(self.directory)
+        result = sharded.read_directory(self.directory)
+        self.assertEqual(expect, result)
+
+    def test_22_search_entries_raw(self):
+        print('test 22')
+        stats = os.stat(self.directory / '__init__.py')
+        result = self.scan_disk.search_entries([('__init__.py', stats)])
+        self.assertEqual(stats.st_size, result['__init__.py'].st_size)
+        self.assertEqual(self.scan_disk.format_stats(stats),
+                         self.scan_disk.format_stats(result['__init__.py']))
+
+    def test_23_iter_directory(self):
+        print('test 23')
+        expect = self.scan_disk.read_directory(self.directory)
+        result = next(self.scan_disk.iter_directory(self.directory))
+        expect = next(iter(expect.values()))
+        for key in ('name', 'repe', 'file'):
+            self.assertEqual(expect[key], result[key])
+        self.assertFalse(result['total'].done)
+
+    def test_24_iter_directory_ko(self):
+        print('test 24')
+        directory = file_path / 'scan_disk' / 'texts'
+        with self.assertRaises(NotADirectoryError):
+            next(self.scan_disk.iter_directory(directory))
+
+    def test_25_read_directory_totals(self):
+        print('test 25')
+        result = self.scan_disk.read_directory(self.directory)
+        top = result[str(self.directory)]['total']
+        data = result[str(self.directory / 'data')]['total']
+        self.assertTrue(top.done)
+        self.assertEqual(2, data.files)
+        self.assertGreater(top.size, data.size)
+        files = sum(len(folder['file'].names) for folder in result.values())
+        self.assertEqual(files, top.files)
+
+    def test_26_read_top(self):
+        print('test 26')
+        files, dirs = self.scan_disk.read_top(self.directory, 2)
+        self.assertEqual(2, len(files))
+        self.assertGreaterEqual(files[0][0], files[1][0])
+        self.assertEqual(str(self.directory), dirs[0][1])
+        result = self.scan_disk.read_directory(self.directory)
+        self.assertEqual(result[str(self.directory)]['total'].size,
+                         dirs[0][0])
+
+    def test_27_read_duplicates(self):
+        print('test 27')
+        links, duplicated = self.scan_disk.read_duplicates(self.directory)
+        self.assertIsInstance(links, list)
+        for size, paths in duplicated:
+            self.assertGreater(len(paths), 1)
+            contents = set()
+            for path in paths:
+                with open(path, 'rb') as f:
+                    contents.add(f.read())
+            self.assertEqual(1, len(contents))
+
+    def test_28_read_directory_max_depth(self):
+        print('test 28')
+        expect = self.scan_disk.read_directory(self.directory)
+        for processes in (1, 2):
+            limited = scan_disk.ScanDisk(self.directory, self.output,
+                                         self.scan_disk.logger,
+                                         processes=processes, max_depth=0)
+            limited.SPLIT_DEPTH = 1
+            result = limited.read_directory(self.directory)
+            self.assertEqual([str(self.directory)], list(result))
+            top = result[str(self.directory)]
+            self.assertEqual(expect[str(self.directory)]['total'],
+                             top['total'])
+            self.assertEqual(expect[str(self.directory / 'data')]['total'],
+                             top['sub_totals']['data'])
+
+    def test_29_read_directory_summary(self):
+        print('test 29')
+        expect = self.scan_disk.read_directory(self.directory)
+        summary = scan_disk.ScanDisk(self.directory, self.output,
+                                     self.scan_disk.logger, summary=True)
+        result = summary.read_directory(self.directory)
+        self.assertEqual(list(expect), list(result))
+        for name, folder in result.items():
+            self.assertEqual(expect[name]['total'], folder['total'])
+            self.assertEqual(len(expect[name]['file']),
+                             folder['file'].files)
+
+    def test_30_max_depth_ko(self):
+        print('test 30')
+        with self.assertRaises(ValueError):
+            scan_disk.ScanDisk(self.directory, self.output,
+                               self.scan_disk.logger, engine='walk',
+                               max_depth=1)
+        with self.assertRaises(ValueError):
+            scan_disk.ScanDisk(self.directory, self.output,
+                               self.scan_disk.logger, summary=True,
+                               output_format='csv')
+
+    def test_31_shard_error_logged(self):
+        print('test 31')
+        missing = str(self.directory / f'missing_{time.time_ns()}')
+        tmp = tempfile.TemporaryDirectory()
+        log_path = pathlib.Path(tmp.name) / 'scan_disk.log'
+        scan_disk.utils.setup_logging(
+            file_path / 'config' / 'logging.yml', log_path)
+        listener = scan_disk.utils.process_listener()
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    1, initializer=scan_disk.init_shard,
+                    initargs=(1, None, None, False,
+                              listener.queue)) as executor:
+                self.assertEqual([], executor.submit(scan_disk.read_shard,
+                                                     missing).result())
+        finally:
+            listener.stop()
+        scan_disk.utils.stop_logging()
+        log = log_path.read_text(encoding='utf-8')
+        tmp.cleanup()
+        self.assertIn(f'Le répertoire {missing} n\'est pas lisible', log)
+
+    def test_32_workers_count_ko(self):
+        print('test 32')
+        for workers in (0, -2):
+            with self.assertRaises(ValueError):
+                scan_disk.ScanDisk(self.directory, self.output,
+                                   self.scan_disk.logger, workers=workers)
+
+    def test_33_processes_count_ko(self):
+        print('test 33')
+        for processes in (0, -2):
+            with self.assertRaises(ValueError):
+                scan_disk.ScanDisk(self.directory, self.output,
+                                   self.scan_disk.logger,
+                                   processes=processes)
+
+    def test_34_top_ko(self):
+        print('test 34')
+        for top_n in (0, -3):
+            with self.assertRaises(ValueError):
+                scan_disk.ScanDisk(self.directory, self.output,
+                                   self.scan_disk.logger, top_n=top_n)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,5 +1,7 @@
 #! /usr/bin/env python3
 
+import importlib.util
+import os
 import pathlib
 import sys
 import unittest
@@ -8,6 +10,8 @@ file_path = pathlib.Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(file_path))
 
 from scan_disk.scan_render import *
+from scan_disk.records import Entries
+from scan_disk.diff import DiffReport
 
 
 class ScanRenderTestCase(unittest.TestCase):
@@ -146,6 +150,197 @@ class ScanRenderTestCase(unittest.TestCase):
         result = render.render_html()[0]
         self.assertEqual(1002, result)
 
+    def test_06_render_html_iterator(self):
+        print('test 6')
+        output = 'test'
+        render = ScanRender(scan_result=iter(self.scan.values()),
+                            directory=self.directory,
+                            output=output)
+        result = render.render_html()[0]
+        self.assertEqual(200, result)
+        with open(render.project_path / 'html' / 'test.html',
+                  encoding='utf-8') as f:
+            html = f.read()
+        for name in self.scan:
+            self.assertIn(f'id="{name}"', html)
+
+    def test_07_render_html_entries(self):
+        print('test 7')
+        entries = Entries([('__init__.py',
+                            os.stat(self.directory / '__init__.py'))])
+        scan = {'tests': {'name': 'tests', 'repe': Entries(), 'file': entries}}
+        render = ScanRender(scan_result=scan,
+                            directory=self.directory,
+                            output='test')
+        result = render.render_html()[0]
+        self.assertEqual(200, result)
+        with open(render.project_path / 'html' / 'test.html',
+                  encoding='utf-8') as f:
+            html = f.read()
+        self.assertIn('__init__.py', html)
+        self.assertIn('La liste est vide', html)
+
+    def test_08_render_html_script_once(self):
+        print('test 8')
+        render = ScanRender(scan_result=self.scan,
+                            directory=self.directory,
+                            output='test')
+        render.render_html()
+        with open(render.project_path / 'html' / 'test.html',
+                  encoding='utf-8') as f:
+            html = f.read()
+        self.assertEqual(1, html.count('sorttable = {'))
+        self.assertEqual(1, html.count('</html>'))
+
+    def test_09_render_html_external_js(self):
+        print('test 9')
+        render = ScanRender(scan_result=self.scan,
+                            directory=self.directory,
+                            output='test',
+                            external_js=True)
+        result = render.render_html()[0]
+        self.assertEqual(200, result)
+        html_path = render.project_path / 'html'
+        with open(html_path / 'test.html', encoding='utf-8') as f:
+            html = f.read()
+        self.assertNotIn('sorttable = {', html)
+        self.assertIn('<script src="sorttable.js"></script>', html)
+        with open(html_path / 'sorttable.js', encoding='utf-8') as f:
+            self.assertIn('sorttable = {', f.read())
+
+    def test_10_render_html_pages(self):
+        print('test 10')
+        render = ScanRender(scan_result=self.scan,
+                            directory=self.directory,
+                            output='test',
+                            page_folders=1)
+        result = render.render_html()[0]
+        self.assertEqual(200, result)
+        html_path = render.project_path / 'html'
+        with open(html_path / 'test.html', encoding='utf-8') as f:
+            index = f.read()
+        for number, name in enumerate(self.scan, 1):
+            self.assertIn(f'href="test_{number}.html#{name}"', index)
+            with open(html_path / f'test_{number}.html',
+                      encoding='utf-8') as f:
+                page = f.read()
+            self.assertIn(f'id="{name}"', page)
+            self.assertIn('<script src="sorttable.js"></script>', page)
+        with open(html_path / 'test_1.html', encoding='utf-8') as f:
+            self.assertIn('href="test.html#', f.read())
+
+    def test_11_render_html_page_size(self):
+        print('test 11')
+        render = ScanRender(scan_result=self.scan,
+                            directory=self.directory,
+                            output='test',
+                            page_size=1)
+        result = render.render_html()[0]
+        self.assertEqual(200, result)
+        html_path = render.project_path / 'html'
+        self.assertTrue((html_path / 'test_2.html').exists())
+
+    def test_12_page_full(self):
+        print('test 12')
+        render = ScanRender(scan_result=self.scan,
+                            directory=self.directory,
+                            page_folders=2,
+                            page_size=100)
+        self.assertFalse(render.page_full(0, 1000))
+        self.assertFalse(render.page_full(1, 50))
+        self.assertTrue(render.page_full(1, 150))
+        self.assertTrue(render.page_full(2, 50))
+
+    def test_13_render_top_ok(self):
+        print('test 13')
+        top = ([(4096, '/tmp/big.txt'), (12, '/tmp/small.txt')],
+               [(4108, '/tmp', 2, 16)])
+        render = ScanRender(scan_result=top,
+                            directory=self.directory,
+                            output='test')
+        result = render.render_top()[0]
+        self.assertEqual(200, result)
+        with open(render.project_path / 'html' / 'test.html',
+                  encoding='utf-8') as f:
+            html = f.read()
+        self.assertIn('<th>/tmp/big.txt</th>', html)
+        self.assertIn('<td>4 Ko</td>', html)
+
+    def test_14_render_top_ko(self):
+        print('test 14')
+        render = ScanRender(scan_result=34,
+                            directory=self.directory)
+        result = render.render_top()[0]
+        self.assertEqual(1003, result)
+
+    def test_15_render_duplicates_ok(self):
+        print('test 15')
+        scan = ([(10, ['/tmp/a.txt', '/tmp/b.txt'])],
+                [(4096, ['/tmp/c.txt', '/tmp/d.txt', '/tmp/e.txt'])])
+        render = ScanRender(scan_result=scan,
+                            directory=self.directory,
+                            output='test')
+        result = render.render_duplicates()[0]
+        self.assertEqual(200, result)
+        with open(render.project_path / 'html' / 'test.html',
+                  encoding='utf-8') as f:
+            html = f.read()
+        self.assertIn('<th>/tmp/c.txt<br />/tmp/d.txt<br />/tmp/e.txt</th>',
+                      html)
+        self.assertIn('Récupérable : 8 Ko', html)
+
+    def test_16_render_duplicates_ko(self):
+        print('test 16')
+        render = ScanRender(scan_result=34,
+                            directory=self.directory)
+        result = render.render_duplicates()[0]
+        self.assertEqual(1003, result)
+
+    def test_17_render_columns_ko(self):
+        print('test 17')
+        render = ScanRender(scan_result=34,
+                            directory=self.directory)
+        # the scan is only read once a columnar library is imported
+        if (importlib.util.find_spec('pyarrow') or
+                importlib.util.find_spec('numpy')):
+            expect = 1003
+        else:
+            expect = 1004
+        result = render.render_columns()[0]
+        self.assertEqual(expect, result)
+
+    def test_18_render_csv_ko(self):
+        print('test 18')
+        render = ScanRender(scan_result=34,
+                            directory=self.directory,
+                            output='test')
+        result = render.render_csv()[0]
+        self.assertEqual(1003, result)
+
+    def test_19_render_diff_ok(self):
+        print('test 19')
+        report = DiffReport('old.csv', 'new.csv')
+        report.add('grown', '/tmp/big.txt', 1024, 5120)
+        report.add('deleted', '/tmp/old.txt', 2048, 0)
+        render = ScanRender(scan_result=report,
+                            directory=self.directory,
+                            output='test')
+        result = render.render_diff()[0]
+        self.assertEqual(200, result)
+        with open(render.project_path / 'html' / 'test.html',
+                  encoding='utf-8') as f:
+            html = f.read()
+        self.assertIn('<th>/tmp/big.txt</th><td>1024 o</td><td>5 Ko</td>',
+                      html)
+        self.assertIn('<th>Supprimés</th><td>1</td><td>-2 Ko</td>', html)
+
+    def test_20_render_diff_ko(self):
+        print('test 20')
+        render = ScanRender(scan_result=34,
+                            directory=self.directory)
+        result = render.render_diff()[0]
+        self.assertEqual(1001, result)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,135 @@
+#! /usr/bin/env python3
+
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.parse
+import urllib.request
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.server import *
+from scan_disk.index import IndexedWalker, ScanIndex
+from scan_disk.walker import Walker
+
+
+class ServerTestCase(unittest.TestCase):
+    """
+        Checks the methods of the report server classes.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.tmp.name) / 'top'
+        (self.directory / 'sub dir' / 'deep').mkdir(parents=True)
+        for i in range(5):
+            (self.directory / f'file{i}.txt').write_text('x' * (10 - i))
+        self.top = str(self.directory)
+        self.logger = logging.getLogger('test')
+        self.index = ScanIndex(pathlib.Path(self.tmp.name) / 'index.db',
+                               self.logger, shared=True)
+        for _ in IndexedWalker(Walker(self.logger), self.index).walk(
+                self.top):
+            pass
+
+    def tearDown(self):
+        self.index.close()
+        self.tmp.cleanup()
+
+    def files(self, page):
+        """
+            Returns the names of the files of a page, in order
+        """
+        page = page.decode('utf-8').split('fichiers </h5>')[1]
+        return [line.strip() for line in page.splitlines()
+                if line.strip().startswith('file')]
+
+    def test_01_render_page(self):
+        print('test 1')
+        pages = ReportPages(self.index, self.logger, page_rows=2)
+        self.assertEqual(self.top, pages.top)
+        page = pages.page(self.top)
+        self.assertEqual(['file0.txt', 'file1.txt'], self.files(page))
+        self.assertIn('Page 1 / 3', page.decode('utf-8'))
+        self.assertIn('?path=' + urllib.parse.quote(self.top + os.sep) +
+                      'sub%20dir', page.decode('utf-8'))
+        self.assertEqual(['file4.txt'], self.files(pages.page(self.top,
+                                                              page=3)))
+
+    def test_02_sort(self):
+        print('test 2')
+        pages = ReportPages(self.index, self.logger, page_rows=2)
+        self.assertEqual(['file4.txt', 'file3.txt'],
+                         self.files(pages.page(self.top, 'size')))
+        self.assertEqual(['file0.txt', 'file1.txt'],
+                         self.files(pages.page(self.top, 'size', 'desc')))
+
+    def test_03_page_cache(self):
+        print('test 3')
+        pages = ReportPages(self.index, self.logger, cache_pages=2)
+        first = pages.page(self.top)
+        self.assertIs(first, pages.page(self.top))
+        self.assertEqual(1, pages.page.cache_info().hits)
+        pages.page(self.top, 'size')
+        pages.page(self.top, 'mtime')
+        self.assertIsNot(first, pages.page(self.top))
+
+    def test_04_render_page_ko(self):
+        print('test 4')
+        pages = ReportPages(self.index, self.logger)
+        with self.assertRaises(KeyError):
+            pages.page(self.top + '/missing')
+        for sort, order, page in (('owner', 'asc', 1), ('name', 'up', 1),
+                                  ('name', 'asc', 2)):
+            with self.assertRaises(ValueError):
+                pages.page(self.top, sort, order, page)
+
+    def test_05_server(self):
+        print('test 5')
+        pages = ReportPages(self.index, self.logger)
+        with ReportServer(pages, 0) as server:
+            thread = threading.Thread(target=server.serve_forever)
+            thread.start()
+            url = f'http://127.0.0.1:{server.server_address[1]}'
+            try:
+                with urllib.request.urlopen(url + '/') as response:
+                    self.assertIn('file4.txt', response.read().decode())
+                sub_dir = urllib.parse.quote(os.path.join(self.top,
+                                                          'sub dir'))
+                with urllib.request.urlopen(f'{url}/?path={sub_dir}') \
+                        as response:
+                    self.assertIn('deep', response.read().decode())
+                with urllib.request.urlopen(url + '/sorttable.js') \
+                        as response:
+                    self.assertIn('sorttable', response.read().decode())
+                for path, status in (('/?path=/missing', 404),
+                                     ('/?page=x', 400), ('/other', 404)):
+                    with self.assertRaises(urllib.error.HTTPError) as error:
+                        urllib.request.urlopen(url + path)
+                    self.assertEqual(status, error.exception.code)
+                    error.exception.close()
+            finally:
+                server.shutdown()
+                thread.join()
+
+    def test_06_names_escaped(self):
+        print('test 6')
+        (self.directory / '<img src=x onerror=alert(1)>').write_text('x')
+        (self.directory / '"><b>dir').mkdir()
+        for _ in IndexedWalker(Walker(self.logger), self.index, True).walk(
+                self.top):
+            pass
+        page = ReportPages(self.index, self.logger).page(self.top).decode()
+        self.assertIn('&lt;img src=x onerror=alert(1)&gt;', page)
+        self.assertNotIn('<img', page)
+        self.assertNotIn('<b>', page)
+        self.assertIn('%22%3E%3Cb%3Edir', page)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#! /usr/bin/env python3
+
+import asyncio
+import concurrent.futures
+import logging
+import pathlib
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.service import *
+from scan_disk.scan_disk import ScanDisk
+from scan_disk.walker import Walker
+
+
+class CountingWalker(Walker):
+    """
+        Keeps the largest number of folders read at once
+    """
+
+    def __init__(self, logger):
+        super().__init__(logger)
+        self.lock = threading.Lock()
+        self.reading = 0
+        self.most = 0
+
+    def scan(self, dirpath):
+        with self.lock:
+            self.reading += 1
+            self.most = max(self.most, self.reading)
+        try:
+            time.sleep(0.01)
+            return super().scan(dirpath)
+        finally:
+            with self.lock:
+                self.reading -= 1
+
+
+class ServiceTestCase(unittest.TestCase):
+    """
+        Checks the methods of the scan service class.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.tmp.name)
+        for i in range(10):
+            (self.directory / 'a' / f'd{i}' / 'e').mkdir(parents=True)
+            (self.directory / 'a' / f'd{i}' / 'file.txt').write_text('x')
+        (self.directory / 'b' / 'c').mkdir(parents=True)
+        self.logger = logging.getLogger('test')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def walk(self, walker, limit, prefetch=8):
+        async def walk():
+            with concurrent.futures.ThreadPoolExecutor(8) as executor:
+                async_walker = AsyncWalker(walker, executor,
+                                           asyncio.Semaphore(limit), prefetch)
+                return [(dirpath, [name for name, _ in dirs],
+                         [name for name, _ in files])
+                        async for dirpath, dirs, files
+                        in async_walker.walk(self.directory)]
+        return asyncio.run(walk())
+
+    def test_01_async_walk_same_as_walk(self):
+        print('test 1')
+        walker = Walker(self.logger)
+        expect = [(dirpath, [name for name, _ in dirs],
+                   [name for name, _ in files])
+                  for dirpath, dirs, files in walker.walk(self.directory)]
+        self.assertEqual(expect, self.walk(walker, 4))
+
+    def test_02_mount_limit(self):
+        print('test 2')
+        walker = CountingWalker(self.logger)
+        self.walk(walker, 2)
+        self.assertEqual(2, walker.most)
+
+    def test_03_async_walk_ko(self):
+        print('test 3')
+        self.directory = self.directory / 'missing'
+        self.assertEqual([], self.walk(Walker(self.logger), 2))
+
+    def test_04_run_targets(self):
+        print('test 4')
+        scans = [ScanDisk(self.directory / name, None, self.logger)
+                 for name in ('a', 'b', 'missing')]
+        expect = [ScanDisk(self.directory / name, None, self.logger)
+                  .read_directory(self.directory / name)
+                  for name in ('a', 'b')]
+        results = {}
+
+        def read(scan):
+            results[scan.directory.name] = scan.read_directory(
+                scan.directory)
+        for scan in scans:
+            scan.run = lambda scan=scan: read(scan)
+        service = ScanService(self.logger, threads=2, per_mount=1)
+        errors = asyncio.run(service.run(scans))
+        self.assertEqual([None, None, None], errors)
+        self.assertEqual(expect, [results['a'], results['b']])
+        self.assertIsInstance(results['missing'][str(self.directory /
+                                                     'missing')], str)
+
+    def test_05_run_ko(self):
+        print('test 5')
+        for options in ({'processes': 2}, {'engine': 'walk'}):
+            scan = ScanDisk(self.directory, None, self.logger, **options)
+            with self.assertRaises(ValueError):
+                asyncio.run(ScanService(self.logger).run([scan]))
+
+    def test_06_target_output(self):
+        print('test 6')
+        self.assertEqual('root', target_output('/'))
+        self.assertEqual('scan_mnt_data', target_output('/mnt/data', 'scan'))
+
+
+if __name__ == "__main__":
+    unittest.main()
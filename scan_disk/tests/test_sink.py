@@ -0,0 +1,173 @@
+#! /usr/bin/env python3
+
+import array
+import logging
+import os
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.sink import *
+from scan_disk.scan_disk import ScanDisk
+from scan_disk.scan_render import ScanRender
+
+
+class BlockedCursor:
+    """
+        Waits for an event before inserting the rows
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.lastrowid = 1
+
+    def execute(self, statement, parameters=()):
+        pass
+
+    def executemany(self, statement, rows):
+        self.connection.released.wait()
+        if self.connection.fail:
+            raise sqlite3.OperationalError('disk I/O error')
+        self.connection.rows.extend(rows)
+
+
+class BlockedConnection:
+    """
+        A connection whose inserts wait for released to be set
+    """
+
+    def __init__(self, fail=False):
+        self.released = threading.Event()
+        self.fail = fail
+        self.rows = []
+        self.closed = False
+
+    def cursor(self):
+        return BlockedCursor(self)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def batch(size):
+    """
+        Returns the paths and columns of a batch of size rows
+    """
+    return ([f'/top/{i}' for i in range(size)],
+            [array.array('q', range(size)) for _ in export.COLUMNS[1:]])
+
+
+class SinkTestCase(unittest.TestCase):
+    """
+        Checks the methods of the database writer class.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.tmp.name) / 'top'
+        (self.directory / 'a' / 'b').mkdir(parents=True)
+        (self.directory / 'a' / 'file.txt').write_text('hello')
+        (self.directory / 'top.txt').write_text('top')
+        self.config = {'path': str(pathlib.Path(self.tmp.name) / 'scan.db'),
+                       'batch_rows': 2, 'queue_size': 1}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def load(self, config):
+        scan = ScanDisk(self.directory, None, logging.getLogger('test'))
+        report = ScanRender(scan.iter_directory(self.directory),
+                            self.directory, database=config)
+        return report.render_database()
+
+    def test_01_render_database_sqlite(self):
+        print('test 1')
+        self.assertEqual((200, None), self.load(self.config))
+        self.assertEqual((200, None), self.load(self.config))
+        with sqlite3.connect(self.config['path']) as connection:
+            scans = connection.execute('SELECT id FROM scans').fetchall()
+            rows = connection.execute(
+                'SELECT id, path, parent, size FROM entries WHERE scan = ?',
+                scans[-1]).fetchall()
+        self.assertEqual(2, len(scans))
+        ids = {path: (row_id, parent, size)
+               for row_id, path, parent, size in rows}
+        self.assertEqual(5, len(ids))
+        top = str(self.directory)
+        self.assertEqual(-1, ids[top][1])
+        self.assertEqual(ids[os.path.join(top, 'a')][0],
+                         ids[os.path.join(top, 'a', 'file.txt')][1])
+        self.assertEqual(5, ids[os.path.join(top, 'a', 'file.txt')][2])
+
+    def test_02_backpressure(self):
+        print('test 2')
+        connection = BlockedConnection()
+        writer = DatabaseWriter(ConnectionPool(lambda: connection, 1), '/top',
+                                queue_size=1)
+        # the loader waits with the first batch, the second one is queued
+        writer.write(*batch(3))
+        writer.write(*batch(3))
+        third = threading.Thread(target=writer.write, args=batch(3))
+        third.start()
+        third.join(0.2)
+        self.assertTrue(third.is_alive())
+        connection.released.set()
+        third.join()
+        writer.close()
+        self.assertEqual(list(range(9)), [row[1] for row in connection.rows])
+
+    def test_03_load_ko(self):
+        print('test 3')
+        connection = BlockedConnection(fail=True)
+        connection.released.set()
+        writer = DatabaseWriter(ConnectionPool(lambda: connection, 1), '/top',
+                                queue_size=1)
+        with self.assertRaises(LoadError):
+            for _ in range(10):
+                writer.write(*batch(3))
+            writer.close()
+
+    def test_04_pool(self):
+        print('test 4')
+        pool = ConnectionPool(BlockedConnection, 2)
+        with pool.connection() as first:
+            with pool.connection() as second:
+                self.assertIsNot(first, second)
+        with pool.connection() as third:
+            self.assertIn(third, (first, second))
+        pool.close()
+        self.assertTrue(first.closed and second.closed)
+
+    def test_05_from_config_ko(self):
+        print('test 5')
+        with self.assertRaises(ValueError):
+            DatabaseWriter.from_config({'table': 'x'}, '/top')
+        with self.assertRaises(ValueError):
+            DatabaseWriter.from_config({'dialect': 'oracle'}, '/top')
+        self.assertEqual(1003, self.load({'dialect': 'sqlite'})[0])
+
+    @unittest.skipUnless(os.environ.get('SCAN_DISK_MARIADB_HOST'),
+                         'SCAN_DISK_MARIADB_HOST is not set')
+    def test_06_render_database_mariadb(self):
+        print('test 6')
+        connection = {'host': os.environ['SCAN_DISK_MARIADB_HOST'],
+                      'user': os.environ.get('SCAN_DISK_MARIADB_USER', 'root'),
+                      'password': os.environ.get('SCAN_DISK_MARIADB_PASSWORD',
+                                                 ''),
+                      'database': os.environ.get('SCAN_DISK_MARIADB_DATABASE',
+                                                 'scan_disk')}
+        config = {'dialect': 'mariadb', 'connection': connection,
+                  'batch_rows': 2, 'loaders': 2}
+        self.assertEqual((200, None), self.load(config))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+#! /usr/bin/env python3
+
+import pathlib
+import random
+import sys
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.top import *
+
+
+class TopNTestCase(unittest.TestCase):
+    """
+        Checks the methods of the TopN class.
+    """
+    def test_01_largest_ok(self):
+        print('test 1')
+        sizes = list(range(100))
+        random.Random(4).shuffle(sizes)
+        top = TopN(3)
+        for size in sizes:
+            top.push(size, f'file_{size}')
+        expect = [(99, 'file_99'), (98, 'file_98'), (97, 'file_97')]
+        self.assertEqual(expect, top.largest())
+
+    def test_02_bounded(self):
+        print('test 2')
+        top = TopN(5)
+        for size in range(1000):
+            top.push(size, 'file')
+        self.assertEqual(5, len(top.heap))
+
+    def test_03_less_items_than_n(self):
+        print('test 3')
+        top = TopN(5)
+        top.push(3, 'a', 1, 8)
+        self.assertEqual([(3, 'a', 1, 8)], top.largest())
+
+    def test_04_n_ko(self):
+        print('test 4')
+        with self.assertRaises(ValueError):
+            TopN(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,15 @@
 #! /usr/bin/env python3
 
+import logging
 import pathlib
 import sys
+import tempfile
 import unittest
 
 file_path = pathlib.Path(__file__).resolve().parents[2]
 sys.path.insert(0, str(file_path))
 
+import scan_disk.utils
 from scan_disk.utils import *
 
 
@@ -62,6 +65,82 @@ class UtilsTestCase(unittest.TestCase):
             **kwargs)
         self.assertIn(expect, result)
 
+    def test_06_get_template_memoized_source(self):
+        print('test 6')
+        templ = 'Bonjour {{ nom }}'
+        expect = get_template(templ)
+        result = get_template(templ)
+        self.assertIs(expect, result)
+
+    def test_07_get_template_memoized_name(self):
+        print('test 7')
+        template_path = file_path / 'scan_disk' / 'tests' / 'data'
+        expect = get_template('@template.j2', template_path)
+        result = get_template('@template.j2', template_path)
+        self.assertIs(expect, result)
+
+    def test_08_get_environment_shared(self):
+        print('test 8')
+        expect = get_environment('templates/')
+        result = get_environment('templates/')
+        self.assertIs(expect, result)
+        self.assertIsNotNone(result.bytecode_cache)
+
+    def test_09_rate_limit_filter(self):
+        print('test 9')
+        limit = RateLimitFilter(interval=3600)
+        progress = logging.makeLogRecord({'levelno': PROGRESS})
+        info = logging.makeLogRecord({'levelno': logging.INFO})
+        self.assertTrue(limit.filter(progress))
+        self.assertFalse(limit.filter(progress))
+        self.assertTrue(limit.filter(info))
+
+    def test_10_rate_limit_filter_sample(self):
+        print('test 10')
+        limit = RateLimitFilter(level='PROGRESS', interval=3600, sample=3)
+        progress = logging.makeLogRecord({'levelno': PROGRESS})
+        result = [limit.filter(progress) for _ in range(7)]
+        self.assertEqual([True, False, False, True, False, False, True],
+                         result)
+
+    def test_11_queue_handlers(self):
+        print('test 11')
+        logger = logging.getLogger('test_queue')
+        logger.propagate = False
+        messages = []
+        handler = logging.Handler()
+        handler.emit = lambda record: messages.append(record.getMessage())
+        logger.addHandler(handler)
+        queue_handlers([logger])
+        self.assertIsInstance(logger.handlers[0],
+                              logging.handlers.QueueHandler)
+        logger.warning('Bonjour %s', 'Einstein')
+        stop_logging()
+        self.assertEqual(['Bonjour Einstein'], messages)
+
+    def test_12_render_variables(self):
+        print('test 12')
+        expect = 'Bonjour Einstein - %(message)s'
+        result = render_variables('Bonjour {{ nom }} - %(message)s',
+                                  nom='Einstein')
+        self.assertEqual(expect, result)
+        self.assertNotIn('jinja2', vars(sys.modules['scan_disk.utils']))
+
+    def test_13_setup_logging_again(self):
+        print('test 13')
+        config = file_path / 'config' / 'logging.yml'
+        tmp = tempfile.TemporaryDirectory()
+        log_path = pathlib.Path(tmp.name) / 'scan_disk.log'
+        setup_logging(config, log_path)
+        listeners = list(scan_disk.utils._listeners)
+        for _ in range(4):
+            setup_logging(config, log_path)
+        # the listeners of the first set up have been stopped
+        self.assertTrue(all(listener._thread is None
+                            for listener in listeners))
+        self.assertEqual(len(listeners), len(scan_disk.utils._listeners))
+        stop_logging()
+        tmp.cleanup()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+#! /usr/bin/env python3
+
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+import unittest
+
+file_path = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(file_path))
+
+from scan_disk.walker import *
+from scan_disk.rules import Rules
+
+
+class WalkerTestCase(unittest.TestCase):
+    """
+        Checks the methods of the walker class.
+    """
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = pathlib.Path(self.tmp.name)
+        (self.directory / 'a' / 'b').mkdir(parents=True)
+        (self.directory / 'c').mkdir()
+        (self.directory / 'a' / 'file.txt').write_text('hello')
+        (self.directory / 'top.txt').write_text('top')
+        os.symlink(self.directory / 'a', self.directory / 'link')
+        self.walker = Walker(logging.getLogger('test'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_01_walk_same_order_as_os_walk(self):
+        print('test 1')
+        expect = [dirpath for dirpath, _, _ in os.walk(self.directory)]
+        result = [dirpath for dirpath, _, _ in self.walker.walk(self.directory)]
+        self.assertEqual(expect, result)
+
+    def test_02_walk_same_names_as_os_walk(self):
+        print('test 2')
+        expect = {dirpath: (sorted(dirs), sorted(files))
+                  for dirpath, dirs, files in os.walk(self.directory)}
+        result = {dirpath: (sorted(name for name, _ in dirs),
+                            sorted(name for name, _ in files))
+                  for dirpath, dirs, files in self.walker.walk(self.directory)}
+        self.assertEqual(expect, result)
+
+    def test_03_walk_symlink_not_followed(self):
+        print('test 3')
+        top = next(self.walker.walk(self.directory))
+        stats = dict(top[1])['link']
+        self.assertTrue(os.path.islink(self.directory / 'link'))
+        self.assertEqual(0o120000, stats.st_mode & 0o170000)
+
+    def test_04_walk_ko(self):
+        print('test 4')
+        result = list(self.walker.walk(self.directory / 'missing'))
+        self.assertEqual([], result)
+
+    def test_05_threaded_walk_same_as_walk(self):
+        print('test 5')
+        for i in range(20):
+            (self.directory / 'c' / f'd{i}' / 'e').mkdir(parents=True)
+        expect = [(dirpath, [name for name, _ in dirs],
+                   [name for name, _ in files])
+                  for dirpath, dirs, files in self.walker.walk(self.directory)]
+        threaded = ThreadedWalker(self.walker.logger, workers=4, prefetch=3)
+        result = [(dirpath, [name for name, _ in dirs],
+                   [name for name, _ in files])
+                  for dirpath, dirs, files in threaded.walk(self.directory)]
+        self.assertEqual(expect, result)
+
+    def test_06_threaded_walk_ko(self):
+        print('test 6')
+        threaded = ThreadedWalker(self.walker.logger, workers=2)
+        result = list(threaded.walk(self.directory / 'missing'))
+        self.assertEqual([], result)
+
+    def test_07_threaded_walker_workers_ko(self):
+        print('test 7')
+        with self.assertRaises(ValueError):
+            ThreadedWalker(self.walker.logger, workers=0)
+
+    def test_08_walk_rules_prune(self):
+        print('test 8')
+        rules = Rules(exclude=['a'], include=['*.txt'])
+        (self.directory / 'c' / 'skip.log').write_text('skip')
+        walker = Walker(self.walker.logger, rules)
+        scanned = []
+        scan = walker.scan
+        walker.scan = lambda dirpath: scanned.append(dirpath) or scan(dirpath)
+        result = {dirpath: ([name for name, _ in dirs],
+                            [name for name, _ in files])
+                  for dirpath, dirs, files in walker.walk(self.directory)}
+        self.assertNotIn(str(self.directory / 'a'), scanned)
+        self.assertEqual(['top.txt'], result[str(self.directory)][1])
+        self.assertNotIn('a', result[str(self.directory)][0])
+        self.assertEqual([], result[str(self.directory / 'c')][1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Keeps the N largest files or folders met during a scan.
+
+    A bounded min-heap holds the N largest items seen so far, so the memory
+    stays in O(N) whatever the size of the tree.
+"""
+
+import heapq
+
+
+class TopN:
+
+    def __init__(self, n):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: TopN
+            :param n: The number of items to keep
+            :type n: int
+        """
+        if n < 1:
+            raise ValueError(f'Invalid number of items {n}')
+        self.n = n
+        self.heap = []
+
+    def push(self, size, *item):
+        """
+            Offers an item, it is kept if it is among the N largest
+            :param self: The class instance
+            :type self: TopN
+            :param size: the size of the item
+            :type size: int
+            :param item: the path and the other values of the item
+            :type item: Tuple
+        """
+        if len(self.heap) < self.n:
+            heapq.heappush(self.heap, (size, *item))
+        elif size > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (size, *item))
+
+    def largest(self):
+        """
+            Returns the items kept, the largest first
+            :param self: The class instance
+            :type self: TopN
+            :return: the (size, path, ...) of the items
+            :rtype: List
+        """
+        return sorted(self.heap, reverse=True)
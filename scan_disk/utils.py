@@ -1,96 +1,339 @@
-#! /usr/bin/env python3
-
-"""
-    Utility functions.
-"""
-
-import contextlib
-import jinja2
-import logging
-import logging.config
-import mysql.connector as mariadb
-import platform
-import re
-import sys
-import yaml
-
-
-def yaml_to_dict(file_path):
-    """
-        Loads YAML data from file.
-
-        :param file_path: The path of the YAML file.
-        :type file_path: str or pathlib.PurePath
-        :returns: The loaded YAML data.
-        :rtype: dict.
-    """
-    loaded_file = {}
-    try:
-        with open(file_path, encoding="utf-8") as file:
-            loaded_file = yaml.safe_load(file.read())
-    except Exception as error:
-        loaded_file = {'erreur': error}
-
-    return loaded_file
-
-
-def render_templates(tmpl, template_path="templates/", **kwargs):
-    """
-        Renders a Jinja template.
-
-        :param tmpl: The Jinja template or the path of the file holding it.
-        :type tmpl: str.
-        :param kwargs: The variables of the Jinja template.
-        :type tmpl: dict.
-        :returns: The rendered Jinja template.
-        :rtype: str.
-    """
-    result = None
-    try:
-        if tmpl and tmpl.startswith("@"):
-            template_name = tmpl[1:]
-            environment = jinja2.Environment(
-                loader=jinja2.FileSystemLoader(str(template_path)))
-            template = environment.get_template(template_name)
-        else:
-            template = jinja2.Template(tmpl)
-        result = template.render(**kwargs)
-    except jinja2.exceptions.TemplateNotFound as error:
-        result = {'erreur': f'"{error.name}" not found'} 
-
-    return result
-
-
-def setup_logging(config_path, logging_path): # pragma: no cover
-    """
-        Sets the logging up.
-
-        :param config_path: The path of the logging.yml file.
-        :type config_path: str or pathlib.PurePath.
-        :param logging_path: The path of the logging file.
-        :type logging_path: str or pathlib.PurePath.
-    """
-    kwargs = {"hostname": platform.node(), "file_path": str(logging_path)}
-
-    try:
-        config = yaml_to_dict(config_path)
-
-        for key in config["formatters"]:
-            try:
-                config["formatters"][key]["format"] = render_templates(
-                    config["formatters"][key]["format"], **kwargs)
-            except KeyError:
-                pass
-
-        for key in config["handlers"]:
-            try:
-                config["handlers"][key]["filename"] = render_templates(
-                    config["handlers"][key]["filename"], **kwargs)
-            except KeyError:
-                pass
-
-        logging.config.dictConfig(config)
-    except Exception as error:
-        print(
-            "Échec de configuration de la journalisation :\n{}".format(error))
-        sys.exit(1)
+#! /usr/bin/env python3
+
+"""
+    Utility functions.
+
+    jinja2, yaml and hashlib are imported by the functions using them, so
+    that a scan only loads them when it renders a report or reads a YAML
+    file.
+"""
+
+import atexit
+import contextlib
+import logging
+import logging.config
+import logging.handlers
+import platform
+import queue
+import re
+import sys
+import time
+
+# The level of the messages logged for each folder read, between DEBUG and
+# INFO. They are usually rate limited by a RateLimitFilter
+PROGRESS = 15
+logging.addLevelName(PROGRESS, "PROGRESS")
+
+# The listeners writing the queued log records, stopped at exit
+_listeners = []
+
+
+def yaml_to_dict(file_path):
+    """
+        Loads YAML data from file.
+
+        :param file_path: The path of the YAML file.
+        :type file_path: str or pathlib.PurePath
+        :returns: The loaded YAML data.
+        :rtype: dict.
+    """
+    import yaml
+
+    loaded_file = {}
+    try:
+        with open(file_path, encoding="utf-8") as file:
+            loaded_file = yaml.safe_load(file.read())
+    except Exception as error:
+        loaded_file = {'erreur': error}
+
+    return loaded_file
+
+
+# The shared Jinja environments, by template folder and autoescape
+_environments = {}
+
+# The sources of the string templates, by name
+_sources = {}
+
+
+def _load_source(name):
+    """
+        Loads a string template registered by get_template.
+
+        :param name: The name of the template.
+        :type name: str.
+        :returns: The source of the template, which never changes.
+        :rtype: tuple.
+    """
+    if name not in _sources:
+        return None
+    return _sources[name], None, lambda: True
+
+
+def get_environment(template_path="templates/", autoescape=False):
+    """
+        Returns the shared Jinja environment of a template folder.
+
+        The environment keeps the compiled templates in memory and their
+        bytecode in a cache folder, so they are compiled once across runs.
+        The bytecode cache does not tell the environments apart, the
+        autoescaping one only keeps its templates in memory.
+
+        :param template_path: The folder of the template files.
+        :type template_path: str or pathlib.PurePath.
+        :param autoescape: The variables are escaped for html.
+        :type autoescape: bool.
+        :returns: The Jinja environment.
+        :rtype: jinja2.Environment.
+    """
+    import jinja2
+
+    key = (str(template_path), autoescape)
+    if key not in _environments:
+        _environments[key] = jinja2.Environment(
+            loader=jinja2.ChoiceLoader([
+                jinja2.FunctionLoader(_load_source),
+                jinja2.FileSystemLoader(key[0])]),
+            autoescape=autoescape,
+            bytecode_cache=None if autoescape
+            else jinja2.FileSystemBytecodeCache())
+    return _environments[key]
+
+
+def get_template(tmpl, template_path="templates/", autoescape=False):
+    """
+        Returns a compiled Jinja template, memoized by name or by source.
+
+        :param tmpl: The Jinja template or the path of the file holding it.
+        :type tmpl: str.
+        :param template_path: The folder of the template files.
+        :type template_path: str or pathlib.PurePath.
+        :param autoescape: The variables are escaped for html.
+        :type autoescape: bool.
+        :returns: The compiled template.
+        :rtype: jinja2.Template.
+    """
+    import hashlib
+
+    environment = get_environment(template_path, autoescape)
+    if tmpl.startswith("@"):
+        return environment.get_template(tmpl[1:])
+    name = "string:" + hashlib.sha1(tmpl.encode("utf-8")).hexdigest()
+    _sources[name] = tmpl
+    return environment.get_template(name)
+
+
+def render_variables(tmpl, **kwargs):
+    """
+        Renders a template made only of {{ name }} variables without Jinja,
+        any other template is rendered by render_templates.
+
+        :param tmpl: The template.
+        :type tmpl: str.
+        :param kwargs: The variables of the template.
+        :type tmpl: dict.
+        :returns: The rendered template.
+        :rtype: str.
+    """
+    if "{%" in tmpl or "{#" in tmpl:
+        return render_templates(tmpl, **kwargs)
+    try:
+        return re.sub(r"{{\s*(\w+)\s*}}",
+                      lambda match: str(kwargs[match.group(1)]), tmpl)
+    except KeyError:
+        return render_templates(tmpl, **kwargs)
+
+
+def render_templates(tmpl, template_path="templates/", **kwargs):
+    """
+        Renders a Jinja template.
+
+        :param tmpl: The Jinja template or the path of the file holding it.
+        :type tmpl: str.
+        :param kwargs: The variables of the Jinja template.
+        :type tmpl: dict.
+        :returns: The rendered Jinja template.
+        :rtype: str.
+    """
+    import jinja2
+
+    result = None
+    try:
+        result = get_template(tmpl, template_path).render(**kwargs)
+    except jinja2.exceptions.TemplateNotFound as error:
+        result = {'erreur': f'"{error.name}" not found'} 
+
+    return result
+
+
+class RateLimitFilter(logging.Filter):
+    """
+        Drops the records of a level logged too often.
+
+        A record of the level passes if it is the first one logged for
+        interval seconds, or if it is the sample-th one since the previous
+        record which passed. The records of the other levels always pass.
+    """
+
+    def __init__(self, level=PROGRESS, interval=1.0, sample=None):
+        """
+            Constructor.
+
+            :param level: The level of the records to limit.
+            :type level: int or str.
+            :param interval: The minimum time between two records, in
+                             seconds.
+            :type interval: float.
+            :param sample: Lets one record in sample pass, whatever the time.
+            :type sample: int.
+        """
+        super().__init__()
+        if isinstance(level, str):
+            level = logging.getLevelName(level)
+        self.level = level
+        self.interval = interval
+        self.sample = sample
+        self.skipped = 0
+        self.last = None
+
+    def filter(self, record):
+        if record.levelno != self.level:
+            return True
+        now = time.monotonic()
+        if (self.last is not None and now - self.last < self.interval and
+                (not self.sample or self.skipped + 1 < self.sample)):
+            self.skipped += 1
+            return False
+        self.last = now
+        self.skipped = 0
+        return True
+
+
+def queue_handlers(loggers):
+    """
+        Moves the handlers of the loggers behind a queue.
+
+        The records are only put in a queue by the logging thread, a
+        listener thread formats and writes them to the original handlers.
+
+        :param loggers: The loggers to set up.
+        :type loggers: list of logging.Logger.
+    """
+    # registered once, however many times the logging is set up
+    atexit.unregister(stop_logging)
+    atexit.register(stop_logging)
+    for logger in loggers:
+        handlers = logger.handlers[:]
+        if not handlers:
+            continue
+        records = queue.SimpleQueue()
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        listener = logging.handlers.QueueListener(
+            records, *handlers, respect_handler_level=True)
+        listener.start()
+        _listeners.append(listener)
+
+
+class _LoggerHandler(logging.Handler):
+    """
+        Hands each record to the logger of this process it was logged by.
+    """
+
+    def emit(self, record):
+        logger = logging.getLogger(record.name)
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+
+
+def process_listener():
+    """
+        Starts the listener of the records logged by worker processes.
+
+        The records the workers put in its queue (see log_to_queue) are
+        handled by the loggers of this process, so they reach the same
+        handlers as the records of this process.
+
+        :returns: The started listener, whose queue is given to the workers.
+        :rtype: logging.handlers.QueueListener.
+    """
+    import multiprocessing
+
+    listener = logging.handlers.QueueListener(multiprocessing.Queue(),
+                                              _LoggerHandler())
+    listener.start()
+    return listener
+
+
+def log_to_queue(records):
+    """
+        Sets the logging of a worker process up.
+
+        A forked worker inherits the handlers of its parent, but not the
+        listener threads writing the records of the queued handlers: they
+        are replaced by a handler putting the records in the queue of a
+        process_listener.
+
+        :param records: The queue of the listener.
+        :type records: multiprocessing.Queue.
+    """
+    root = logging.getLogger()
+    for logger in [root] + list(logging.Logger.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger):
+            for handler in logger.handlers[:]:
+                logger.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(records))
+
+
+def stop_logging():
+    """
+        Writes the queued log records and stops the listeners.
+    """
+    while _listeners:
+        _listeners.pop().stop()
+
+
+def setup_logging(config_path, logging_path): # pragma: no cover
+    """
+        Sets the logging up.
+
+        When the queue key of the logging.yml file is true, the handlers of
+        the loggers write the records in a background thread. The listeners
+        of a previous set up are stopped first, so it can be called again.
+
+        :param config_path: The path of the logging.yml file.
+        :type config_path: str or pathlib.PurePath.
+        :param logging_path: The path of the logging file.
+        :type logging_path: str or pathlib.PurePath.
+    """
+    kwargs = {"hostname": platform.node(), "file_path": str(logging_path)}
+
+    try:
+        config = yaml_to_dict(config_path)
+
+        for key in config["formatters"]:
+            try:
+                config["formatters"][key]["format"] = render_variables(
+                    config["formatters"][key]["format"], **kwargs)
+            except KeyError:
+                pass
+
+        for key in config["handlers"]:
+            try:
+                config["handlers"][key]["filename"] = render_variables(
+                    config["handlers"][key]["filename"], **kwargs)
+            except KeyError:
+                pass
+
+        use_queue = config.pop("queue", False)
+        stop_logging()
+        logging.config.dictConfig(config)
+        if use_queue:
+            queue_handlers([logging.getLogger()] +
+                           [logging.getLogger(name)
+                            for name in config.get("loggers", {})])
+    except Exception as error:
+        print(
+            "Échec de configuration de la journalisation :\n{}".format(error))
+        sys.exit(1)
@@ -0,0 +1,239 @@
+#! /usr/bin/python3
+# coding:utf-8
+
+"""
+    Walks a folder tree with os.scandir.
+
+    Each entry is stat'ed only once, with follow_symlinks=False, and the
+    type cached by the DirEntry is used to split the folders from the files,
+    so that no Path object nor second stat call is needed per entry.
+
+    The ThreadedWalker reads the folders with a pool of threads, which keeps
+    slow storages (NFS, spinning disks) busy, and still yields them in the
+    order of the sequential walk.
+
+    The walkers can be given the Rules of scan_disk.rules: the excluded
+    entries are skipped before they are stat'ed and the excluded folders
+    are never walked into.
+
+    Given the Metrics of scan_disk.metrics, they time the stat calls and
+    count the entries and folders which can not be read.
+"""
+
+import concurrent.futures
+import os
+import time
+
+
+class Walker:
+
+    def __init__(self, logger, rules=None, metrics=None):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: Walker
+            :param logger: The logger file
+            :type logger: Logging
+            :param rules: The rules selecting the folders and files
+            :type rules: Rules
+            :param metrics: The metrics of the scan
+            :type metrics: Metrics
+        """
+        self.logger = logger
+        self.rules = rules
+        self.metrics = metrics
+
+    def walk(self, top):
+        """
+            Walks the folder tree top-down in the same order as os.walk.
+            Like os.walk, the symbolic links to folders are listed with the
+            folders but are not followed.
+            :param self: The class instance
+            :type self: Walker
+            :param top: the folder to walk
+            :type top: Path or String
+            :return: the folder path, the (name, stats) of its sub-folders
+                     and the (name, stats) of its files. The stats are an
+                     OSError when the entry can not be stat'ed
+            :rtype: Generator of (String, List, List)
+        """
+        if self.rules is not None:
+            self.rules.set_top(top)
+        stack = [os.fspath(top)]
+        while stack:
+            dirpath = stack.pop()
+            try:
+                dirs, files, sub_dirs = self.scan(dirpath)
+            except OSError as error:
+                self.read_error(dirpath, error)
+                continue
+            yield dirpath, dirs, files
+            stack.extend(reversed(sub_dirs))
+
+    def scan(self, dirpath):
+        """
+            Reads the entries of a single folder
+            :param self: The class instance
+            :type self: Walker
+            :param dirpath: the folder to read
+            :type dirpath: String
+            :return: the (name, stats) of the sub-folders and of the files,
+                     and the paths of the sub-folders to walk into
+            :rtype: List, List, List
+        """
+        dirs = []
+        files = []
+        sub_dirs = []
+        rules = self.rules
+        metrics = self.metrics
+        stat_wall = stat_cpu = 0.0
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if rules is not None and rules.excluded(entry.path,
+                                                        entry.name):
+                    continue
+                if metrics is None:
+                    stats = self.stat_entry(entry)
+                else:
+                    wall, cpu = time.perf_counter(), time.thread_time()
+                    stats = self.stat_entry(entry)
+                    stat_wall += time.perf_counter() - wall
+                    stat_cpu += time.thread_time() - cpu
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    dirs.append((entry.name, stats))
+                    if not entry.is_symlink() and (
+                            rules is None or rules.walk_dir(stats)):
+                        sub_dirs.append(entry.path)
+                elif rules is None or rules.keep_file(entry.name, stats):
+                    files.append((entry.name, stats))
+        if metrics is not None:
+            metrics.add('stat', stat_wall, stat_cpu)
+        return dirs, files, sub_dirs
+
+    def read_error(self, dirpath, error):
+        """
+            Reports a folder which can not be read
+            :param self: The class instance
+            :type self: Walker
+            :param dirpath: the folder
+            :type dirpath: String
+            :param error: the error raised
+            :type error: OSError
+        """
+        self.logger.error(f'Le répertoire {dirpath} n\'est pas ' +
+                          f'lisible. L\'erreur {error} a été générée')
+        if self.metrics is not None:
+            self.metrics.count('errors')
+
+    def stat_entry(self, entry):
+        """
+            Stats an entry without following the symbolic links
+            :param self: The class instance
+            :type self: Walker
+            :param entry: the entry to stat
+            :type entry: os.DirEntry
+            :return: the stats of the entry or the error raised
+            :rtype: os.stat_result or OSError
+        """
+        try:
+            return entry.stat(follow_symlinks=False)
+        except OSError as error:
+            self.logger.error(f'Le fichier {entry.path} n\'existe pas. ' +
+                              f'L\'erreur {error} a été générée')
+            if self.metrics is not None:
+                self.metrics.count('errors')
+            return error
+
+    def stat_path(self, path):
+        """
+            Stats a path without following the symbolic links
+            :param self: The class instance
+            :type self: Walker
+            :param path: the path to stat
+            :type path: String
+            :return: the stats of the path or the error raised
+            :rtype: os.stat_result or OSError
+        """
+        try:
+            return os.lstat(path)
+        except OSError as error:
+            self.logger.error(f'Le fichier {path} n\'existe pas. ' +
+                              f'L\'erreur {error} a été générée')
+            if self.metrics is not None:
+                self.metrics.count('errors')
+            return error
+
+
+class ThreadedWalker(Walker):
+
+    def __init__(self, logger, workers, prefetch=None, rules=None,
+                 metrics=None):
+        """
+            Constructor
+            :param self: The class instance
+            :type self: ThreadedWalker
+            :param logger: The logger file
+            :type logger: Logging
+            :param workers: The number of threads reading the folders
+            :type workers: int
+            :param prefetch: The maximum number of folders read ahead of
+                             the consumer, four per worker by default
+            :type prefetch: int
+            :param rules: The rules selecting the folders and files
+            :type rules: Rules
+            :param metrics: The metrics of the scan
+            :type metrics: Metrics
+        """
+        super().__init__(logger, rules, metrics)
+        if workers < 1:
+            raise ValueError(f'Invalid number of workers {workers}')
+        self.workers = workers
+        self.prefetch = prefetch or workers * 4
+
+    def walk(self, top):
+        """
+            Walks the folder tree top-down in the same order as os.walk,
+            the folders being read ahead by the pool of threads.
+            Only the next prefetch folders to yield are submitted to the
+            work queue, so the memory stays bounded whatever the tree size.
+            :param self: The class instance
+            :type self: ThreadedWalker
+            :param top: the folder to walk
+            :type top: Path or String
+            :return: the folder path, the (name, stats) of its sub-folders
+                     and the (name, stats) of its files
+            :rtype: Generator of (String, List, List)
+        """
+        if self.rules is not None:
+            self.rules.set_top(top)
+        # each item of the stack is [dirpath, future or None]
+        stack = [[os.fspath(top), None]]
+        with concurrent.futures.ThreadPoolExecutor(self.workers) as executor:
+            while stack:
+                self.submit(executor, stack)
+                dirpath, future = stack.pop()
+                try:
+                    dirs, files, sub_dirs = future.result()
+                except OSError as error:
+                    self.read_error(dirpath, error)
+                    continue
+                yield dirpath, dirs, files
+                stack.extend([path, None] for path in reversed(sub_dirs))
+
+    def submit(self, executor, stack):
+        """
+            Submits the next folders of the stack to the work queue
+            :param self: The class instance
+            :type self: ThreadedWalker
+            :param executor: the pool of threads
+            :type executor: ThreadPoolExecutor
+            :param stack: the folders still to yield, the next one last
+            :type stack: List
+        """
+        for item in stack[:-self.prefetch - 1:-1]:
+            if item[1] is None:
+                item[1] = executor.submit(self.scan, item[0])